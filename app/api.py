@@ -0,0 +1,385 @@
+"""Backend HTTP routes mounted alongside the Reflex app."""
+
+from pathlib import Path
+from . import settings
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.concurrency import iterate_in_threadpool
+from starlette.routing import Route
+from urllib.parse import quote
+from .services import (
+    batch,
+    jobs,
+    metrics,
+    operations,
+    profiling,
+    thumbnails,
+    uploads,
+)
+from .services.image_pdf import is_image
+from .services.job_store import DONE, store
+from .services.operations import OperationError
+from .services.storage import storage
+import asyncio
+import hmac
+import logging
+import mimetypes
+import shutil
+import uuid
+import zipfile
+
+PDF_MAGIC = b"%PDF-"
+
+
+async def job_status(request: Request) -> JSONResponse:
+    """Return the status of a job."""
+    job = store.get(request.path_params["job_id"])
+    if job is None:
+        return JSONResponse({"error": "Job not found."}, status_code=404)
+    return JSONResponse(
+        {
+            "id": job["id"],
+            "operation": job["operation"],
+            "status": job["status"],
+            "error": job["error"],
+            "result_name": job["result_name"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        }
+    )
+
+
+async def download_job(request: Request) -> RedirectResponse | JSONResponse:
+    """Redirect to an expiring link to the stored result of a finished job."""
+    job = store.get(request.path_params["job_id"])
+    if job is None:
+        return JSONResponse({"error": "Job not found."}, status_code=404)
+    if job["status"] != DONE:
+        return JSONResponse(
+            {"error": f"Job is {job['status']}.", "status": job["status"]},
+            status_code=409,
+        )
+    key = store.result_key(job)
+    if not await asyncio.to_thread(storage.exists, key):
+        return JSONResponse({"error": "Result has expired."}, status_code=410)
+    return RedirectResponse(
+        storage.download_url(key, job["result_name"]), status_code=302
+    )
+
+
+async def download_file(request: Request) -> FileResponse | JSONResponse:
+    """Serve a stored object through a link made by ``storage.download_url``."""
+    key = request.path_params["key"]
+    filename = request.query_params.get("filename", "")
+    try:
+        expires = int(request.query_params.get("expires", ""))
+        genuine = storage.verify(
+            key, filename, expires, request.query_params.get("token", "")
+        )
+        path = await asyncio.to_thread(storage.local_path, key) if genuine else None
+    except (ValueError, FileNotFoundError):
+        path = None
+    if path is None:
+        return JSONResponse({"error": "File not found."}, status_code=404)
+    return FileResponse(path, filename=filename)
+
+
+async def download_page(request: Request) -> Response:
+    """Serve one page of a job's result, available while the job still runs.
+
+    Pages published during the run are served from disk; once the job is
+    done (for example when its result came from the cache, or ran on
+    another node) they are read from the result archive.
+    """
+    job = store.get(request.path_params["job_id"])
+    name = request.path_params["name"]
+    if job is None or Path(name).name != name:
+        return JSONResponse({"error": "Page not found."}, status_code=404)
+    page_path = store.pages_dir(job["id"]) / name
+    if page_path.suffix != ".part" and page_path.exists():
+        return FileResponse(page_path, filename=name)
+    try:
+        result_path = (
+            await asyncio.to_thread(storage.local_path, store.result_key(job))
+            if job["status"] == DONE
+            else None
+        )
+    except FileNotFoundError:
+        result_path = None
+    if result_path is not None and zipfile.is_zipfile(result_path):
+        with zipfile.ZipFile(result_path) as zf:
+            if name in zf.namelist():
+                # Encoded, as names can have characters headers cannot carry.
+                disposition = f"attachment; filename*=utf-8''{quote(name)}"
+                return Response(
+                    zf.read(name),
+                    media_type=mimetypes.guess_type(name)[0],
+                    headers={"Content-Disposition": disposition},
+                )
+    return JSONResponse({"error": "Page not found."}, status_code=404)
+
+
+async def download_batch(request: Request) -> StreamingResponse | JSONResponse:
+    """Stream a ZIP with every result of a batch and its per-file status."""
+    found = store.get_batch(request.path_params["batch_id"])
+    if found is None:
+        return JSONResponse({"error": "Batch not found."}, status_code=404)
+    filename = f"{found['operation']}_batch.zip"
+    return StreamingResponse(
+        iterate_in_threadpool(batch.stream_archive(found)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def create_upload(request: Request) -> JSONResponse:
+    """Start a resumable upload from a JSON ``{"filename", "size"}`` body."""
+    try:
+        body = await request.json()
+        upload = uploads.store.create(str(body.get("filename", "")), int(body["size"]))
+    except uploads.UploadError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return JSONResponse(
+            {"error": "Send a JSON body with 'filename' and 'size'."}, status_code=400
+        )
+    return JSONResponse(upload, status_code=201)
+
+
+async def thumbnail(request: Request) -> FileResponse | JSONResponse:
+    """Serve the preview of one page, rendering it first if it is not cached."""
+    try:
+        path = await asyncio.to_thread(
+            thumbnails.cache.get,
+            request.path_params["doc_hash"],
+            request.path_params["page"],
+        )
+    except ValueError:
+        path = None
+    if path is None:
+        return JSONResponse({"error": "Page not found."}, status_code=404)
+    # Previews are addressed by content hash, so they never change.
+    return FileResponse(
+        path,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+async def upload_status(request: Request) -> JSONResponse:
+    """Return an upload's progress, or abort it with DELETE."""
+    upload_id = request.path_params["upload_id"]
+    try:
+        if request.method == "DELETE":
+            uploads.store.get(upload_id)
+            uploads.store.delete(upload_id)
+            return JSONResponse({"id": upload_id, "status": "deleted"})
+        return JSONResponse(uploads.store.get(upload_id))
+    except uploads.UploadError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+
+
+async def _read_chunk(request: Request, limit: int) -> bytes:
+    """Read a request body of at most ``limit`` bytes, stopping as soon as it
+    is exceeded, whether or not a Content-Length was sent."""
+    length = request.headers.get("content-length")
+    if length is not None:
+        if not length.isdigit():
+            raise uploads.UploadError("Invalid Content-Length.")
+        if int(length) > limit:
+            raise uploads.UploadError("Chunk is too large.", 413)
+    data = bytearray()
+    async for part in request.stream():
+        data += part
+        if len(data) > limit:
+            raise uploads.UploadError("Chunk is too large.", 413)
+    return bytes(data)
+
+
+async def upload_chunk(request: Request) -> JSONResponse:
+    """Store one chunk, checked against its ``X-Chunk-SHA256`` header."""
+    checksum = request.headers.get("x-chunk-sha256", "")
+    try:
+        data = await _read_chunk(request, uploads.store.chunk_size)
+        upload = await asyncio.to_thread(
+            uploads.store.write_chunk,
+            request.path_params["upload_id"],
+            request.path_params["index"],
+            data,
+            checksum,
+        )
+    except uploads.UploadError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+    return JSONResponse(upload)
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """Expose tool run metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+async def profiling_config(request: Request) -> JSONResponse:
+    """Read or change which jobs are profiled; requires the admin token.
+
+    A PUT body may set ``sample_rate``, the flagged ``tools``, and job IDs or
+    input hashes to flag (``jobs``) or stop flagging (``unflag_jobs``).
+    """
+    token = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not settings.ADMIN_TOKEN or not hmac.compare_digest(
+        token.encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        return JSONResponse({"error": "Forbidden."}, status_code=403)
+    if request.method == "PUT":
+        try:
+            body = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "The body must be JSON."}, status_code=400)
+        if not isinstance(body, dict):
+            return JSONResponse(
+                {"error": "The body must be a JSON object."}, status_code=400
+            )
+        try:
+            config = profiling.configure(
+                rate=body.get("sample_rate"),
+                tools=body.get("tools"),
+                jobs=body.get("jobs"),
+                unflag_jobs=body.get("unflag_jobs"),
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse(config)
+    return JSONResponse(profiling.configure())
+
+
+# What each kind of input must be, and how to tell from its first bytes.
+INPUT_KINDS = {
+    "pdf": ("a PDF file", lambda header: header.startswith(PDF_MAGIC)),
+    "image": ("a supported image", is_image),
+    "stamp": (
+        "a PDF or a supported image",
+        lambda header: header.startswith(PDF_MAGIC) or is_image(header),
+    ),
+}
+
+
+def _input_kind(operation: str, index: int) -> str:
+    if operation in operations.IMAGE_INPUTS:
+        return "image"
+    if operation in operations.STAMP_INPUTS and index > 0:
+        return "stamp"
+    return "pdf"
+
+
+def _store_inputs(files: list, directory: Path, operation: str) -> list[Path]:
+    """Copy uploaded files into ``directory``, keeping their names and order."""
+    paths = []
+    for i, upload in enumerate(files):
+        path = directory / str(i) / (Path(upload.filename or "").name or "input")
+        path.parent.mkdir(parents=True)
+        upload.file.seek(0)
+        description, accepts = INPUT_KINDS[_input_kind(operation, i)]
+        if not accepts(upload.file.read(12)):
+            raise OperationError(f"{upload.filename} is not {description}.")
+        upload.file.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(upload.file, f, 1024 * 1024)
+        paths.append(path)
+    return paths
+
+
+async def list_tools(request: Request) -> JSONResponse:
+    """Describe the tools available through the API and their parameters."""
+    return JSONResponse(
+        {
+            "tools": {
+                operation: {
+                    "params": operations.operation_params(operation),
+                    "required": operations.required_params(operation),
+                    "output": operations.OUTPUT_NAMES[operation],
+                }
+                for operation in operations.OPERATIONS
+            }
+        }
+    )
+
+
+async def run_tool(request: Request) -> FileResponse | JSONResponse:
+    """Run a tool on multipart ``files`` and stream its result back.
+
+    Form fields other than ``files`` are the tool's parameters. The job is
+    recorded like a UI run, so ``X-Job-Id`` can be used with ``/jobs``.
+    """
+    operation = request.path_params["tool"].replace("-", "_")
+    if operation not in operations.OPERATIONS:
+        return JSONResponse({"error": f"Unknown tool: {operation}"}, status_code=404)
+    directory = settings.UPLOADS_DIR / uuid.uuid4().hex
+    try:
+        async with request.form() as form:
+            files = [
+                value for value in form.getlist("files") if not isinstance(value, str)
+            ]
+            images = operation in operations.IMAGE_INPUTS
+            if not files:
+                return JSONResponse(
+                    {
+                        "error": f"Upload one or more {'images' if images else 'PDFs'}"
+                        " as 'files'."
+                    },
+                    status_code=400,
+                )
+            params = {key: value for key, value in form.items() if key != "files"}
+            unknown = set(params) - set(operations.operation_params(operation))
+            if unknown:
+                return JSONResponse(
+                    {"error": f"Unknown parameters: {', '.join(sorted(unknown))}"},
+                    status_code=400,
+                )
+            params = operations.normalize_params(operation, params)
+            input_paths = await asyncio.to_thread(
+                _store_inputs, files, directory, operation
+            )
+        job = await asyncio.to_thread(jobs.run_job, operation, input_paths, params)
+    except OperationError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        logging.exception(f"Error: {e}")
+        return JSONResponse(
+            {"error": f"Could not process the files: {e}"}, status_code=422
+        )
+    finally:
+        await asyncio.to_thread(shutil.rmtree, directory, True)
+    return FileResponse(
+        job["result_path"],
+        filename=job["result_name"],
+        headers={"X-Job-Id": job["id"]},
+    )
+
+
+api = Starlette(
+    routes=[
+        Route("/metrics", metrics_endpoint),
+        Route("/admin/profiling", profiling_config, methods=["GET", "PUT"]),
+        Route("/jobs/{job_id}", job_status),
+        Route("/jobs/{job_id}/download", download_job),
+        Route("/files/{key:path}", download_file),
+        Route("/jobs/{job_id}/pages/{name}", download_page),
+        Route("/batches/{batch_id}/download", download_batch),
+        Route("/uploads", create_upload, methods=["POST"]),
+        Route("/uploads/{upload_id}", upload_status, methods=["GET", "DELETE"]),
+        Route("/uploads/{upload_id}/chunks/{index:int}", upload_chunk, methods=["PUT"]),
+        Route("/thumbnails/{doc_hash}/{page:int}.jpg", thumbnail),
+        Route("/api/v1", list_tools),
+        Route("/api/v1/{tool}", run_tool, methods=["POST"]),
+    ]
+)
@@ -1,14 +1,21 @@
 import reflex as rx
-from .state import State
+from reflex.config import get_config
+from .api import api
+from .services import jobs, worker_pool
+from .state import TOOLS, State, Tool
 from .states.split_state import SplitState
 from .states.merge_state import MergeState
 from .states.compress_state import CompressState
 from .states.pdf_to_images_state import PDFToImagesState
 from .states.extract_pages_state import ExtractPagesState
 from .states.rotate_pages_state import RotatePagesState
+from .states.pipeline_state import PipelineState
+from .states.images_to_pdf_state import ImagesToPDFState
+from .states.watermark_state import WatermarkState
+from .states.extract_text_state import ExtractTextState
 
 
-def tool_card(tool: dict) -> rx.Component:
+def tool_card(tool: Tool) -> rx.Component:
     """
     Renders a single tool card with Material Design styling.
 
@@ -67,7 +74,11 @@ def header() -> rx.Component:
                     ),
                 ),
                 rx.el.h3(
-                    State.subtitle_text,
+                    rx.cond(
+                        State.language == "en",
+                        "Quick tools for PDF manipulation.",
+                        "Herramientas rápidas para manipulación de PDFs.",
+                    ),
                     class_name=rx.cond(
                         State.is_dark,
                         "text-sm font-bold text-[#ECEFF4]",
@@ -137,6 +148,14 @@ def footer() -> rx.Component:
     )
 
 
+def tool_grid(tools: list[Tool]) -> rx.Component:
+    """The cards of every tool, in one language."""
+    return rx.el.div(
+        *[tool_card(tool) for tool in tools],
+        class_name="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8",
+    )
+
+
 @rx.page(route="/", title="PDF-O-Matic", description="PDF-O-Matic Home")
 def index() -> rx.Component:
     """
@@ -149,9 +168,10 @@ def index() -> rx.Component:
         header(),
         rx.el.main(
             rx.el.div(
-                rx.el.div(
-                    rx.foreach(State.tools, tool_card),
-                    class_name="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8",
+                rx.cond(
+                    State.language == "en",
+                    tool_grid(TOOLS["en"]),
+                    tool_grid(TOOLS["es"]),
                 ),
                 class_name="container mx-auto p-8",
             ),
@@ -174,7 +194,11 @@ def tool_page_layout(title: str, *children) -> rx.Component:
             rx.el.div(
                 rx.el.a(
                     rx.icon("arrow-left", class_name="h-4 w-4 mr-2"),
-                    State.back_to_tools_text,
+                    rx.cond(
+                        State.language == "en",
+                        "Back to Tools",
+                        "Cambiar de Herramienta",
+                    ),
                     href="/",
                     class_name=rx.cond(
                         State.is_dark,
@@ -204,10 +228,59 @@ def tool_page_layout(title: str, *children) -> rx.Component:
     )
 
 
+def resumable_upload(state: rx.State, upload_id: str) -> rx.Component:
+    """A chunked, resumable upload for very large PDFs."""
+    input_id = f"{upload_id}_resumable"
+    progress_id = f"{upload_id}_progress"
+    return rx.el.details(
+        rx.el.summary(
+            rx.cond(
+                State.language == "en",
+                "Large file or unstable connection? Use the resumable upload",
+                "¿Archivo grande o conexión inestable? Usa la subida reanudable",
+            ),
+            class_name="cursor-pointer text-sm text-[#88C0D0]",
+        ),
+        rx.el.div(
+            rx.el.input(
+                type="file",
+                accept=".pdf,application/pdf",
+                id=input_id,
+                class_name="text-sm",
+            ),
+            rx.el.button(
+                rx.cond(State.language == "en", "Upload", "Subir"),
+                on_click=rx.call_script(
+                    f"pdfOMaticUpload('{input_id}', '{get_config().api_url}', '{progress_id}')",
+                    callback=state.attach_upload,
+                ),
+                class_name="py-1 px-3 rounded-md text-white bg-[#5E81AC] hover:bg-[#81A1C1] transition-colors",
+            ),
+            rx.el.span(id=progress_id, class_name="text-sm"),
+            class_name="flex items-center gap-2 mt-2",
+        ),
+        class_name="mt-4",
+    )
+
+
+IMAGE_TYPES = {
+    "image/jpeg": [".jpg", ".jpeg"],
+    "image/png": [".png"],
+    "image/tiff": [".tif", ".tiff"],
+    "image/gif": [".gif"],
+    "image/bmp": [".bmp"],
+    "image/webp": [".webp"],
+}
+
+
 def file_upload_component(
-    state: rx.State, handler: rx.event.EventType, multiple: bool, upload_id: str
+    state: rx.State,
+    handler: rx.event.EventType,
+    multiple: bool,
+    upload_id: str,
+    images: bool = False,
 ) -> rx.Component:
-    """A reusable file upload component."""
+    """A reusable file upload component; ``images`` makes it take images instead of PDFs."""
     return rx.el.div(
         rx.upload.root(
             rx.el.div(
@@ -224,7 +297,13 @@ def file_upload_component(
                 ),
                 rx.el.span(
                     rx.cond(
-                        State.language == "en", "PDF files only", "Solo archivos PDF"
+                        State.language == "en",
+                        "JPEG, PNG, TIFF, GIF, BMP or WebP images"
+                        if images
+                        else "PDF files only",
+                        "Imágenes JPEG, PNG, TIFF, GIF, BMP o WebP"
+                        if images
+                        else "Solo archivos PDF",
                     ),
                     class_name=rx.cond(
                         State.is_dark,
@@ -237,9 +316,9 @@ def file_upload_component(
                 _hover={"border_color": "#88C0D0"},
             ),
             id=upload_id,
-            accept={"application/pdf": [".pdf"]},
+            accept=IMAGE_TYPES if images else {"application/pdf": [".pdf"]},
             multiple=multiple,
-            max_files=rx.cond(multiple, 50, 1),
+            max_files=(500 if images else 50) if multiple else 1,
             class_name="w-full",
         ),
         rx.el.div(
@@ -261,6 +340,7 @@ def file_upload_component(
             on_click=handler(rx.upload_files(upload_id=upload_id)),
             class_name="mt-4 w-full py-2 px-4 rounded-md text-white bg-[#5E81AC] hover:bg-[#81A1C1] transition-colors",
         ),
+        rx.fragment() if images else resumable_upload(state, upload_id),
         rx.cond(
             state.error_message != "",
             rx.el.div(
@@ -299,6 +379,178 @@ def processed_message(state: rx.State) -> rx.Component:
     )
 
 
+def redownload_link(state: rx.State) -> rx.Component:
+    """A link to download the stored result of the last job again."""
+    return rx.cond(
+        state.download_url != "",
+        rx.el.div(
+            rx.el.a(
+                rx.icon(tag="download", class_name="w-4 h-4 mr-2"),
+                rx.cond(
+                    State.language == "en",
+                    f"Download again (job {state.job_id})",
+                    f"Descargar de nuevo (trabajo {state.job_id})",
+                ),
+                href=state.download_url,
+                class_name="flex items-center text-sm text-[#88C0D0] hover:underline",
+            ),
+            class_name="mt-4 w-full max-w-lg mx-auto",
+        ),
+    )
+
+
+def rendered_pages_list(state: rx.State) -> rx.Component:
+    """Conversion progress, with a link to each page as soon as it is ready."""
+
+    def page_link(index: rx.Var) -> rx.Component:
+        page = index + 1
+        # Named as ``operations.page_image_name`` names them; the prefix
+        # holds the URL-encoded stem, since file names can have any character.
+        name = f"{state.page_stem}_page_{page}.png"
+        return rx.el.a(
+            rx.icon(tag="image", class_name="w-4 h-4 mr-1"),
+            page,
+            href=f"{state.page_url_prefix}{page}.png",
+            title=name,
+            class_name="flex items-center text-sm text-[#88C0D0] hover:underline",
+        )
+
+    return rx.cond(
+        state.rendered_count > 0,
+        rx.el.div(
+            rx.el.p(
+                rx.cond(
+                    State.language == "en",
+                    f"{state.rendered_count} of {state.total_pages} pages ready",
+                    f"{state.rendered_count} de {state.total_pages} páginas listas",
+                ),
+                class_name="text-sm mb-1",
+            ),
+            rx.el.progress(
+                value=state.rendered_count,
+                max=state.total_pages,
+                class_name="w-full mb-2",
+            ),
+            rx.el.div(
+                rx.foreach(rx.Var.range(state.rendered_count), page_link),
+                class_name="flex flex-wrap gap-3 max-h-48 overflow-y-auto",
+            ),
+            class_name="mt-4 w-full max-w-lg mx-auto",
+        ),
+    )
+
+
+def linearize_option(state: rx.State) -> rx.Component:
+    """A checkbox to linearize the result for fast web view."""
+    return rx.el.label(
+        rx.el.input(
+            type="checkbox",
+            checked=state.linearize,
+            on_change=state.toggle_linearize,
+            class_name="mr-2",
+        ),
+        rx.cond(
+            State.language == "en",
+            "Optimize for fast web view",
+            "Optimizar para vista web rápida",
+        ),
+        class_name=rx.cond(
+            State.is_dark,
+            "flex items-center text-sm text-[#D8DEE9] mb-4",
+            "flex items-center text-sm text-[#4C566A] mb-4",
+        ),
+    )
+
+
+def batch_files_message(state: rx.State) -> rx.Component:
+    """How many files a batch upload holds, shown instead of a single file."""
+    return rx.cond(
+        state.batch_files.length() > 0,
+        rx.el.p(
+            rx.cond(
+                State.language == "en",
+                f"{state.batch_files.length()} files selected. The same settings are applied to all of them.",
+                f"{state.batch_files.length()} archivos seleccionados. Se aplicará la misma configuración a todos.",
+            ),
+            class_name=rx.cond(
+                State.is_dark,
+                "text-sm text-[#D8DEE9] mb-4",
+                "text-sm text-[#4C566A] mb-4",
+            ),
+        ),
+    )
+
+
+def page_thumbnails(state: rx.State, pickable: bool = True) -> rx.Component:
+    """A grid of page previews, loaded as they scroll into view.
+
+    With ``pickable``, clicking a preview calls ``state.toggle_page`` and the
+    pages in ``state.selected_pages`` are highlighted. Otherwise previews are
+    shown turned by ``state.rotation_angle``.
+    """
+
+    def thumbnail(index: rx.Var) -> rx.Component:
+        page = index + 1
+        image = rx.el.img(
+            src=f"{state.thumbnails_url}/{page}.jpg",
+            alt=page.to_string(),
+            loading="lazy",
+            class_name="w-full aspect-[3/4] object-contain bg-white rounded",
+            style=(
+                {} if pickable else {"transform": f"rotate({state.rotation_angle}deg)"}
+            ),
+        )
+        label = rx.el.span(page, class_name="text-xs")
+        if not pickable:
+            return rx.el.div(
+                image, label, class_name="flex flex-col items-center gap-1 p-1"
+            )
+        return rx.el.button(
+            image,
+            label,
+            on_click=state.toggle_page(page),
+            type="button",
+            class_name=rx.cond(
+                state.selected_pages.contains(page),
+                "flex flex-col items-center gap-1 p-1 rounded ring-2 ring-[#88C0D0]",
+                "flex flex-col items-center gap-1 p-1 rounded opacity-80 hover:opacity-100",
+            ),
+        )
+
+    return rx.cond(
+        state.thumbnail_count > 0,
+        rx.el.div(
+            rx.foreach(rx.Var.range(state.thumbnail_count), thumbnail),
+            class_name="grid grid-cols-4 gap-2 max-h-96 overflow-y-auto mb-4",
+        ),
+    )
+
+
+def batch_status(state: rx.State) -> rx.Component:
+    """The outcome of each file of the last batch."""
+    return rx.cond(
+        state.batch_results.length() > 0,
+        rx.el.div(
+            rx.foreach(
+                state.batch_results,
+                lambda item: rx.el.div(
+                    rx.cond(
+                        item["status"] == "done",
+                        rx.icon(
+                            tag="square_check", class_name="w-4 h-4 text-green-500"
+                        ),
+                        rx.icon(tag="square_x", class_name="w-4 h-4 text-[#BF616A]"),
+                    ),
+                    rx.el.span(item["name"], class_name="font-medium"),
+                    rx.el.span(item["error"], class_name="text-[#BF616A] truncate"),
+                    class_name="flex items-center gap-2 text-sm",
+                ),
+            ),
+            class_name="mt-4 w-full max-w-lg mx-auto space-y-1",
+        ),
+    )
+
+
 @rx.page(route="/split-pdf", title="Split PDF", description="PDF-o-Matic Split Tool")
 def split_pdf() -> rx.Component:
     return tool_page_layout(
@@ -321,6 +573,7 @@ def split_pdf() -> rx.Component:
                         "text-sm text-[#4C566A] mb-2",
                     ),
                 ),
+                page_thumbnails(SplitState),
                 rx.el.input(
                     placeholder=rx.cond(
                         State.language == "en",
@@ -330,8 +583,9 @@ def split_pdf() -> rx.Component:
                     on_change=SplitState.set_split_ranges,
                     class_name="w-full p-2 border rounded-md bg-transparent mb-4",
                     border_color=rx.cond(State.is_dark, "#4C566A", "#D1D5DB"),
-                    default_value=SplitState.split_ranges,
+                    value=SplitState.split_ranges,
                 ),
+                linearize_option(SplitState),
                 rx.el.button(
                     rx.cond(
                         State.language == "en",
@@ -345,6 +599,46 @@ def split_pdf() -> rx.Component:
                 class_name="mt-6 w-full max-w-lg mx-auto",
             ),
         ),
+        redownload_link(SplitState),
+    )
+
+
+def merge_file(file: rx.Var, index: rx.Var) -> rx.Component:
+    """One file of the merge, with its page selection and controls to reorder it."""
+    return rx.el.li(
+        rx.el.div(
+            rx.el.span(f"{index + 1}. {file['name']}", class_name="truncate"),
+            rx.el.div(
+                rx.el.button(
+                    rx.icon(tag="arrow-up", class_name="w-4 h-4"),
+                    on_click=MergeState.move_file(index, -1),
+                ),
+                rx.el.button(
+                    rx.icon(tag="arrow-down", class_name="w-4 h-4"),
+                    on_click=MergeState.move_file(index, 1),
+                ),
+                rx.el.button(
+                    rx.icon(tag="x", class_name="w-4 h-4"),
+                    on_click=MergeState.remove_file(index),
+                    class_name="text-[#BF616A]",
+                ),
+                class_name="flex gap-2 shrink-0",
+            ),
+            class_name="flex justify-between items-center gap-2",
+        ),
+        rx.el.input(
+            placeholder=rx.cond(
+                State.language == "en",
+                f"All {file['pages']} pages (e.g., 1-3,5)",
+                f"Las {file['pages']} páginas (ej., 1-3,5)",
+            ),
+            default_value=file["selection"],
+            on_blur=lambda value: MergeState.set_selection(index, value),
+            class_name="w-full p-1 mt-1 border rounded-md bg-transparent",
+            border_color=rx.cond(State.is_dark, "#4C566A", "#D1D5DB"),
+        ),
+        key=file["name"],
+        class_name="py-2",
     )
 
 
@@ -356,20 +650,36 @@ def merge_pdf() -> rx.Component:
             MergeState, MergeState.handle_upload, True, "merge_upload"
         ),
         rx.cond(
-            MergeState.uploaded_files.length() > 0,
+            MergeState.files.length() > 0,
             rx.el.div(
-                rx.el.p(
-                    rx.cond(
-                        State.language == "en",
-                        f"{MergeState.uploaded_files.length()} files selected.",
-                        f"{MergeState.uploaded_files.length()} archivos seleccionados.",
+                rx.el.div(
+                    rx.el.p(
+                        rx.cond(
+                            State.language == "en",
+                            f"{MergeState.files.length()} files selected.",
+                            f"{MergeState.files.length()} archivos seleccionados.",
+                        ),
+                    ),
+                    rx.el.button(
+                        rx.cond(State.language == "en", "Clear", "Quitar todos"),
+                        on_click=MergeState.clear_files,
+                        class_name="text-[#BF616A]",
                     ),
+                    class_name=rx.cond(
+                        State.is_dark,
+                        "flex justify-between text-sm text-[#D8DEE9]",
+                        "flex justify-between text-sm text-[#4C566A]",
+                    ),
+                ),
+                rx.el.ol(
+                    rx.foreach(MergeState.files, merge_file),
                     class_name=rx.cond(
                         State.is_dark,
                         "text-sm text-[#D8DEE9] mb-4",
                         "text-sm text-[#4C566A] mb-4",
                     ),
                 ),
+                linearize_option(MergeState),
                 rx.el.button(
                     rx.cond(
                         State.language == "en",
@@ -383,6 +693,7 @@ def merge_pdf() -> rx.Component:
                 class_name="mt-6 w-full max-w-lg mx-auto",
             ),
         ),
+        redownload_link(MergeState),
     )
 
 
@@ -393,11 +704,14 @@ def compress_pdf() -> rx.Component:
     return tool_page_layout(
         rx.cond(State.language == "en", "Compress PDF", "Comprimir PDF"),
         file_upload_component(
-            CompressState, CompressState.handle_upload, False, "compress_upload"
+            CompressState, CompressState.handle_upload, True, "compress_upload"
         ),
         rx.cond(
-            CompressState.uploaded_file != "",
+            (CompressState.uploaded_file != "")
+            | (CompressState.batch_files.length() > 0),
             rx.el.div(
+                batch_files_message(CompressState),
+                linearize_option(CompressState),
                 rx.el.button(
                     rx.cond(
                         State.language == "en",
@@ -411,6 +725,8 @@ def compress_pdf() -> rx.Component:
                 class_name="mt-6 w-full max-w-lg mx-auto",
             ),
         ),
+        batch_status(CompressState),
+        redownload_link(CompressState),
     )
 
 
@@ -420,12 +736,14 @@ def pdf_to_images() -> rx.Component:
         file_upload_component(
             PDFToImagesState,
             PDFToImagesState.handle_upload,
-            False,
+            True,
             "pdf_to_images_upload",
         ),
         rx.cond(
-            PDFToImagesState.uploaded_file != "",
+            (PDFToImagesState.uploaded_file != "")
+            | (PDFToImagesState.batch_files.length() > 0),
             rx.el.div(
+                batch_files_message(PDFToImagesState),
                 rx.el.button(
                     rx.cond(
                         State.language == "en",
@@ -439,6 +757,64 @@ def pdf_to_images() -> rx.Component:
                 class_name="mt-6 w-full max-w-lg mx-auto",
             ),
         ),
+        rendered_pages_list(PDFToImagesState),
+        batch_status(PDFToImagesState),
+        redownload_link(PDFToImagesState),
+    )
+
+
+@rx.page(
+    route="/images-to-pdf",
+    title="Images to PDF",
+    description="PDF-o-Matic Images to PDF Tool",
+)
+def images_to_pdf() -> rx.Component:
+    return tool_page_layout(
+        rx.cond(State.language == "en", "Images to PDF", "Imágenes a PDF"),
+        file_upload_component(
+            ImagesToPDFState,
+            ImagesToPDFState.handle_upload,
+            True,
+            "images_to_pdf_upload",
+            images=True,
+        ),
+        rx.cond(
+            ImagesToPDFState.uploaded_files.length() > 0,
+            rx.el.div(
+                rx.el.div(
+                    rx.el.p(
+                        rx.cond(
+                            State.language == "en",
+                            f"{ImagesToPDFState.uploaded_files.length()} images selected, one page each.",
+                            f"{ImagesToPDFState.uploaded_files.length()} imágenes seleccionadas, una página cada una.",
+                        ),
+                    ),
+                    rx.el.button(
+                        rx.cond(State.language == "en", "Clear", "Quitar todas"),
+                        on_click=ImagesToPDFState.clear_files,
+                        class_name="text-[#BF616A]",
+                    ),
+                    class_name=rx.cond(
+                        State.is_dark,
+                        "flex justify-between text-sm text-[#D8DEE9] mb-4",
+                        "flex justify-between text-sm text-[#4C566A] mb-4",
+                    ),
+                ),
+                linearize_option(ImagesToPDFState),
+                rx.el.button(
+                    rx.cond(
+                        State.language == "en",
+                        "Create PDF & Download",
+                        "Crear PDF y Descargar",
+                    ),
+                    on_click=ImagesToPDFState.images_to_pdf,
+                    class_name="w-full py-2 px-4 rounded-md text-white bg-[#5E81AC] hover:bg-[#81A1C1] transition-colors",
+                ),
+                processed_message(ImagesToPDFState),
+                class_name="mt-6 w-full max-w-lg mx-auto",
+            ),
+        ),
+        redownload_link(ImagesToPDFState),
     )
 
 
@@ -453,24 +829,33 @@ def extract_pages() -> rx.Component:
         file_upload_component(
             ExtractPagesState,
             ExtractPagesState.handle_upload,
-            False,
+            True,
             "extract_pages_upload",
         ),
         rx.cond(
-            ExtractPagesState.uploaded_file != "",
+            (ExtractPagesState.uploaded_file != "")
+            | (ExtractPagesState.batch_files.length() > 0),
             rx.el.div(
-                rx.el.p(
-                    rx.cond(
-                        State.language == "en",
-                        f"Total pages: {ExtractPagesState.total_pages}",
-                        f"Páginas totales: {ExtractPagesState.total_pages}",
-                    ),
-                    class_name=rx.cond(
-                        State.is_dark,
-                        "text-sm text-[#D8DEE9] mb-2",
-                        "text-sm text-[#4C566A] mb-2",
+                batch_files_message(ExtractPagesState),
+                rx.cond(
+                    ExtractPagesState.uploaded_file != "",
+                    rx.el.p(
+                        rx.cond(
+                            State.language == "en",
+                            f"Total pages: {ExtractPagesState.total_pages}",
+                            f"Páginas totales: {ExtractPagesState.total_pages}",
+                        ),
+                        class_name=rx.cond(
+                            State.is_dark,
+                            "text-sm text-[#D8DEE9] mb-2",
+                            "text-sm text-[#4C566A] mb-2",
+                        ),
                     ),
                 ),
+                rx.cond(
+                    ExtractPagesState.uploaded_file != "",
+                    page_thumbnails(ExtractPagesState),
+                ),
                 rx.el.input(
                     placeholder=rx.cond(
                         State.language == "en",
@@ -480,8 +865,9 @@ def extract_pages() -> rx.Component:
                     on_change=ExtractPagesState.set_page_selection,
                     class_name="w-full p-2 border rounded-md bg-transparent mb-4",
                     border_color=rx.cond(State.is_dark, "#4C566A", "#D1D5DB"),
-                    default_value=ExtractPagesState.page_selection,
+                    value=ExtractPagesState.page_selection,
                 ),
+                linearize_option(ExtractPagesState),
                 rx.el.button(
                     rx.cond(
                         State.language == "en",
@@ -495,6 +881,8 @@ def extract_pages() -> rx.Component:
                 class_name="mt-6 w-full max-w-lg mx-auto",
             ),
         ),
+        batch_status(ExtractPagesState),
+        redownload_link(ExtractPagesState),
     )
 
 
@@ -507,12 +895,14 @@ def rotate_pages() -> rx.Component:
         file_upload_component(
             RotatePagesState,
             RotatePagesState.handle_upload,
-            False,
+            True,
             "rotate_pages_upload",
         ),
         rx.cond(
-            RotatePagesState.uploaded_file != "",
+            (RotatePagesState.uploaded_file != "")
+            | (RotatePagesState.batch_files.length() > 0),
             rx.el.div(
+                batch_files_message(RotatePagesState),
                 rx.el.select(
                     rx.el.option(
                         rx.cond(
@@ -540,6 +930,11 @@ def rotate_pages() -> rx.Component:
                     _hover={"border_color": "#88C0D0"},
                     border_color=rx.cond(State.is_dark, "#4C566A", "#D1D5DB"),
                 ),
+                rx.cond(
+                    RotatePagesState.uploaded_file != "",
+                    page_thumbnails(RotatePagesState, pickable=False),
+                ),
+                linearize_option(RotatePagesState),
                 rx.el.button(
                     rx.cond(
                         State.language == "en",
@@ -553,6 +948,345 @@ def rotate_pages() -> rx.Component:
                 class_name="mt-6 w-full max-w-lg mx-auto",
             ),
         ),
+        batch_status(RotatePagesState),
+        redownload_link(RotatePagesState),
+    )
+
+
+WATERMARK_POSITION_LABELS = {
+    "diagonal": ("Diagonal, across the page", "En diagonal, a lo ancho"),
+    "center": ("Center", "Centro"),
+    "top": ("Top", "Arriba"),
+    "bottom": ("Bottom", "Abajo"),
+    "top-left": ("Top left", "Arriba a la izquierda"),
+    "top-right": ("Top right", "Arriba a la derecha"),
+    "bottom-left": ("Bottom left", "Abajo a la izquierda"),
+    "bottom-right": ("Bottom right", "Abajo a la derecha"),
+}
+
+
+@rx.page(route="/watermark", title="Watermark", description="PDF-o-Matic Watermark")
+def watermark() -> rx.Component:
+    field_class = "w-full p-2 border rounded-md bg-transparent mb-4"
+    field_border = rx.cond(State.is_dark, "#4C566A", "#D1D5DB")
+    return tool_page_layout(
+        rx.cond(State.language == "en", "Watermark", "Marca de Agua"),
+        file_upload_component(
+            WatermarkState, WatermarkState.handle_upload, True, "watermark_upload"
+        ),
+        rx.cond(
+            (WatermarkState.uploaded_file != "")
+            | (WatermarkState.batch_files.length() > 0),
+            rx.el.div(
+                batch_files_message(WatermarkState),
+                rx.cond(
+                    WatermarkState.logo_file == "",
+                    rx.el.div(
+                        rx.el.input(
+                            placeholder=rx.cond(
+                                State.language == "en",
+                                "Stamp text, e.g. CONFIDENTIAL",
+                                "Texto del sello, ej. CONFIDENCIAL",
+                            ),
+                            on_change=WatermarkState.set_text,
+                            value=WatermarkState.text,
+                            class_name=field_class,
+                            border_color=field_border,
+                        ),
+                        rx.upload.root(
+                            rx.el.span(
+                                rx.cond(
+                                    State.language == "en",
+                                    "Or drop a logo image here",
+                                    "O suelta aquí la imagen de un logo",
+                                ),
+                                class_name="text-sm text-[#88C0D0] cursor-pointer",
+                            ),
+                            id="watermark_logo_upload",
+                            accept=IMAGE_TYPES,
+                            max_files=1,
+                            on_drop=WatermarkState.handle_logo_upload(
+                                rx.upload_files(upload_id="watermark_logo_upload")
+                            ),
+                            class_name="mb-4",
+                        ),
+                    ),
+                    rx.el.div(
+                        rx.el.span(
+                            rx.cond(State.language == "en", "Logo: ", "Logo: "),
+                            WatermarkState.logo_file,
+                        ),
+                        rx.el.button(
+                            rx.icon(tag="x", class_name="w-4 h-4"),
+                            on_click=WatermarkState.remove_logo,
+                            class_name="text-[#BF616A]",
+                        ),
+                        class_name="flex justify-between items-center text-sm mb-4",
+                    ),
+                ),
+                rx.el.input(
+                    placeholder=rx.cond(
+                        State.language == "en",
+                        "Pages to stamp (e.g., 1-3,5); empty for all",
+                        "Páginas a sellar (ej., 1-3,5); vacío para todas",
+                    ),
+                    on_change=WatermarkState.set_pages,
+                    value=WatermarkState.pages,
+                    class_name=field_class,
+                    border_color=field_border,
+                ),
+                rx.el.select(
+                    *[
+                        rx.el.option(
+                            rx.cond(State.language == "en", en, es), value=name
+                        )
+                        for name, (en, es) in WATERMARK_POSITION_LABELS.items()
+                    ],
+                    value=WatermarkState.position,
+                    on_change=WatermarkState.set_position,
+                    class_name=field_class,
+                    border_color=field_border,
+                ),
+                rx.el.label(
+                    rx.cond(State.language == "en", "Opacity", "Opacidad"),
+                    rx.el.input(
+                        type="range",
+                        min=5,
+                        max=100,
+                        step=5,
+                        default_value=(WatermarkState.opacity * 100).to_string(),
+                        on_change=WatermarkState.set_opacity.debounce(200),
+                        class_name="w-full",
+                    ),
+                    class_name="flex items-center gap-2 text-sm mb-4",
+                ),
+                linearize_option(WatermarkState),
+                rx.el.button(
+                    rx.cond(
+                        State.language == "en",
+                        "Stamp PDF & Download",
+                        "Sellar PDF y Descargar",
+                    ),
+                    on_click=WatermarkState.watermark_pdf,
+                    class_name="w-full py-2 px-4 rounded-md text-white bg-[#5E81AC] hover:bg-[#81A1C1] transition-colors",
+                ),
+                processed_message(WatermarkState),
+                class_name="mt-6 w-full max-w-lg mx-auto",
+            ),
+        ),
+        batch_status(WatermarkState),
+        redownload_link(WatermarkState),
+    )
+
+
+@rx.page(
+    route="/extract-text",
+    title="Extract Text",
+    description="PDF-o-Matic Text Extractor",
+)
+def extract_text() -> rx.Component:
+    field_class = "w-full p-2 border rounded-md bg-transparent mb-4"
+    field_border = rx.cond(State.is_dark, "#4C566A", "#D1D5DB")
+    return tool_page_layout(
+        rx.cond(State.language == "en", "Extract Text", "Extraer Texto"),
+        file_upload_component(
+            ExtractTextState,
+            ExtractTextState.handle_upload,
+            True,
+            "extract_text_upload",
+        ),
+        rx.cond(
+            (ExtractTextState.uploaded_file != "")
+            | (ExtractTextState.batch_files.length() > 0),
+            rx.el.div(
+                batch_files_message(ExtractTextState),
+                rx.el.input(
+                    placeholder=rx.cond(
+                        State.language == "en",
+                        "Pages to extract (e.g., 1-3,5); empty for all",
+                        "Páginas a extraer (ej., 1-3,5); vacío para todas",
+                    ),
+                    on_change=ExtractTextState.set_pages,
+                    value=ExtractTextState.pages,
+                    class_name=field_class,
+                    border_color=field_border,
+                ),
+                rx.el.select(
+                    rx.el.option(
+                        rx.cond(
+                            State.language == "en",
+                            "NDJSON, one line per page",
+                            "NDJSON, una línea por página",
+                        ),
+                        value="ndjson",
+                    ),
+                    rx.el.option(
+                        rx.cond(State.language == "en", "Plain text", "Texto plano"),
+                        value="txt",
+                    ),
+                    value=ExtractTextState.text_format,
+                    on_change=ExtractTextState.set_text_format,
+                    class_name=field_class,
+                    border_color=field_border,
+                ),
+                rx.el.label(
+                    rx.el.input(
+                        type="checkbox",
+                        checked=ExtractTextState.layout,
+                        on_change=ExtractTextState.toggle_layout,
+                        class_name="mr-2",
+                    ),
+                    rx.cond(
+                        State.language == "en",
+                        "Group the text in blocks, with their positions",
+                        "Agrupar el texto en bloques, con sus posiciones",
+                    ),
+                    class_name=rx.cond(
+                        State.is_dark,
+                        "flex items-center text-sm text-[#D8DEE9] mb-4",
+                        "flex items-center text-sm text-[#4C566A] mb-4",
+                    ),
+                ),
+                rx.el.button(
+                    rx.cond(
+                        State.language == "en",
+                        "Extract Text & Download",
+                        "Extraer Texto y Descargar",
+                    ),
+                    on_click=ExtractTextState.extract_text,
+                    class_name="w-full py-2 px-4 rounded-md text-white bg-[#5E81AC] hover:bg-[#81A1C1] transition-colors",
+                ),
+                processed_message(ExtractTextState),
+                class_name="mt-6 w-full max-w-lg mx-auto",
+            ),
+        ),
+        batch_status(ExtractTextState),
+        redownload_link(ExtractTextState),
+    )
+
+
+PIPELINE_STEP_LABELS = {
+    "extract": ("Extract pages", "Extraer páginas"),
+    "rotate": ("Rotate", "Rotar"),
+    "compress": ("Compress", "Comprimir"),
+    "split": ("Split (last step)", "Dividir (último paso)"),
+    "pdf_to_images": ("To images (last step)", "A imágenes (último paso)"),
+}
+
+
+def pipeline_step(step: rx.Var, index: rx.Var) -> rx.Component:
+    """One step of the pipeline, with a button to remove it."""
+    return rx.el.li(
+        rx.el.span(
+            f"{index + 1}. ",
+            rx.match(
+                step["step"],
+                *[
+                    (name, rx.cond(State.language == "en", en, es))
+                    for name, (en, es) in PIPELINE_STEP_LABELS.items()
+                ],
+                step["step"],
+            ),
+            rx.cond(step["value"] != "", f": {step['value']}", ""),
+        ),
+        rx.el.button(
+            rx.icon(tag="x", class_name="w-4 h-4"),
+            on_click=PipelineState.remove_step(index),
+            class_name="text-[#BF616A]",
+        ),
+        class_name="flex justify-between items-center py-1",
+    )
+
+
+@rx.page(route="/pipeline", title="Pipeline", description="PDF-o-Matic Pipeline")
+def pipeline() -> rx.Component:
+    return tool_page_layout(
+        rx.cond(State.language == "en", "Pipeline", "Flujo de Trabajo"),
+        file_upload_component(
+            PipelineState, PipelineState.handle_upload, True, "pipeline_upload"
+        ),
+        rx.cond(
+            (PipelineState.uploaded_file != "")
+            | (PipelineState.batch_files.length() > 0),
+            rx.el.div(
+                batch_files_message(PipelineState),
+                rx.el.ol(
+                    rx.foreach(PipelineState.steps, pipeline_step),
+                    class_name=rx.cond(
+                        State.is_dark,
+                        "text-sm text-[#D8DEE9] mb-4",
+                        "text-sm text-[#4C566A] mb-4",
+                    ),
+                ),
+                rx.el.div(
+                    rx.el.select(
+                        *[
+                            rx.el.option(
+                                rx.cond(State.language == "en", en, es), value=name
+                            )
+                            for name, (en, es) in PIPELINE_STEP_LABELS.items()
+                        ],
+                        value=PipelineState.new_step,
+                        on_change=PipelineState.set_new_step,
+                        class_name="p-2 border rounded-md bg-transparent",
+                        border_color=rx.cond(State.is_dark, "#4C566A", "#D1D5DB"),
+                    ),
+                    rx.cond(
+                        PipelineState.new_step != "compress",
+                        rx.el.input(
+                            placeholder=rx.match(
+                                PipelineState.new_step,
+                                (
+                                    "rotate",
+                                    rx.cond(
+                                        State.language == "en",
+                                        "Angle (90, 180, 270)",
+                                        "Ángulo (90, 180, 270)",
+                                    ),
+                                ),
+                                (
+                                    "pdf_to_images",
+                                    rx.cond(
+                                        State.language == "en",
+                                        "Resolution (DPI)",
+                                        "Resolución (DPI)",
+                                    ),
+                                ),
+                                rx.cond(
+                                    State.language == "en",
+                                    "Pages (e.g., 1-3, 5)",
+                                    "Páginas (ej: 1-3, 5)",
+                                ),
+                            ),
+                            value=PipelineState.new_value,
+                            on_change=PipelineState.set_new_value,
+                            class_name="flex-1 p-2 border rounded-md bg-transparent",
+                            border_color=rx.cond(State.is_dark, "#4C566A", "#D1D5DB"),
+                        ),
+                    ),
+                    rx.el.button(
+                        rx.cond(State.language == "en", "Add step", "Añadir paso"),
+                        on_click=PipelineState.add_step,
+                        class_name="py-2 px-4 rounded-md text-white bg-[#4C566A] hover:bg-[#5E81AC] transition-colors",
+                    ),
+                    class_name="flex gap-2 mb-4",
+                ),
+                linearize_option(PipelineState),
+                rx.el.button(
+                    rx.cond(
+                        State.language == "en",
+                        "Run Pipeline & Download",
+                        "Ejecutar y Descargar",
+                    ),
+                    on_click=PipelineState.run_pipeline,
+                    class_name="w-full py-2 px-4 rounded-md text-white bg-[#5E81AC] hover:bg-[#81A1C1] transition-colors",
+                ),
+                processed_message(PipelineState),
+                class_name="mt-6 w-full max-w-lg mx-auto",
+            ),
+        ),
+        batch_status(PipelineState),
+        redownload_link(PipelineState),
     )
 
 
@@ -561,4 +1295,10 @@ app = rx.App(
     stylesheets=[
         "https://fonts.googleapis.com/css2?family=Red+Hat+Display:wght@300;400;500;600;700;800;900&display=swap"
     ],
+    api_transformer=api,
+    head_components=[rx.script(src="/chunked_upload.js")],
+)
+app.register_lifespan_task(worker_pool.lifespan)
+app.register_lifespan_task(
+    jobs.maintenance_task, session_uploads_dir=rx.get_upload_dir()
 )
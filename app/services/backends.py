@@ -0,0 +1,57 @@
+"""Chooses between the pypdf and PyMuPDF implementations of each operation.
+
+PyMuPDF is the default. ``PDF_O_MATIC_PDF_BACKEND`` (or ``forced``) pins
+every operation to one backend, which is how ``benchmarks/backends.py``
+checks that both produce equivalent output. Operations one backend cannot
+do ignore the override.
+"""
+
+from contextvars import ContextVar
+from .. import settings
+import contextlib
+
+AUTO = "auto"
+PYPDF = "pypdf"
+PYMUPDF = "pymupdf"
+BACKENDS = (PYPDF, PYMUPDF)
+
+# pypdf cannot render pages, pipelines keep one PyMuPDF document in memory
+# across their steps, stamps are drawn with PyMuPDF's text and image support,
+# and only PyMuPDF reports where each block of text is.
+ONLY = {
+    "pdf_to_images": PYMUPDF,
+    "pipeline": PYMUPDF,
+    "watermark": PYMUPDF,
+    "extract_text": PYMUPDF,
+}
+
+# Operations both backends implement. ``python -m benchmarks.backends`` found
+# PyMuPDF faster on every case, from a 1 KB page (1.2-2.7x) to 5000 pages
+# (up to 47x), with compress output about half the size, so there is no
+# input size at which pypdf would be picked by default.
+BOTH = {"split", "merge", "compress", "extract", "rotate"}
+# Every operation that runs on one of the backends.
+OPERATIONS = BOTH | set(ONLY)
+
+_forced: ContextVar[str] = ContextVar("forced_backend", default=settings.PDF_BACKEND)
+
+
+@contextlib.contextmanager
+def forced(name: str):
+    """Run every operation in the block with backend ``name`` (or ``auto``)."""
+    if name not in (AUTO, *BACKENDS):
+        raise ValueError(f"Unknown PDF backend: {name}")
+    token = _forced.set(name)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
+
+
+def select(operation: str) -> str:
+    """Return the backend to run ``operation`` with."""
+    if operation in ONLY:
+        return ONLY[operation]
+    if _forced.get() in BACKENDS:
+        return _forced.get()
+    return PYMUPDF
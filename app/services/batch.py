@@ -0,0 +1,117 @@
+"""Runs one operation over many files and streams the results as one archive."""
+
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .. import settings
+from . import jobs
+from .job_store import DONE, FAILED, Batch, BatchItem, store
+from .storage import storage
+import io
+import json
+import logging
+import time
+import zipfile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _run_item(
+    operation: str, input_path: Path, params: dict, shared: list[Path]
+) -> BatchItem:
+    job = jobs.create_job(operation, [input_path, *shared], params)
+    item = BatchItem(name=input_path.name, job_id=job["id"], status=DONE, error="")
+    try:
+        jobs.execute(job)
+    except Exception as e:
+        logging.exception(f"Error: {e}")
+        item.update(status=FAILED, error=str(e))
+    return item
+
+
+def run_batch(
+    operation: str,
+    input_paths: list[Path],
+    params: dict,
+    shared: list[Path] | None = None,
+) -> Batch:
+    """Run ``operation`` on each file in parallel and record the batch.
+
+    ``shared`` files, such as a stamp, follow each file in its run's inputs.
+    A file that fails does not stop the others; its error is kept in the
+    batch instead.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, settings.WORKERS)) as executor:
+        items = list(
+            executor.map(
+                lambda path: _run_item(operation, path, params, shared or []),
+                input_paths,
+            )
+        )
+    return store.create_batch(operation, items)
+
+
+class _Sink(io.RawIOBase):
+    """A write-only, unseekable buffer that is drained as the archive grows."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_name(name: str, used: set[str]) -> str:
+    candidate, n = name, 1
+    while candidate in used:
+        n += 1
+        candidate = f"{Path(name).stem}_{n}{Path(name).suffix}"
+    used.add(candidate)
+    return candidate
+
+
+def stream_archive(batch: Batch) -> Iterator[bytes]:
+    """Yield a ZIP of the batch's results plus a ``status.json`` report.
+
+    Results are stored uncompressed (they are PDFs, ZIPs and PNGs already)
+    and streamed from storage in chunks, so memory use does not grow with
+    the batch.
+    """
+    sink = _Sink()
+    items = [dict(item) for item in batch["items"]]
+    used: set[str] = set()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+        for item in items:
+            job = store.get(item["job_id"]) if item["status"] == DONE else None
+            try:
+                size = storage.size(store.result_key(job)) if job else None
+            except FileNotFoundError:
+                size = None
+            if item["status"] == DONE and size is None:
+                item.update(status=FAILED, error="Result has expired.")
+            if item["status"] != DONE:
+                continue
+            item["result"] = _unique_name(job["result_name"], used)
+            info = zipfile.ZipInfo(item["result"], time.localtime()[:6])
+            info.file_size = size
+            with (
+                storage.open(store.result_key(job)) as src,
+                zf.open(info, "w") as dst,
+            ):
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(chunk)
+                    yield sink.drain()
+        zf.writestr(
+            "status.json",
+            json.dumps({"operation": batch["operation"], "files": items}, indent=2),
+        )
+    yield sink.drain()
@@ -0,0 +1,59 @@
+"""Opens stored PDFs through a read-only memory map.
+
+pypdf and PyMuPDF both read straight from the mapping, so a document is
+never copied into a Python ``bytes`` object, and jobs working on the same
+file share the kernel's page cache instead of each holding its own copy.
+"""
+
+from collections.abc import Iterator
+from pathlib import Path
+from .metrics import stage
+import contextlib
+import mmap
+
+
+@contextlib.contextmanager
+def mapped(path: Path) -> Iterator[mmap.mmap]:
+    """Map ``path`` read-only for the duration of the block."""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            raise ValueError(f"{Path(path).name} is empty.")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+@contextlib.contextmanager
+def pypdf_reader(path: Path):
+    """Yield a ``pypdf.PdfReader`` over the mapped file.
+
+    The reader loads objects lazily, so it (and any writer holding its
+    pages) must be used inside the block.
+    """
+    import pypdf
+
+    with mapped(path) as mm:
+        with stage("parse") as parse_span:
+            reader = pypdf.PdfReader(mm)
+            parse_span.set(pages=len(reader.pages))
+        yield reader
+
+
+@contextlib.contextmanager
+def pymupdf_document(path: Path):
+    """Yield a ``pymupdf.Document`` over the mapped file."""
+    import pymupdf
+
+    with mapped(path) as mm, memoryview(mm) as view:
+        with stage("parse") as parse_span:
+            doc = pymupdf.open(stream=view, filetype="pdf")
+            parse_span.set(pages=doc.page_count)
+        try:
+            yield doc
+        finally:
+            doc.close()
+
+
+def page_count(path: Path) -> int:
+    """Return the number of pages of the PDF at ``path``."""
+    with pymupdf_document(path) as doc:
+        return doc.page_count
@@ -0,0 +1,17 @@
+"""Content hashing for uploaded documents."""
+
+import hashlib
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_files(paths: list[Path]) -> str:
+    """Return a SHA-256 digest over the contents of the files, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(f"{path.stat().st_size}:".encode())
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,236 @@
+"""Builds a PDF with one page per image, streamed straight to the output.
+
+JPEGs are embedded as they are, as DCT streams: their bytes are copied from
+disk without being decoded, so they keep their exact quality and cost little
+more than the copy. Other images are decoded and stored losslessly with
+Flate, several at a time on threads, while earlier pages are being written.
+"""
+
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+from .metrics import add_pages, stage
+from .operations import OperationError
+import os
+import shutil
+import zlib
+
+# Images without a usable resolution are laid out at this many pixels per inch.
+DEFAULT_DPI = 96
+# Images decoded at once; each holds its compressed samples until written.
+THREADS = min(8, os.cpu_count() or 1)
+
+IMAGE_MAGIC = (
+    b"\xff\xd8\xff",
+    b"\x89PNG\r\n\x1a\n",
+    b"II*\x00",
+    b"MM\x00*",
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",
+)
+
+# EXIF orientations that are a plain rotation, as the page /Rotate showing
+# the image upright. Mirrored orientations need the pixels flipped.
+_ROTATIONS = {1: 0, 3: 180, 6: 90, 8: 270}
+
+
+def is_image(header: bytes) -> bool:
+    """Return whether ``header``, the first bytes of a file, starts an image
+    this tool reads (JPEG, PNG, TIFF, GIF, BMP or WebP)."""
+    return header.startswith(IMAGE_MAGIC) or (
+        header[:4] == b"RIFF" and header[8:12] == b"WEBP"
+    )
+
+
+class _Image(NamedTuple):
+    """One page's image: its PDF dictionary entries and where its data is."""
+
+    width: int
+    height: int
+    dpi: tuple[float, float]
+    rotate: int
+    entries: str
+    data: bytes | None = None
+    path: Path | None = None
+    smask: bytes | None = None
+
+
+def _dpi(info: dict) -> tuple[float, float]:
+    x, y = info.get("dpi") or (0, 0)
+    if x < 10 or y < 10:
+        return (DEFAULT_DPI, DEFAULT_DPI)
+    return (float(x), float(y))
+
+
+def _flate(image, dpi: tuple[float, float]) -> _Image:
+    """Return ``image``'s samples losslessly compressed, splitting off any alpha."""
+    smask = None
+    if image.mode == "P":
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    elif image.mode == "PA":
+        image = image.convert("RGBA")
+    elif image.mode not in ("1", "L", "LA", "RGB", "RGBA", "CMYK"):
+        image = image.convert("RGB")
+    if image.mode in ("LA", "RGBA"):
+        smask = zlib.compress(image.getchannel("A").tobytes())
+        image = image.convert(image.mode[:-1])
+    color_space, bits = {
+        "1": ("/DeviceGray", 1),
+        "L": ("/DeviceGray", 8),
+        "RGB": ("/DeviceRGB", 8),
+        "CMYK": ("/DeviceCMYK", 8),
+    }[image.mode]
+    return _Image(
+        image.width,
+        image.height,
+        dpi,
+        0,
+        f"/ColorSpace {color_space} /BitsPerComponent {bits} /Filter /FlateDecode",
+        data=zlib.compress(image.tobytes()),
+        smask=smask,
+    )
+
+
+def _prepare(path: Path) -> list[_Image]:
+    """Return the pages ``path`` becomes: one, or one per frame of a TIFF or GIF."""
+    import PIL.Image
+    import PIL.ImageOps
+    import PIL.ImageSequence
+
+    try:
+        image = PIL.Image.open(path)
+    except (OSError, PIL.Image.DecompressionBombError) as e:
+        raise OperationError(f"{path.name} is not a readable image.") from e
+    with image:
+        orientation = image.getexif().get(0x0112, 1)
+        if (
+            image.format == "JPEG"
+            and image.mode in ("L", "RGB", "CMYK")
+            and orientation in _ROTATIONS
+        ):
+            color_space = {"L": "Gray", "RGB": "RGB", "CMYK": "CMYK"}[image.mode]
+            entries = f"/ColorSpace /Device{color_space} /BitsPerComponent 8"
+            if image.mode == "CMYK" and "adobe" in image.info:
+                # Adobe writes CMYK JPEGs inverted.
+                entries += " /Decode [1 0 1 0 1 0 1 0]"
+            return [
+                _Image(
+                    image.width,
+                    image.height,
+                    _dpi(image.info),
+                    _ROTATIONS[orientation],
+                    entries + " /Filter /DCTDecode",
+                    path=path,
+                )
+            ]
+        dpi = _dpi(image.info)
+        return [
+            _flate(PIL.ImageOps.exif_transpose(frame), dpi)
+            for frame in PIL.ImageSequence.Iterator(image)
+        ]
+
+
+def _prepared(paths: list[Path]) -> Iterator[_Image]:
+    """Yield the images of ``paths`` in order, preparing the next ones on threads."""
+    executor = ThreadPoolExecutor(max_workers=THREADS)
+    pending = deque()
+    try:
+        for path in paths:
+            pending.append(executor.submit(_prepare, path))
+            if len(pending) > THREADS:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+class _Writer:
+    """Writes numbered PDF objects to a stream, remembering where each starts."""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.position = 0
+        self.offsets: dict[int, int] = {}
+
+    def write(self, data: bytes) -> None:
+        self.out.write(data)
+        self.position += len(data)
+
+    def object(self, number: int, body: str) -> None:
+        self.offsets[number] = self.position
+        self.write(f"{number} 0 obj\n{body}\nendobj\n".encode())
+
+    def _begin_stream(self, number: int, entries: str, length: int) -> None:
+        self.offsets[number] = self.position
+        self.write(
+            f"{number} 0 obj\n<< {entries} /Length {length} >>\nstream\n".encode()
+        )
+
+    def stream(self, number: int, entries: str, data: bytes) -> None:
+        self._begin_stream(number, entries, len(data))
+        self.write(data)
+        self.write(b"\nendstream\nendobj\n")
+
+    def file_stream(self, number: int, entries: str, path: Path) -> None:
+        """Write a stream object holding the bytes of the file at ``path``."""
+        with open(path, "rb") as f:
+            length = os.fstat(f.fileno()).st_size
+            self._begin_stream(number, entries, length)
+            shutil.copyfileobj(f, self.out, 1024 * 1024)
+            self.position += length
+        self.write(b"\nendstream\nendobj\n")
+
+
+def _image_entries(width: int, height: int, entries: str) -> str:
+    return f"/Type /XObject /Subtype /Image /Width {width} /Height {height} {entries}"
+
+
+def images_to_pdf(input_paths: list[Path], out: BinaryIO) -> None:
+    """Write one page per image, each the size of the image at its resolution."""
+    writer = _Writer(out)
+    writer.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    writer.object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+    kids = []
+    number = 3
+    with stage("serialize") as span:
+        for image in _prepared(input_paths):
+            entries = _image_entries(image.width, image.height, image.entries)
+            if image.smask is not None:
+                gray = (
+                    "/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode"
+                )
+                writer.stream(
+                    number, _image_entries(image.width, image.height, gray), image.smask
+                )
+                entries += f" /SMask {number} 0 R"
+                number += 1
+            if image.path is not None:
+                writer.file_stream(number, entries, image.path)
+            else:
+                writer.stream(number, entries, image.data)
+            width = image.width * 72 / image.dpi[0]
+            height = image.height * 72 / image.dpi[1]
+            content = f"q {width:.4f} 0 0 {height:.4f} 0 0 cm /Im0 Do Q"
+            writer.stream(number + 1, "", content.encode())
+            writer.object(
+                number + 2,
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width:.4f} {height:.4f}]"
+                f" /Rotate {image.rotate} /Resources << /XObject << /Im0 {number} 0 R >> >>"
+                f" /Contents {number + 1} 0 R >>",
+            )
+            kids.append(f"{number + 2} 0 R")
+            number += 3
+            add_pages(1)
+        span.set(pages=len(kids))
+    writer.object(2, f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>")
+    xref = writer.position
+    lines = ["xref", f"0 {number}", "0000000000 65535 f "]
+    lines += [f"{writer.offsets[n]:010d} 00000 n " for n in range(1, number)]
+    writer.write(("\n".join(lines) + "\n").encode())
+    writer.write(
+        f"trailer\n<< /Size {number} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    )
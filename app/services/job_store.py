@@ -0,0 +1,318 @@
+"""SQLite-backed store of processing jobs and their results, local to each node."""
+
+from pathlib import Path
+from typing import TypedDict
+from .. import settings
+from .storage import storage
+import contextlib
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    params TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    input_paths TEXT NOT NULL,
+    result_name TEXT NOT NULL,
+    result_path TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    items TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS owners (
+    id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+# Columns added after the first release, for databases created before them.
+MIGRATIONS = {"owner": "ALTER TABLE jobs ADD COLUMN owner TEXT"}
+
+
+class Job(TypedDict):
+    """A row of the jobs table."""
+
+    id: str
+    operation: str
+    params: dict
+    input_hash: str
+    input_paths: list[str]
+    result_name: str
+    result_path: str | None
+    status: str
+    error: str | None
+    attempts: int
+    created_at: float
+    started_at: float | None
+    finished_at: float | None
+    owner: str | None
+
+
+class BatchItem(TypedDict):
+    """The outcome of one file of a batch."""
+
+    name: str
+    job_id: str
+    status: str
+    error: str
+
+
+class Batch(TypedDict):
+    """A row of the batches table: one operation run over many files."""
+
+    id: str
+    operation: str
+    items: list[BatchItem]
+    created_at: float
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """Persists jobs in SQLite and their results under a results directory.
+
+    Each process that uses the store is an owner, with an ID of its own and
+    a heartbeat. The jobs it creates or runs are recorded as its own, so
+    that after a crash another process can tell which jobs were abandoned
+    and which are still running elsewhere.
+    """
+
+    def __init__(self, db_path: Path, results_dir: Path):
+        self.db_path = db_path
+        self.results_dir = results_dir
+        self.owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextlib.contextmanager
+    def _connect(self):
+        with self._lock:
+            if not self._initialized:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self.results_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            try:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    columns = {
+                        row["name"] for row in conn.execute("PRAGMA table_info(jobs)")
+                    }
+                    for column, statement in MIGRATIONS.items():
+                        if column not in columns:
+                            conn.execute(statement)
+                    self._initialized = True
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Job:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["input_paths"] = json.loads(job["input_paths"])
+        return Job(**job)
+
+    def create(
+        self,
+        operation: str,
+        input_paths: list[Path],
+        params: dict,
+        input_hash: str,
+        result_name: str,
+    ) -> Job:
+        """Record a new pending job and return it."""
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            self._beat(conn)
+            conn.execute(
+                "INSERT INTO jobs (id, operation, params, input_hash, input_paths,"
+                " result_name, status, created_at, owner)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    operation,
+                    json.dumps(params, sort_keys=True),
+                    input_hash,
+                    json.dumps([str(p) for p in input_paths]),
+                    result_name,
+                    PENDING,
+                    time.time(),
+                    self.owner,
+                ),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Job | None:
+        """Return the job with the given ID, if it exists."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def create_batch(self, operation: str, items: list[BatchItem]) -> Batch:
+        """Record a finished batch of jobs and return it."""
+        batch = Batch(
+            id=uuid.uuid4().hex,
+            operation=operation,
+            items=items,
+            created_at=time.time(),
+        )
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO batches (id, operation, items, created_at)"
+                " VALUES (?, ?, ?, ?)",
+                (batch["id"], operation, json.dumps(items), batch["created_at"]),
+            )
+        return batch
+
+    def get_batch(self, batch_id: str) -> Batch | None:
+        """Return the batch with the given ID, if it exists."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM batches WHERE id = ?", (batch_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Batch(**{**dict(row), "items": json.loads(row["items"])})
+
+    def result_path(self, job: Job) -> Path:
+        """Return where the result of a job is (or will be) stored."""
+        return self.results_dir / job["id"] / job["result_name"]
+
+    def result_key(self, job: Job) -> str:
+        """Return the storage key the result of a job is published under."""
+        return f"results/{job['id']}/{job['result_name']}"
+
+    def pages_dir(self, job_id: str) -> Path:
+        """Return where a job publishes pages of its result as they finish."""
+        return self.results_dir / job_id / "pages"
+
+    def mark_running(self, job_id: str) -> None:
+        """Mark a job as started by this process, counting the attempt."""
+        with self._connect() as conn:
+            self._beat(conn)
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1,"
+                " owner = ? WHERE id = ?",
+                (RUNNING, time.time(), self.owner, job_id),
+            )
+
+    def mark_done(self, job_id: str, result_path: Path) -> None:
+        """Mark a job as finished with its result stored at ``result_path``."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result_path = ?, finished_at = ?"
+                " WHERE id = ?",
+                (DONE, str(result_path), time.time(), job_id),
+            )
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        """Mark a job as failed with the given error message."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id),
+            )
+
+    def _beat(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "INSERT INTO owners (id, host, pid, heartbeat_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+            (self.owner, socket.gethostname(), os.getpid(), time.time()),
+        )
+
+    def heartbeat(self) -> None:
+        """Record that this process, and so the jobs it owns, is still alive."""
+        with self._connect() as conn:
+            self._beat(conn)
+
+    def claim_orphaned(self, timeout: float) -> list[Job]:
+        """Take over the unfinished jobs of dead owners, oldest first.
+
+        An owner is dead once its heartbeat is more than ``timeout`` seconds
+        old or, if it ran on this host, once its process is gone. When
+        several processes race for a job, only one of them claims it.
+        """
+        cutoff = time.time() - timeout
+        host = socket.gethostname()
+        claimed = []
+        with self._connect() as conn:
+            self._beat(conn)
+            owners = {row["id"]: row for row in conn.execute("SELECT * FROM owners")}
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND owner IS NOT ?"
+                " ORDER BY created_at",
+                (PENDING, RUNNING, self.owner),
+            ).fetchall()
+            for row in rows:
+                owner = owners.get(row["owner"])
+                if (
+                    owner is not None
+                    and owner["heartbeat_at"] >= cutoff
+                    and (owner["host"] != host or _process_exists(owner["pid"]))
+                ):
+                    continue
+                taken = conn.execute(
+                    "UPDATE jobs SET owner = ? WHERE id = ? AND owner IS ?",
+                    (self.owner, row["id"], row["owner"]),
+                ).rowcount
+                if taken:
+                    claimed.append(self._to_job(row) | {"owner": self.owner})
+        return claimed
+
+    def purge_expired(self, ttl_seconds: int = settings.JOB_TTL_SECONDS) -> int:
+        """Delete finished jobs older than the TTL, with their results."""
+        cutoff = time.time() - ttl_seconds
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, cutoff),
+            ).fetchall()
+            for row in rows:
+                shutil.rmtree(self.results_dir / row["id"], ignore_errors=True)
+                storage.delete(f"results/{row['id']}/")
+            conn.executemany(
+                "DELETE FROM jobs WHERE id = ?", [(row["id"],) for row in rows]
+            )
+            conn.execute("DELETE FROM batches WHERE created_at < ?", (cutoff,))
+            conn.execute("DELETE FROM owners WHERE heartbeat_at < ?", (cutoff,))
+        return len(rows)
+
+
+store = JobStore(settings.JOBS_DB, settings.RESULTS_DIR)
@@ -0,0 +1,282 @@
+"""Runs operations as persisted jobs and recovers them after a restart."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .. import settings
+from . import (
+    backends,
+    metrics,
+    operations,
+    profiling,
+    thumbnails,
+    tracing,
+    uploads,
+    worker_pool,
+)
+from .documents import page_count
+from .hashing import hash_files
+from .job_store import Job, store
+from .result_cache import cache
+from .storage import storage
+import asyncio
+import contextvars
+import logging
+import math
+import shutil
+import time
+
+# Pages each worker gets, at the least, when a job is split across workers.
+PARALLEL_MIN_PAGES = 200
+# A process that has missed this many heartbeats is taken for dead, and its
+# unfinished jobs are recovered by another.
+OWNER_TIMEOUT_SECONDS = 4 * settings.JOB_HEARTBEAT_SECONDS
+
+
+def create_job(operation: str, input_paths: list[Path], params: dict) -> Job:
+    """Record a pending job for an operation on the given files."""
+    return store.create(
+        operation,
+        input_paths,
+        params,
+        input_hash=hash_files(input_paths),
+        result_name=operations.output_filename(operation, input_paths[0].name, params),
+    )
+
+
+def run_job(operation: str, input_paths: list[Path], params: dict) -> Job:
+    """Record and execute a job, returning it once its result is stored."""
+    return execute(create_job(operation, input_paths, params))
+
+
+def _page_parts(job: Job) -> list[str]:
+    """Return the page selections to run ``job`` as on separate workers, or
+    none if it is better run whole."""
+    if job["operation"] not in operations.PAGE_PARALLEL:
+        return []
+    params = operations.normalize_params(job["operation"], job["params"])
+    # Counted on a worker: PyMuPDF is not thread-safe, so it stays off the
+    # server's threads.
+    count = worker_pool.pool.call(page_count, Path(job["input_paths"][0]))
+    pages = operations.selected_pages(params.get("pages", ""), count)
+    parts = min(worker_pool.pool.size, len(pages) // PARALLEL_MIN_PAGES)
+    if parts < 2:
+        return []
+    size = math.ceil(len(pages) / parts)
+    return [
+        operations.format_page_range(pages[start : start + size])
+        for start in range(0, len(pages), size)
+    ]
+
+
+def _run_in_parts(
+    job: Job, selections: list[str], result_path: Path, recorder: metrics.JobRecorder
+) -> None:
+    """Run ``job`` on one worker per page selection at once, then join the
+    parts, in page order, into ``result_path``."""
+    part_paths = [
+        result_path.with_name(f".{result_path.name}.{i}")
+        for i in range(len(selections))
+    ]
+    recorders = [metrics.JobRecorder(job["operation"]) for _ in selections]
+    try:
+        with ThreadPoolExecutor(max_workers=len(selections)) as executor:
+            futures = [
+                # Each run gets a copy of this context, to keep the job's trace.
+                executor.submit(
+                    contextvars.copy_context().run,
+                    worker_pool.pool.run,
+                    {**job, "params": {**job["params"], "pages": selection}},
+                    part_path,
+                    part_recorder,
+                )
+                for selection, part_path, part_recorder in zip(
+                    selections, part_paths, recorders
+                )
+            ]
+            for future in futures:
+                future.result()
+        with metrics.stage("serialize"), open(result_path, "wb") as out:
+            for part_path in part_paths:
+                with open(part_path, "rb") as part:
+                    shutil.copyfileobj(part, out, 1024 * 1024)
+    finally:
+        for part_path in part_paths:
+            part_path.unlink(missing_ok=True)
+    for part_recorder in recorders:
+        for name, seconds in part_recorder.stages.items():
+            recorder.stages[name] = recorder.stages.get(name, 0.0) + seconds
+        recorder.pages += part_recorder.pages
+        recorder.peak_rss = max(recorder.peak_rss, part_recorder.peak_rss)
+
+
+def execute(job: Job, progressive: bool = False) -> Job:
+    """Execute a recorded job, storing its result or its failure.
+
+    With ``progressive``, operations that produce one file per page also
+    publish each page to ``store.pages_dir`` while the rest are rendering.
+    Cached results are not republished; serve their pages from the archive.
+    Long documents for ``PAGE_PARALLEL`` operations are split by pages
+    across the pool's workers.
+    """
+    store.mark_running(job["id"])
+    result_path = store.result_path(job)
+    result_path.parent.mkdir(parents=True, exist_ok=True)
+    key = cache.key(
+        job["input_hash"],
+        job["operation"],
+        {
+            **operations.normalize_params(job["operation"], job["params"]),
+            "result_name": job["result_name"],
+        },
+        backends.select(job["operation"])
+        if job["operation"] in backends.OPERATIONS
+        else "",
+    )
+    bytes_in = sum(Path(p).stat().st_size for p in job["input_paths"])
+    pages_dir = store.pages_dir(job["id"]) if progressive else None
+    try:
+        with (
+            tracing.span(
+                "job",
+                job_id=job["id"],
+                tool=job["operation"],
+                input_files=len(job["input_paths"]),
+                bytes_in=bytes_in,
+            ) as span,
+            metrics.track_job(job["operation"], bytes_in) as recorder,
+        ):
+            cache_hit = cache.fetch(key, result_path)
+            if not cache_hit:
+                parts = _page_parts(job) if worker_pool.pool.running else []
+                if parts:
+                    _run_in_parts(job, parts, result_path, recorder)
+                elif worker_pool.pool.running:
+                    worker_pool.pool.run(
+                        job,
+                        result_path,
+                        recorder,
+                        pages_dir,
+                        # A session's files share a directory; keeping its jobs
+                        # on one worker lets merges reuse that worker's parts.
+                        affinity=str(Path(job["input_paths"][0]).parent),
+                    )
+                else:
+                    with (
+                        worker_pool.inline_lock,
+                        open(result_path, "wb") as out,
+                        profiling.capture(job),
+                        operations.deliver_pages(pages_dir),
+                    ):
+                        operations.run_operation(
+                            job["operation"], job["input_paths"], out, job["params"]
+                        )
+                cache.put(key, result_path)
+            recorder.bytes_out = result_path.stat().st_size
+            span.set(
+                cache_hit=cache_hit, pages=recorder.pages, bytes_out=recorder.bytes_out
+            )
+            with metrics.stage("publish"):
+                storage.put(store.result_key(job), result_path)
+    except Exception as e:
+        store.mark_failed(job["id"], str(e))
+        result_path.unlink(missing_ok=True)
+        raise
+    store.mark_done(job["id"], result_path)
+    return store.get(job["id"])
+
+
+def recover_jobs() -> None:
+    """Resume jobs whose process died, or fail them if they cannot resume.
+
+    Jobs still owned by a live process, this one or another sharing the
+    database, are left alone.
+    """
+    for job in store.claim_orphaned(OWNER_TIMEOUT_SECONDS):
+        missing = [p for p in job["input_paths"] if not Path(p).exists()]
+        if missing:
+            store.mark_failed(job["id"], "Interrupted by a restart; input is gone.")
+            continue
+        if job["attempts"] >= settings.JOB_MAX_ATTEMPTS:
+            store.mark_failed(job["id"], "Interrupted by a restart too many times.")
+        else:
+            try:
+                execute(job)
+            except Exception as e:
+                logging.exception(f"Error: {e}")
+        # Only the API's per-request uploads belong to the job. Session files,
+        # such as a merge's workspace, stay until the session drops them.
+        for directory in {_request_dir(Path(p)) for p in job["input_paths"]}:
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+def _request_dir(path: Path) -> Path | None:
+    """Return the API request directory under ``UPLOADS_DIR`` holding ``path``,
+    or ``None`` if it is not in one."""
+    try:
+        relative = path.resolve().relative_to(settings.UPLOADS_DIR.resolve())
+    except ValueError:
+        return None
+    if len(relative.parts) < 2:
+        return None
+    return settings.UPLOADS_DIR / relative.parts[0]
+
+
+def purge_session_uploads(
+    directory: Path, ttl_seconds: int = settings.JOB_TTL_SECONDS
+) -> int:
+    """Delete the upload directories of sessions idle for longer than the TTL.
+
+    Sessions keep their files, such as a merge's inputs, until the user
+    removes them; a session that is never used again would keep them forever.
+    """
+    if not directory.exists():
+        return 0
+    cutoff = time.time() - ttl_seconds
+    purged = 0
+    for session_dir in directory.iterdir():
+        if session_dir.is_dir() and session_dir.stat().st_mtime < cutoff:
+            shutil.rmtree(session_dir, ignore_errors=True)
+            purged += 1
+    return purged
+
+
+async def _heartbeat():
+    while True:
+        try:
+            await asyncio.to_thread(store.heartbeat)
+        except Exception as e:
+            logging.exception(f"Error: {e}")
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+
+
+async def maintenance_task(session_uploads_dir: Path | None = None):
+    """Keep this process's jobs marked as alive, recover those of dead
+    processes, and purge expired jobs periodically, along with idle
+    sessions' uploads under ``session_uploads_dir``.
+
+    Heartbeats run on their own, so a long recovery does not make this
+    process look dead to the others.
+    """
+    heartbeat = asyncio.create_task(_heartbeat())
+    next_purge = 0.0
+    try:
+        while True:
+            try:
+                await asyncio.to_thread(recover_jobs)
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + settings.JOB_PURGE_INTERVAL_SECONDS
+                    await asyncio.to_thread(store.purge_expired)
+                    await asyncio.to_thread(uploads.store.purge_expired)
+                    await asyncio.to_thread(thumbnails.cache.purge_expired)
+                    if session_uploads_dir is not None:
+                        await asyncio.to_thread(
+                            purge_session_uploads, session_uploads_dir
+                        )
+            except Exception as e:
+                logging.exception(f"Error: {e}")
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+    except asyncio.CancelledError:
+        return
+    finally:
+        heartbeat.cancel()
@@ -0,0 +1,63 @@
+"""Rewrites finished PDFs as linearized ("fast web view") files.
+
+A linearized PDF starts with the first page and a hint table, so a viewer
+can show page one after a single small range request instead of waiting
+for the whole download. Neither pypdf nor PyMuPDF can write one, so the
+result is rewritten with pikepdf (qpdf), imported on first use.
+"""
+
+from typing import BinaryIO
+from .metrics import stage
+import contextlib
+import shutil
+import tempfile
+import zipfile
+
+# Results up to this size are buffered in memory before being rewritten.
+SPOOL_BYTES = 32 * 1024**2
+
+
+def linearize(src: BinaryIO, out: BinaryIO) -> None:
+    """Write the PDF in ``src`` to ``out`` linearized."""
+    import pikepdf
+
+    with stage("linearize") as span, pikepdf.open(src) as pdf:
+        pdf.save(out, linearize=True)
+        span.set(pages=len(pdf.pages))
+
+
+def linearize_archive(src: BinaryIO, out: BinaryIO) -> None:
+    """Copy the ZIP in ``src`` to ``out``, linearizing the PDFs it holds."""
+    with (
+        zipfile.ZipFile(src) as archive,
+        zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as result,
+    ):
+        for info in archive.infolist():
+            if not info.filename.lower().endswith(".pdf"):
+                result.writestr(info, archive.read(info))
+                continue
+            with (
+                archive.open(info) as member,
+                tempfile.SpooledTemporaryFile(SPOOL_BYTES) as part,
+                result.open(info.filename, "w") as dst,
+            ):
+                # qpdf needs to seek in its input, which a ZIP member cannot.
+                shutil.copyfileobj(member, part)
+                part.seek(0)
+                linearize(part, dst)
+
+
+@contextlib.contextmanager
+def linearized(out: BinaryIO, enabled: bool, archive: bool = False):
+    """Yield where an operation should write its result so that ``out``
+    receives it linearized; with ``enabled`` false, that is ``out`` itself.
+
+    ``archive`` marks results that are ZIPs of PDFs, such as Split's.
+    """
+    if not enabled:
+        yield out
+        return
+    with tempfile.SpooledTemporaryFile(SPOOL_BYTES) as result:
+        yield result
+        result.seek(0)
+        (linearize_archive if archive else linearize)(result, out)
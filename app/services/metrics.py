@@ -0,0 +1,328 @@
+"""In-process metrics for tool runs, rendered in the Prometheus text format."""
+
+from contextvars import ContextVar
+from .result_cache import cache
+from . import tracing
+import contextlib
+import os
+import resource
+import threading
+import time
+
+SECONDS_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+BYTES_BUCKETS = tuple(1024 * 4**i for i in range(12))
+PAGES_PER_SECOND_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+REGISTRY: list["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A named metric family with a fixed set of label names."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Yield ``(name, labels, value)`` for every sample of the family."""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Counter(_Metric):
+    """A monotonically increasing value."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        for name, labels, (counts, total) in super().samples():
+            for bound, count in zip(self.buckets, counts):
+                yield f"{name}_bucket", {**labels, "le": _format_value(bound)}, count
+            yield f"{name}_sum", labels, total
+            yield f"{name}_count", labels, counts[-1]
+
+
+class CallbackGauge(_Metric):
+    """A gauge whose value is read from a callable at render time."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, callback, type: str = "gauge"):
+        super().__init__(name, help)
+        self.callback = callback
+        self.type = type
+
+    def samples(self):
+        yield self.name, {}, self.callback()
+
+
+STAGE_SECONDS = Histogram(
+    "pdf_o_matic_stage_seconds",
+    "Time spent in each stage of a tool run.",
+    ("tool", "stage"),
+)
+JOB_SECONDS = Histogram(
+    "pdf_o_matic_job_seconds",
+    "Wall time of a tool run.",
+    ("tool", "status"),
+)
+JOBS_TOTAL = Counter(
+    "pdf_o_matic_jobs_total", "Tool runs by outcome.", ("tool", "status")
+)
+JOB_BYTES_IN = Histogram(
+    "pdf_o_matic_job_input_bytes",
+    "Size of the input files of a tool run.",
+    ("tool",),
+    BYTES_BUCKETS,
+)
+JOB_BYTES_OUT = Histogram(
+    "pdf_o_matic_job_output_bytes",
+    "Size of the result of a tool run.",
+    ("tool",),
+    BYTES_BUCKETS,
+)
+JOB_PAGES_PER_SECOND = Histogram(
+    "pdf_o_matic_job_pages_per_second",
+    "Pages processed per second of wall time.",
+    ("tool",),
+    PAGES_PER_SECOND_BUCKETS,
+)
+JOB_PEAK_RSS = Histogram(
+    "pdf_o_matic_job_peak_rss_bytes",
+    "Peak resident set size of the process while a tool run was active.",
+    ("tool",),
+    BYTES_BUCKETS,
+)
+JOBS_IN_FLIGHT = Gauge(
+    "pdf_o_matic_jobs_in_flight", "Tool runs currently queued or executing."
+)
+CallbackGauge(
+    "pdf_o_matic_cache_hits_total",
+    "Result cache hits.",
+    lambda: cache.hits,
+    type="counter",
+)
+CallbackGauge(
+    "pdf_o_matic_cache_misses_total",
+    "Result cache misses.",
+    lambda: cache.misses,
+    type="counter",
+)
+CallbackGauge(
+    "pdf_o_matic_cache_hit_ratio",
+    "Fraction of result cache lookups that were hits.",
+    lambda: cache.hits / max(cache.hits + cache.misses, 1),
+)
+
+
+class JobRecorder:
+    """Accumulates stage timings and counts for one tool run."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.stages: dict[str, float] = {}
+        self.pages = 0
+        self.bytes_out = 0
+        self.peak_rss = 0
+
+
+_recorder: ContextVar[JobRecorder | None] = ContextVar("job_recorder", default=None)
+
+
+@contextlib.contextmanager
+def stage(name: str, tool: str = ""):
+    """Time a stage, adding it to the current run or observing it for ``tool``.
+
+    The stage is also traced as a span, which is yielded for extra attributes.
+    """
+    start = time.perf_counter()
+    try:
+        with tracing.span(name, **({"tool": tool} if tool else {})) as span:
+            yield span
+    finally:
+        elapsed = time.perf_counter() - start
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.stages[name] = recorder.stages.get(name, 0.0) + elapsed
+        elif tool:
+            STAGE_SECONDS.observe(elapsed, tool=tool, stage=name)
+
+
+def add_pages(count: int) -> None:
+    """Count pages processed by the current run."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.pages += count
+
+
+def current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _RssSampler(threading.Thread):
+    """Polls the process RSS while a run is active and keeps the peak."""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> int:
+        self._stopped.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+@contextlib.contextmanager
+def track_job(tool: str, bytes_in: int):
+    """Record a tool run: its stages, timings, sizes, throughput and peak RSS."""
+    recorder = JobRecorder(tool)
+    token = _recorder.set(recorder)
+    sampler = _RssSampler()
+    sampler.start()
+    JOBS_IN_FLIGHT.inc()
+    status = "error"
+    start = time.perf_counter()
+    try:
+        yield recorder
+        status = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        JOBS_IN_FLIGHT.dec()
+        _recorder.reset(token)
+        peak_rss = sampler.stop()
+        JOB_PEAK_RSS.observe(recorder.peak_rss or peak_rss, tool=tool)
+        JOB_SECONDS.observe(elapsed, tool=tool, status=status)
+        JOBS_TOTAL.inc(tool=tool, status=status)
+        for name, seconds in recorder.stages.items():
+            STAGE_SECONDS.observe(seconds, tool=tool, stage=name)
+        JOB_BYTES_IN.observe(bytes_in, tool=tool)
+        if status == "ok":
+            JOB_BYTES_OUT.observe(recorder.bytes_out, tool=tool)
+            if recorder.pages and elapsed > 0:
+                JOB_PAGES_PER_SECOND.observe(recorder.pages / elapsed, tool=tool)
+
+
+@contextlib.contextmanager
+def record(tool: str):
+    """Collect a run's stages, pages and peak RSS without observing them.
+
+    Used by worker processes, which send the recorder back to be merged into
+    the ``track_job`` recorder of the process that owns the metrics.
+    """
+    recorder = JobRecorder(tool)
+    token = _recorder.set(recorder)
+    sampler = _RssSampler()
+    sampler.start()
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        recorder.peak_rss = sampler.stop()
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,431 @@
+"""PDF processing operations shared by the tool states."""
+
+from collections.abc import Callable
+from contextvars import ContextVar
+from pathlib import Path
+from typing import BinaryIO
+from . import backends
+from .linearization import linearized
+from .tracing import current_span
+import contextlib
+import importlib
+import inspect
+import logging
+import os
+
+# The implementations live in pypdf_backend and pymupdf_backend, which import
+# their libraries at the top; they are imported on first use, so importing the
+# app (or a worker) does not load every tool's libraries.
+
+
+class OperationError(ValueError):
+    """Raised when an operation is given invalid parameters."""
+
+
+_pages_dir: ContextVar[Path | None] = ContextVar("pages_dir", default=None)
+
+
+@contextlib.contextmanager
+def deliver_pages(directory: Path | None):
+    """Have page-by-page operations also write each page to ``directory``
+    as soon as it is ready, before the whole result is."""
+    if directory is not None:
+        directory.mkdir(parents=True, exist_ok=True)
+    token = _pages_dir.set(directory)
+    try:
+        yield
+    finally:
+        _pages_dir.reset(token)
+
+
+def publish_page(name: str, data: bytes) -> None:
+    """Write one finished page to the directory set by ``deliver_pages``, if any."""
+    directory = _pages_dir.get()
+    if directory is None:
+        return
+    partial = directory / f"{name}.part"
+    partial.write_bytes(data)
+    os.replace(partial, directory / name)
+
+
+def page_image_name(input_name: str, page: int) -> str:
+    """Return the name ``pdf_to_images`` gives the image of 1-based ``page``."""
+    return f"{Path(input_name).stem}_page_{page}.png"
+
+
+def parse_page_range(range_str: str, total_pages: int) -> list[int] | None:
+    """Parse a selection like ``1,3-5`` into sorted 1-based page numbers."""
+    pages = set()
+    try:
+        parts = range_str.split(",")
+        for part in parts:
+            part = part.strip()
+            if "-" in part:
+                start, end = map(int, part.split("-"))
+                if start > end or start < 1 or end > total_pages:
+                    return None
+                pages.update(range(start, end + 1))
+            else:
+                page = int(part)
+                if page < 1 or page > total_pages:
+                    return None
+                pages.add(page)
+        return sorted(pages)
+    except ValueError as e:
+        logging.exception(f"Error: {e}")
+        return None
+
+
+def selected_pages(selection: str, total_pages: int) -> list[int]:
+    """Return the pages ``selection`` names, or every page if it is empty."""
+    if not selection:
+        return list(range(1, total_pages + 1))
+    pages = parse_page_range(selection, total_pages)
+    if pages is None:
+        raise invalid_page_selection(selection)
+    return pages
+
+
+def invalid_page_selection(pages: str) -> OperationError:
+    return OperationError(
+        f"Invalid page selection: '{pages}'. Use comma-separated numbers or ranges (e.g., 1,3-5)."
+    )
+
+
+def _check_angle(angle: int) -> None:
+    if angle not in [90, 180, 270]:
+        raise OperationError(
+            "Invalid rotation angle. Please select 90, 180, or 270 degrees."
+        )
+
+
+def format_page_range(pages: list[int]) -> str:
+    """Write sorted page numbers as a selection like ``1,3-5``."""
+    parts = []
+    for page in pages:
+        if parts and parts[-1][1] == page - 1:
+            parts[-1][1] = page
+        else:
+            parts.append([page, page])
+    return ",".join(
+        str(start) if start == end else f"{start}-{end}" for start, end in parts
+    )
+
+
+def _backend(operation: str):
+    """Import the module implementing ``operation`` with the selected backend."""
+    name = backends.select(operation)
+    current_span().set(backend=name)
+    return importlib.import_module(f".{name}_backend", __package__)
+
+
+def split_pdf(
+    input_paths: list[Path], out: BinaryIO, ranges: str, linearize: bool = False
+) -> None:
+    """Write a ZIP with one PDF per comma-separated page range."""
+    with linearized(out, linearize, archive=True) as target:
+        _backend("split").split_pdf(input_paths, target, ranges)
+
+
+def merge_pdfs(
+    input_paths: list[Path],
+    out: BinaryIO,
+    pages: str = "",
+    linearize: bool = False,
+) -> None:
+    """Write the input PDFs, in order, as a single document.
+
+    ``pages`` holds one selection per input, separated by ``;``; an empty
+    selection (or an empty ``pages``) takes every page of that input.
+    """
+    if len(input_paths) < 2:
+        raise OperationError("Please upload at least two PDF files to merge.")
+    selections = pages.split(";") if pages else [""] * len(input_paths)
+    if len(selections) != len(input_paths):
+        raise OperationError(
+            f"Give one page selection per file: got {len(selections)}"
+            f" for {len(input_paths)} files."
+        )
+    with linearized(out, linearize) as target:
+        _backend("merge").merge_pdfs(input_paths, target, selections)
+
+
+def compress_pdf(
+    input_paths: list[Path], out: BinaryIO, linearize: bool = False
+) -> None:
+    """Write the input PDF with its content streams compressed."""
+    with linearized(out, linearize) as target:
+        _backend("compress").compress_pdf(input_paths, target)
+
+
+# Resolutions accepted for rendering pages. At 600 DPI a letter page is
+# already a 34-megapixel image.
+MIN_DPI = 36
+MAX_DPI = 600
+
+
+def pdf_to_images(input_paths: list[Path], out: BinaryIO, dpi: int = 600) -> None:
+    """Write a ZIP with one PNG image per page."""
+    _backend("pdf_to_images").pdf_to_images(input_paths, out, dpi)
+
+
+def extract_pages(
+    input_paths: list[Path], out: BinaryIO, pages: str, linearize: bool = False
+) -> None:
+    """Write a PDF containing only the selected pages."""
+    with linearized(out, linearize) as target:
+        _backend("extract").extract_pages(input_paths, target, pages)
+
+
+def rotate_pdf(
+    input_paths: list[Path], out: BinaryIO, angle: int = 90, linearize: bool = False
+) -> None:
+    """Write the input PDF with every page rotated clockwise by ``angle``."""
+    _check_angle(angle)
+    with linearized(out, linearize) as target:
+        _backend("rotate").rotate_pdf(input_paths, target, angle)
+
+
+WATERMARK_POSITIONS = (
+    "center",
+    "diagonal",
+    "top",
+    "bottom",
+    "top-left",
+    "top-right",
+    "bottom-left",
+    "bottom-right",
+)
+
+
+def watermark_pdf(
+    input_paths: list[Path],
+    out: BinaryIO,
+    text: str = "CONFIDENTIAL",
+    pages: str = "",
+    opacity: float = 0.3,
+    position: str = "diagonal",
+    linearize: bool = False,
+) -> None:
+    """Write the input PDF with a text stamp, or the logo given as a second
+    file (an image or a PDF), drawn over the selected pages.
+
+    The stamp is stored once and every page refers to it, so the output is
+    barely larger than the input however many pages are stamped.
+    """
+    if len(input_paths) > 2:
+        raise OperationError("Upload one PDF and, optionally, one logo.")
+    if len(input_paths) == 1 and not text.strip():
+        raise OperationError("Please enter the stamp text or upload a logo.")
+    if not 0 < opacity <= 1:
+        raise OperationError("Opacity must be greater than 0 and at most 1.")
+    if position not in WATERMARK_POSITIONS:
+        raise OperationError(
+            f"Invalid position: {position}. Use one of {', '.join(WATERMARK_POSITIONS)}."
+        )
+    with linearized(out, linearize) as target:
+        _backend("watermark").watermark_pdf(
+            input_paths, target, text.strip(), pages, opacity, position
+        )
+
+
+def images_to_pdf(
+    input_paths: list[Path], out: BinaryIO, linearize: bool = False
+) -> None:
+    """Write a PDF with one page per image, in order; JPEGs are not re-encoded."""
+    from . import image_pdf
+
+    if not input_paths:
+        raise OperationError("Please upload at least one image.")
+    with linearized(out, linearize) as target:
+        image_pdf.images_to_pdf(input_paths, target)
+
+
+TEXT_FORMATS = ("ndjson", "txt")
+
+
+def extract_text(
+    input_paths: list[Path],
+    out: BinaryIO,
+    pages: str = "",
+    layout: bool = False,
+    format: str = "ndjson",
+) -> None:
+    """Write the text of the selected pages (every page if ``pages`` is
+    empty), one page at a time: as NDJSON, one ``{"page", "text"}`` object
+    per line, or as plain text with a form feed after each page.
+
+    With ``layout`` the text is grouped in blocks; NDJSON lines also list
+    each block with its bounding box.
+    """
+    if format not in TEXT_FORMATS:
+        raise OperationError(
+            f"Invalid format: {format}. Use one of {', '.join(TEXT_FORMATS)}."
+        )
+    _backend("extract_text").extract_text(input_paths, out, pages, layout, format)
+
+
+# The steps a pipeline can chain and the parameter each takes. Split and PDF to
+# Images write archives, so they can only come last.
+PIPELINE_STEPS: dict[str, str | None] = {
+    "extract": "pages",
+    "rotate": "angle",
+    "compress": None,
+    "split": "ranges",
+    "pdf_to_images": "dpi",
+}
+FINAL_STEPS = {"split", "pdf_to_images"}
+
+
+def parse_pipeline(steps: str) -> list[tuple[str, dict]]:
+    """Parse steps like ``extract:1-3;rotate:90;compress`` into
+    ``(operation, params)`` pairs, validating what can be checked upfront."""
+    parsed = []
+    for step in filter(None, (part.strip() for part in steps.split(";"))):
+        operation, _, value = step.partition(":")
+        if operation not in PIPELINE_STEPS:
+            raise OperationError(f"Unknown pipeline step: {operation}")
+        if parsed and parsed[-1][0] in FINAL_STEPS:
+            raise OperationError(f"{parsed[-1][0]} must be the last step.")
+        name = PIPELINE_STEPS[operation]
+        params = normalize_params(operation, {name: value} if name else {})
+        if operation == "rotate":
+            _check_angle(params["angle"])
+        parsed.append((operation, params))
+    if not parsed:
+        raise OperationError("Please add at least one step to the pipeline.")
+    return parsed
+
+
+def run_pipeline(
+    input_paths: list[Path], out: BinaryIO, steps: str, linearize: bool = False
+) -> None:
+    """Write the result of applying several steps, in order, to one document.
+
+    The document is parsed once, transformed in memory and serialized once.
+    """
+    parsed = parse_pipeline(steps)
+    last = parsed[-1][0]
+    with linearized(
+        out, linearize and last != "pdf_to_images", archive=last == "split"
+    ) as target:
+        _backend("pipeline").run_pipeline(input_paths, target, parsed)
+
+
+OPERATIONS: dict[str, Callable[..., None]] = {
+    "split": split_pdf,
+    "merge": merge_pdfs,
+    "compress": compress_pdf,
+    "pdf_to_images": pdf_to_images,
+    "extract": extract_pages,
+    "rotate": rotate_pdf,
+    "pipeline": run_pipeline,
+    "images_to_pdf": images_to_pdf,
+    "watermark": watermark_pdf,
+    "extract_text": extract_text,
+}
+
+# Operations that combine all their inputs into one result, rather than
+# producing one result per input.
+COMBINING = {"merge", "images_to_pdf"}
+# Operations whose inputs are images rather than PDFs.
+IMAGE_INPUTS = {"images_to_pdf"}
+# Operations that take a PDF plus a stamp to apply to it: an image or a PDF
+# whose first page is used. The stamp is shared by every file of a batch.
+STAMP_INPUTS = {"watermark"}
+# Operations whose result for a page selection is the results for its parts,
+# in order, joined together, so a long document can be split by pages across
+# several workers.
+PAGE_PARALLEL = {"extract_text"}
+
+OUTPUT_NAMES: dict[str, str] = {
+    "split": "{base_name}_split.zip",
+    "merge": "merged_document.pdf",
+    "compress": "{base_name}_compressed.pdf",
+    "pdf_to_images": "{base_name}_images.zip",
+    "extract": "{base_name}_extracted.pdf",
+    "rotate": "{base_name}_rotated.pdf",
+    "pipeline": "{base_name}_processed.pdf",
+    "images_to_pdf": "{base_name}.pdf",
+    "watermark": "{base_name}_watermarked.pdf",
+    "extract_text": "{base_name}_text.{format}",
+}
+
+
+def output_filename(operation: str, input_name: str, params: dict | None = None) -> str:
+    """Return the download filename for an operation run on ``input_name``.
+
+    A pipeline that ends in an archive is named after its last step, and
+    extracted text after its format.
+    """
+    if operation == "pipeline" and params:
+        last = parse_pipeline(params["steps"])[-1][0]
+        if last in FINAL_STEPS:
+            operation = last
+    text_format = (params or {}).get("format", "ndjson")
+    return OUTPUT_NAMES[operation].format(
+        base_name=Path(input_name).stem,
+        format=text_format if text_format in TEXT_FORMATS else "ndjson",
+    )
+
+
+def operation_params(operation: str) -> list[str]:
+    """Return the names of the parameters an operation accepts."""
+    signature = inspect.signature(OPERATIONS[operation])
+    return list(signature.parameters)[2:]
+
+
+def required_params(operation: str) -> list[str]:
+    """Return the names of the parameters an operation cannot run without."""
+    signature = inspect.signature(OPERATIONS[operation])
+    return [
+        param.name
+        for param in list(signature.parameters.values())[2:]
+        if param.default is inspect.Parameter.empty
+    ]
+
+
+def normalize_params(operation: str, params: dict) -> dict:
+    """Return ``params`` in a canonical form, so equivalent requests compare equal.
+
+    Raises ``OperationError`` if a required parameter is missing or a value
+    is out of range.
+    """
+    missing = [name for name in required_params(operation) if name not in params]
+    if missing:
+        raise OperationError(f"Missing required parameters: {', '.join(missing)}")
+    normalized = {}
+    for name, value in params.items():
+        if name in ("ranges", "pages", "steps"):
+            value = "".join(str(value).split())
+        elif name in ("angle", "dpi"):
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise OperationError(f"Invalid value for {name}: {value}") from None
+            if name == "dpi" and not MIN_DPI <= value <= MAX_DPI:
+                raise OperationError(
+                    f"The resolution must be between {MIN_DPI} and {MAX_DPI} DPI."
+                )
+        elif name == "opacity":
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise OperationError(f"Invalid value for {name}: {value}") from None
+        elif name in ("position", "format"):
+            value = str(value).strip().lower()
+        elif name in ("linearize", "layout") and not isinstance(value, bool):
+            if str(value).lower() not in ("true", "false", "1", "0", "on", "off"):
+                raise OperationError(f"Invalid value for {name}: {value}")
+            value = str(value).lower() in ("true", "1", "on")
+        normalized[name] = value
+    return normalized
+
+
+def run_operation(
+    operation: str, input_paths: list[Path], out: BinaryIO, params: dict
+) -> None:
+    """Run a named operation on the input files, writing the result to ``out``."""
+    if operation not in OPERATIONS:
+        raise OperationError(f"Unknown operation: {operation}")
+    OPERATIONS[operation]([Path(p) for p in input_paths], out, **params)
@@ -0,0 +1,186 @@
+"""Opt-in cProfile and tracemalloc capture for sampled or flagged jobs."""
+
+from .. import settings
+from .job_store import Job
+import contextlib
+import cProfile
+import json
+import math
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+sample_rate: float = settings.PROFILE_SAMPLE_RATE
+flagged_tools: set[str] = set(settings.PROFILE_TOOLS)
+flagged_jobs: set[str] = set()
+
+_capture_lock = threading.Lock()
+
+
+def _names(value, field: str) -> list[str]:
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{field} must be a list of strings.")
+    return value
+
+
+def configure(
+    rate: float | None = None,
+    tools: list[str] | None = None,
+    jobs: list[str] | None = None,
+    unflag_jobs: list[str] | None = None,
+) -> dict:
+    """Change which jobs are profiled at runtime and return the configuration.
+
+    ``jobs`` accepts job IDs or input hashes, so a document can be flagged and
+    profiled the next time it is processed; ``unflag_jobs`` removes them
+    again. Raises ``ValueError``, changing nothing, if a value is invalid.
+    """
+    global sample_rate
+    if rate is not None:
+        if isinstance(rate, bool) or not isinstance(rate, int | float):
+            raise ValueError("sample_rate must be a number.")
+        if not math.isfinite(rate):
+            raise ValueError("sample_rate must be finite.")
+    if tools is not None:
+        tools = _names(tools, "tools")
+    if jobs is not None:
+        jobs = _names(jobs, "jobs")
+    if unflag_jobs is not None:
+        unflag_jobs = _names(unflag_jobs, "unflag_jobs")
+    if rate is not None:
+        sample_rate = min(max(float(rate), 0.0), 1.0)
+    if tools is not None:
+        flagged_tools.clear()
+        flagged_tools.update(tools)
+    if jobs is not None:
+        flagged_jobs.update(jobs)
+    if unflag_jobs is not None:
+        flagged_jobs.difference_update(unflag_jobs)
+    return {
+        "sample_rate": sample_rate,
+        "tools": sorted(flagged_tools),
+        "jobs": sorted(flagged_jobs),
+    }
+
+
+def enabled() -> bool:
+    """Return whether any job could currently be profiled."""
+    return bool(sample_rate or flagged_tools or flagged_jobs)
+
+
+def should_profile(job: Job) -> bool:
+    """Return whether a job is flagged or sampled for profiling."""
+    if not enabled():
+        return False
+    return (
+        job["id"] in flagged_jobs
+        or job["input_hash"] in flagged_jobs
+        or job["operation"] in flagged_tools
+        or random.random() < sample_rate
+    )
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> list[dict]:
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_seconds": round(total, 6),
+            "cumulative_seconds": round(cumulative, 6),
+        }
+        for (filename, line, name), (_, calls, total, cumulative, _) in rows[:limit]
+    ]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> list[dict]:
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ]
+    )
+    return [
+        {
+            "site": str(stat.traceback[0]),
+            "bytes": stat.size,
+            "blocks": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+@contextlib.contextmanager
+def capture(job: Job, selected: bool | None = None):
+    """Profile the enclosed work if the job is selected, writing a capture.
+
+    ``selected`` overrides ``should_profile``, for workers that were told by
+    the process holding the profiling configuration.
+    """
+    if selected is None:
+        selected = should_profile(job)
+    if not selected or not _capture_lock.acquire(blocking=False):
+        yield
+        return
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(25)
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    error = None
+    try:
+        profiler.enable()
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            profiler.disable()
+    finally:
+        try:
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            _write_capture(job, profiler, snapshot, elapsed, peak, error)
+        finally:
+            _capture_lock.release()
+
+
+def _write_capture(
+    job: Job,
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+    elapsed: float,
+    peak: int,
+    error: str | None,
+) -> None:
+    directory = settings.PROFILES_DIR / job["id"]
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(directory / "profile.pstats")
+    snapshot.dump(str(directory / "tracemalloc.snapshot"))
+    summary = {
+        "job": {
+            "id": job["id"],
+            "operation": job["operation"],
+            "params": job["params"],
+            "input_hash": job["input_hash"],
+            "input_paths": job["input_paths"],
+            "created_at": job["created_at"],
+        },
+        "captured_at": time.time(),
+        "elapsed_seconds": round(elapsed, 6),
+        "traced_peak_bytes": peak,
+        "error": error,
+        "top_functions": _top_functions(profiler, settings.PROFILE_TOP_N),
+        "top_allocations": _top_allocations(snapshot, settings.PROFILE_TOP_N),
+    }
+    with open(directory / "summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
@@ -0,0 +1,511 @@
+"""PyMuPDF implementations of every operation.
+
+Called through ``operations``, which validates the parameters and picks the
+backend. Outputs are saved with ``garbage=1`` so, like pypdf, only the
+objects the result still references are written.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO
+from PIL import Image
+from .. import settings
+from .documents import pymupdf_document
+from .metrics import add_pages, stage
+from .operations import (
+    FINAL_STEPS,
+    OperationError,
+    invalid_page_selection,
+    page_image_name,
+    parse_page_range,
+    publish_page,
+    selected_pages,
+)
+from .tracing import span
+import contextlib
+import io
+import json
+import math
+import pymupdf
+import shutil
+import tempfile
+import threading
+import zipfile
+
+
+def _save(doc: pymupdf.Document, out: BinaryIO, **options) -> int:
+    """Save ``doc`` to ``out`` and return the number of bytes written.
+
+    PyMuPDF writes to Python file objects a few bytes per call, millions of
+    calls for a large document, so it saves to a temporary file and that is
+    copied over in large blocks instead.
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        path = Path(scratch) / "saved.pdf"
+        doc.save(path, **options)
+        with open(path, "rb") as saved:
+            shutil.copyfileobj(saved, out, 1024**2)
+            return saved.tell()
+
+
+def _runs(pages: list[int]) -> list[tuple[int, int]]:
+    """Group 1-based page numbers into ``(first, last)`` 0-based runs, in order."""
+    runs: list[list[int]] = []
+    for page in pages:
+        if runs and runs[-1][1] == page - 2:
+            runs[-1][1] = page - 1
+        else:
+            runs.append([page - 1, page - 1])
+    return [(first, last) for first, last in runs]
+
+
+def _copy_pages(doc: pymupdf.Document, pages: list[int]) -> pymupdf.Document:
+    part = pymupdf.open()
+    for first, last in _runs(pages):
+        part.insert_pdf(doc, from_page=first, to_page=last)
+    return part
+
+
+def _write_split(
+    doc: pymupdf.Document, stem: str, ranges: str, out: BinaryIO, deflate: bool
+) -> None:
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, page_range in enumerate(ranges.split(",")):
+            pages_to_add = parse_page_range(page_range.strip(), doc.page_count)
+            if not pages_to_add:
+                raise OperationError(f"Invalid page range: {page_range}")
+            with stage("transform") as transform_span:
+                part = _copy_pages(doc, pages_to_add)
+                transform_span.set(part=i + 1, pages=len(pages_to_add))
+            add_pages(len(pages_to_add))
+            with stage("serialize"):
+                with (
+                    span("archive_write") as write_span,
+                    zf.open(f"{stem}_part_{i + 1}.pdf", "w") as member,
+                ):
+                    write_span.set(
+                        bytes=_save(part, member, garbage=1, deflate=deflate)
+                    )
+                part.close()
+
+
+def _write_images(
+    doc: pymupdf.Document, input_name: str, dpi: int, out: BinaryIO
+) -> None:
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, page in enumerate(doc):
+            with stage("transform") as transform_span:
+                pix = page.get_pixmap(dpi=dpi)
+                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                transform_span.set(page=i + 1, width=pix.width, height=pix.height)
+            with stage("serialize"):
+                img_buffer = io.BytesIO()
+                with span("image_save", format="PNG") as save_span:
+                    img.save(img_buffer, format="PNG")
+                    save_span.set(bytes=img_buffer.tell())
+                name = page_image_name(input_name, i + 1)
+                with span("archive_write", bytes=img_buffer.tell()):
+                    zf.writestr(name, img_buffer.getvalue())
+                publish_page(name, img_buffer.getvalue())
+            add_pages(1)
+
+
+def _inherited(doc: pymupdf.Document, xref: int, key: str) -> tuple[str, str]:
+    """Return ``key`` of a page object as it sets it or inherits it from the
+    page tree, as ``xref_get_key`` does."""
+    while True:
+        kind, value = doc.xref_get_key(xref, key)
+        if kind != "null":
+            return kind, value
+        kind, value = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            return "null", "null"
+        xref = int(value.split()[0])
+
+
+def _inherited_rotation(doc: pymupdf.Document, xref: int) -> int:
+    """Return the /Rotate a page object sets or inherits from the page tree."""
+    kind, value = _inherited(doc, xref, "Rotate")
+    return int(value) if kind == "int" else 0
+
+
+def _rotate(doc: pymupdf.Document, angle: int) -> None:
+    # Setting /Rotate on the page objects avoids loading every page.
+    # Look the xrefs up first: editing an object resets PyMuPDF's
+    # page lookup, which would make each later lookup walk the tree.
+    for xref in [doc.page_xref(i) for i in range(doc.page_count)]:
+        rotation = (_inherited_rotation(doc, xref) + angle) % 360
+        doc.xref_set_key(xref, "Rotate", str(rotation))
+
+
+def split_pdf(input_paths: list[Path], out: BinaryIO, ranges: str) -> None:
+    with pymupdf_document(input_paths[0]) as doc:
+        _write_split(doc, input_paths[0].stem, ranges, out, deflate=False)
+
+
+class PartCache:
+    """Keeps the pages a merge took from each input, ready to copy again.
+
+    Merging the same files again (reordered, with one added or removed, or
+    with another selection for one of them) only copies the cached parts
+    into a new document instead of reading every input again. Entries are
+    keyed by path, size, modification time and selection; the least
+    recently used go once their inputs add up to more than ``max_bytes``.
+
+    PyMuPDF documents must not be used by two threads at once, so parts are
+    only handed out within ``session``, which merges hold one at a time. In
+    a worker that is never contended; without workers, merges in the server
+    take turns.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._parts: OrderedDict[tuple, tuple[pymupdf.Document, int]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._closing: list[pymupdf.Document] = []
+
+    @contextlib.contextmanager
+    def session(self):
+        """Hold the cache for one merge, then close the parts it dropped."""
+        with self._lock:
+            try:
+                yield self
+            finally:
+                # Closed only now: the merge may still refer to them.
+                for doc in self._closing:
+                    doc.close()
+                self._closing.clear()
+
+    def get(self, path: Path, selection: str) -> tuple[pymupdf.Document, bool]:
+        """Return the selected pages of ``path`` and whether they were cached."""
+        stat = path.stat()
+        key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns, selection)
+        with self._lock:
+            if key in self._parts:
+                self._parts.move_to_end(key)
+                return self._parts[key][0], True
+            with pymupdf_document(path) as doc:
+                pages = selected_pages(selection, doc.page_count)
+                with stage("transform"):
+                    part = _copy_pages(doc, pages)
+            if stat.st_size > self.max_bytes:
+                self._closing.append(part)
+                return part, False
+            self._parts[key] = (part, stat.st_size)
+            total = sum(size for _, size in self._parts.values())
+            while total > self.max_bytes:
+                _, (evicted, size) = self._parts.popitem(last=False)
+                self._closing.append(evicted)
+                total -= size
+        return part, False
+
+    def clear(self) -> None:
+        with self._lock:
+            for doc, _ in self._parts.values():
+                doc.close()
+            self._parts.clear()
+
+
+parts = PartCache(settings.MERGE_CACHE_MAX_BYTES)
+
+
+def merge_pdfs(input_paths: list[Path], out: BinaryIO, selections: list[str]) -> None:
+    merged = pymupdf.open()
+    try:
+        with parts.session():
+            for input_path, selection in zip(input_paths, selections):
+                part, cached = parts.get(input_path, selection)
+                with stage("transform") as transform_span:
+                    merged.insert_pdf(part)
+                    transform_span.set(cached=cached, pages=part.page_count)
+                add_pages(part.page_count)
+            with stage("serialize"):
+                _save(merged, out, garbage=1)
+    finally:
+        merged.close()
+
+
+def compress_pdf(input_paths: list[Path], out: BinaryIO) -> None:
+    with pymupdf_document(input_paths[0]) as doc:
+        add_pages(doc.page_count)
+        # Compression happens while writing: ``deflate`` compresses every
+        # stream that is not compressed yet, content streams included.
+        with stage("serialize"):
+            _save(doc, out, garbage=1, deflate=True)
+
+
+def pdf_to_images(input_paths: list[Path], out: BinaryIO, dpi: int) -> None:
+    with pymupdf_document(input_paths[0]) as doc:
+        _write_images(doc, input_paths[0].name, dpi, out)
+
+
+def extract_pages(input_paths: list[Path], out: BinaryIO, pages: str) -> None:
+    with pymupdf_document(input_paths[0]) as doc:
+        pages_to_extract = parse_page_range(pages, doc.page_count)
+        if pages_to_extract is None:
+            raise invalid_page_selection(pages)
+        with stage("transform"):
+            part = _copy_pages(doc, pages_to_extract)
+        add_pages(len(pages_to_extract))
+        with stage("serialize"):
+            _save(part, out, garbage=1)
+        part.close()
+
+
+def rotate_pdf(input_paths: list[Path], out: BinaryIO, angle: int) -> None:
+    with pymupdf_document(input_paths[0]) as doc:
+        with stage("transform"):
+            _rotate(doc, angle)
+        add_pages(doc.page_count)
+        with stage("serialize"):
+            _save(doc, out, garbage=1)
+
+
+# Resource names the stamp is added under. Every page uses the same names, so
+# pages that share a resource dictionary share a single entry for them.
+STAMP = "PdfOMaticStamp"
+STAMP_ALPHA = "PdfOMaticAlpha"
+STAMP_COLOR = (0.75, 0.38, 0.42)
+STAMP_FONT_SIZE = 72
+
+
+def _stamp_document(text: str, logo: Path | None) -> pymupdf.Document:
+    """Return a one-page document that is just the stamp, sized to fit it."""
+    stamp = pymupdf.open()
+    if logo is None:
+        width = pymupdf.get_text_length(text, "helv", STAMP_FONT_SIZE)
+        page = stamp.new_page(width=width, height=STAMP_FONT_SIZE * 1.2)
+        page.insert_text(
+            (0, STAMP_FONT_SIZE * 0.95),
+            text,
+            fontname="helv",
+            fontsize=STAMP_FONT_SIZE,
+            color=STAMP_COLOR,
+        )
+    elif logo.read_bytes()[:5] == b"%PDF-":
+        with pymupdf.open(logo) as source:
+            stamp.insert_pdf(source, from_page=0, to_page=0)
+    else:
+        with Image.open(logo) as image:
+            width, height = image.size
+        page = stamp.new_page(width=width, height=height)
+        page.insert_image(page.rect, filename=str(logo))
+    return stamp
+
+
+def _add_form(doc: pymupdf.Document, stamp: pymupdf.Document) -> tuple[int, list]:
+    """Copy the stamp's page into ``doc`` as a form XObject; return its xref and
+    its ``[x0, y0, x1, y1]`` bounding box."""
+    doc.insert_pdf(stamp)
+    page = doc[-1]
+    contents = page.read_contents()
+    _, resources = doc.xref_get_key(page.xref, "Resources")
+    box = [float(v) for v in _inherited(doc, page.xref, "MediaBox")[1][1:-1].split()]
+    doc.delete_page(-1)
+    form = doc.get_new_xref()
+    doc.update_object(
+        form,
+        f"<< /Type /XObject /Subtype /Form /BBox [{' '.join(map(str, box))}]"
+        f" /Resources {resources} /Group << /S /Transparency >> >>",
+    )
+    doc.update_stream(form, contents)
+    return form, box
+
+
+def _new_stream(doc: pymupdf.Document, data: bytes) -> int:
+    xref = doc.get_new_xref()
+    doc.update_object(xref, "<< >>")
+    doc.update_stream(xref, data)
+    return xref
+
+
+def _stamp_matrix(
+    box: list[float], rotation: int, stamp_box: list[float], position: str
+) -> pymupdf.Matrix:
+    """Return the matrix that places the stamp at ``position`` on a page with
+    visible area ``box`` and /Rotate ``rotation``, as the page is viewed."""
+    x0, y0, x1, y1 = box
+    width, height = x1 - x0, y1 - y0
+    if rotation in (90, 270):
+        width, height = height, width
+    stamp_width = stamp_box[2] - stamp_box[0]
+    stamp_height = stamp_box[3] - stamp_box[1]
+    matrix = pymupdf.Matrix(1, 0, 0, 1, -stamp_box[0], -stamp_box[1])
+    if position == "diagonal":
+        scale = min(
+            0.7 * math.hypot(width, height) / stamp_width,
+            0.25 * min(width, height) / stamp_height,
+        )
+        matrix *= pymupdf.Matrix(1, 0, 0, 1, -stamp_width / 2, -stamp_height / 2)
+        matrix *= pymupdf.Matrix(scale, scale)
+        matrix *= pymupdf.Matrix(math.degrees(math.atan2(height, width)))
+        matrix *= pymupdf.Matrix(1, 0, 0, 1, width / 2, height / 2)
+    else:
+        share = 0.6 if position == "center" else 0.3
+        scale = min(share * width / stamp_width, share / 2 * height / stamp_height)
+        margin = 0.04 * min(width, height)
+        free_x = width - scale * stamp_width
+        free_y = height - scale * stamp_height
+        x = margin if "left" in position else free_x / 2
+        if "right" in position:
+            x = free_x - margin
+        y = margin if "bottom" in position else free_y / 2
+        if "top" in position:
+            y = free_y - margin
+        matrix *= pymupdf.Matrix(scale, scale)
+        matrix *= pymupdf.Matrix(1, 0, 0, 1, x, y)
+    # From the page as viewed back to its unrotated coordinates.
+    matrix *= {
+        0: pymupdf.Matrix(1, 0, 0, 1, x0, y0),
+        90: pymupdf.Matrix(0, 1, -1, 0, x1, y0),
+        180: pymupdf.Matrix(-1, 0, 0, -1, x1, y1),
+        270: pymupdf.Matrix(0, -1, 1, 0, x0, y1),
+    }[rotation % 360]
+    return matrix
+
+
+def _put_resource(
+    doc: pymupdf.Document, xref: int, category: str, name: str, value: str, done: set
+) -> None:
+    """Add ``/category/name`` to a page's resources, unless the dictionary it
+    goes into (possibly shared with other pages) already got it."""
+    owner, path = xref, "Resources"
+    kind, ref = doc.xref_get_key(owner, path)
+    if kind == "xref":
+        owner, path = int(ref.split()[0]), ""
+    path = f"{path}/{category}" if path else category
+    kind, ref = doc.xref_get_key(owner, path)
+    if kind == "xref":
+        owner, path = int(ref.split()[0]), ""
+    if (owner, path) in done:
+        return
+    doc.xref_set_key(owner, f"{path}/{name}" if path else name, value)
+    done.add((owner, path))
+
+
+def watermark_pdf(
+    input_paths: list[Path],
+    out: BinaryIO,
+    text: str,
+    pages: str,
+    opacity: float,
+    position: str,
+) -> None:
+    logo = input_paths[1] if len(input_paths) > 1 else None
+    with pymupdf_document(input_paths[0]) as doc:
+        selection = selected_pages(pages, doc.page_count)
+        # Look the xrefs up first: editing an object resets PyMuPDF's
+        # page lookup, which would make each later lookup walk the tree.
+        xrefs = [doc.page_xref(page - 1) for page in selection]
+        with stage("transform") as transform_span:
+            with _stamp_document(text, logo) as stamp:
+                form, stamp_box = _add_form(doc, stamp)
+            alpha = doc.get_new_xref()
+            doc.update_object(
+                alpha, f"<< /Type /ExtGState /ca {opacity} /CA {opacity} >>"
+            )
+            begin = _new_stream(doc, b"q\n")
+            # Pages of the same size and rotation share one stream placing the stamp.
+            placements: dict[tuple, int] = {}
+            done: set = set()
+            for xref in xrefs:
+                kind, box = _inherited(doc, xref, "CropBox")
+                if kind != "array":
+                    kind, box = _inherited(doc, xref, "MediaBox")
+                rotation = _inherited_rotation(doc, xref) % 360
+                key = (box, rotation)
+                if key not in placements:
+                    matrix = _stamp_matrix(
+                        [float(v) for v in box[1:-1].split()],
+                        rotation,
+                        stamp_box,
+                        position,
+                    )
+                    placements[key] = _new_stream(
+                        doc,
+                        f"Q q /{STAMP_ALPHA} gs {' '.join(f'{v:.4f}' for v in matrix)}"
+                        f" cm /{STAMP} Do Q\n".encode(),
+                    )
+                if doc.xref_get_key(xref, "Resources")[0] == "null":
+                    kind, resources = _inherited(doc, xref, "Resources")
+                    doc.xref_set_key(
+                        xref, "Resources", resources if kind != "null" else "<< >>"
+                    )
+                _put_resource(doc, xref, "XObject", STAMP, f"{form} 0 R", done)
+                _put_resource(doc, xref, "ExtGState", STAMP_ALPHA, f"{alpha} 0 R", done)
+                kind, contents = doc.xref_get_key(xref, "Contents")
+                if kind == "xref" and not doc.xref_is_stream(int(contents.split()[0])):
+                    kind, contents = "array", doc.xref_object(int(contents.split()[0]))
+                existing = {"xref": contents, "array": contents[1:-1]}.get(kind, "")
+                doc.xref_set_key(
+                    xref,
+                    "Contents",
+                    f"[{begin} 0 R {existing} {placements[key]} 0 R]",
+                )
+            transform_span.set(pages=len(xrefs), placements=len(placements))
+        add_pages(doc.page_count)
+        with stage("serialize"):
+            _save(doc, out, garbage=1)
+
+
+def _text_record(page: pymupdf.Page, number: int, layout: bool) -> dict:
+    if not layout:
+        return {"page": number, "text": page.get_text()}
+    # Block tuples are (x0, y0, x1, y1, text, number, type); type 1 is an image.
+    blocks = [block for block in page.get_text("blocks") if block[6] == 0]
+    return {
+        "page": number,
+        "text": "\n".join(block[4] for block in blocks),
+        "blocks": [
+            {"bbox": [round(v, 2) for v in block[:4]], "text": block[4]}
+            for block in blocks
+        ],
+    }
+
+
+def extract_text(
+    input_paths: list[Path], out: BinaryIO, pages: str, layout: bool, text_format: str
+) -> None:
+    # Each page is written as soon as it is read, so memory use does not
+    # grow with the document.
+    with pymupdf_document(input_paths[0]) as doc:
+        numbers = selected_pages(pages, doc.page_count)
+        with stage("transform") as transform_span:
+            for number in numbers:
+                record = _text_record(doc.load_page(number - 1), number, layout)
+                if text_format == "txt":
+                    data = record["text"] + "\f"
+                else:
+                    data = json.dumps(record, ensure_ascii=False) + "\n"
+                out.write(data.encode("utf-8", "replace"))
+                add_pages(1)
+            transform_span.set(pages=len(numbers))
+
+
+def run_pipeline(
+    input_paths: list[Path], out: BinaryIO, steps: list[tuple[str, dict]]
+) -> None:
+    input_path = input_paths[0]
+    final, final_params = steps[-1] if steps[-1][0] in FINAL_STEPS else (None, {})
+    deflate = False
+    with pymupdf_document(input_path) as doc:
+        for operation, params in steps[: len(steps) - (final is not None)]:
+            with stage("transform") as transform_span:
+                transform_span.set(step=operation)
+                if operation == "extract":
+                    pages = parse_page_range(params["pages"], doc.page_count)
+                    if pages is None:
+                        raise invalid_page_selection(params["pages"])
+                    doc.select([page - 1 for page in pages])
+                elif operation == "rotate":
+                    _rotate(doc, params["angle"])
+                elif operation == "compress":
+                    deflate = True
+        if final == "split":
+            _write_split(doc, input_path.stem, final_params["ranges"], out, deflate)
+        elif final == "pdf_to_images":
+            _write_images(doc, input_path.name, final_params["dpi"], out)
+        else:
+            add_pages(doc.page_count)
+            with stage("serialize"):
+                _save(doc, out, garbage=1, deflate=deflate)
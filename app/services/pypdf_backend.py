@@ -0,0 +1,102 @@
+"""pypdf implementations of the structural operations.
+
+Called through ``operations``, which validates the parameters and picks the
+backend; PDF to Images needs a renderer and only exists in PyMuPDF.
+"""
+
+from pathlib import Path
+from typing import BinaryIO
+from .documents import pypdf_reader
+from .metrics import add_pages, stage
+from .operations import (
+    OperationError,
+    invalid_page_selection,
+    parse_page_range,
+    selected_pages,
+)
+from .tracing import span
+import contextlib
+import io
+import pypdf
+import zipfile
+
+
+def split_pdf(input_paths: list[Path], out: BinaryIO, ranges: str) -> None:
+    input_path = input_paths[0]
+    with (
+        pypdf_reader(input_path) as reader,
+        zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf,
+    ):
+        total_pages = len(reader.pages)
+        for i, page_range in enumerate(ranges.split(",")):
+            pages_to_add = parse_page_range(page_range.strip(), total_pages)
+            if not pages_to_add:
+                raise OperationError(f"Invalid page range: {page_range}")
+            with stage("transform") as transform_span:
+                writer = pypdf.PdfWriter()
+                for page_num in pages_to_add:
+                    writer.add_page(reader.pages[page_num - 1])
+                transform_span.set(part=i + 1, pages=len(pages_to_add))
+            add_pages(len(pages_to_add))
+            with stage("serialize"):
+                output_buffer = io.BytesIO()
+                writer.write(output_buffer)
+                with span("archive_write", bytes=output_buffer.tell()):
+                    zf.writestr(
+                        f"{input_path.stem}_part_{i + 1}.pdf",
+                        output_buffer.getvalue(),
+                    )
+
+
+def merge_pdfs(input_paths: list[Path], out: BinaryIO, selections: list[str]) -> None:
+    writer = pypdf.PdfWriter()
+    # Every input stays mapped until the merged document is written.
+    with contextlib.ExitStack() as inputs:
+        for input_path, selection in zip(input_paths, selections):
+            reader = inputs.enter_context(pypdf_reader(input_path))
+            pages = selected_pages(selection, len(reader.pages))
+            with stage("transform"):
+                writer.append(reader, pages=[page - 1 for page in pages])
+            add_pages(len(pages))
+        with stage("serialize"):
+            writer.write(out)
+    writer.close()
+
+
+def compress_pdf(input_paths: list[Path], out: BinaryIO) -> None:
+    with pypdf_reader(input_paths[0]) as reader:
+        with stage("transform"):
+            writer = pypdf.PdfWriter()
+            for page in reader.pages:
+                writer.add_page(page)
+            for page in writer.pages:
+                page.compress_content_streams()
+        add_pages(len(writer.pages))
+        with stage("serialize"):
+            writer.write(out)
+
+
+def extract_pages(input_paths: list[Path], out: BinaryIO, pages: str) -> None:
+    with pypdf_reader(input_paths[0]) as reader:
+        pages_to_extract = parse_page_range(pages, len(reader.pages))
+        if pages_to_extract is None:
+            raise invalid_page_selection(pages)
+        with stage("transform"):
+            writer = pypdf.PdfWriter()
+            for page_num in pages_to_extract:
+                writer.add_page(reader.pages[page_num - 1])
+        add_pages(len(pages_to_extract))
+        with stage("serialize"):
+            writer.write(out)
+
+
+def rotate_pdf(input_paths: list[Path], out: BinaryIO, angle: int) -> None:
+    with pypdf_reader(input_paths[0]) as reader:
+        with stage("transform"):
+            writer = pypdf.PdfWriter()
+            for page in reader.pages:
+                page.rotate(angle)
+                writer.add_page(page)
+        add_pages(len(writer.pages))
+        with stage("serialize"):
+            writer.write(out)
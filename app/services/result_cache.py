@@ -0,0 +1,148 @@
+"""Disk-backed LRU cache of operation results."""
+
+from pathlib import Path
+from .. import settings
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+"""
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """Hard-link ``source`` to ``target``, copying when linking is not possible."""
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class ResultCache:
+    """Stores results keyed by input hash, operation and parameters."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @contextlib.contextmanager
+    def _connect(self):
+        with self._lock:
+            if not self._initialized:
+                self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.directory / "index.sqlite3", timeout=30)
+            conn.row_factory = sqlite3.Row
+            try:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    @staticmethod
+    def key(input_hash: str, operation: str, params: dict, backend: str = "") -> str:
+        """Return the cache key for an operation run with normalized params.
+
+        ``backend`` names the PDF backend that produces the result, since
+        each writes different bytes for the same request.
+        """
+        payload = json.dumps([input_hash, operation, params, backend], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def fetch(self, key: str, target: Path) -> bool:
+        """Place the cached result for ``key`` at ``target``, if there is one."""
+        if not self.enabled:
+            return False
+        path = self._path(key)
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+            ).rowcount
+            if updated and path.exists():
+                _link_or_copy(path, target)
+                self.hits += 1
+                return True
+            if updated:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.misses += 1
+        return False
+
+    def put(self, key: str, source: Path) -> None:
+        """Store ``source`` as the result for ``key`` and evict down to the cap."""
+        if not self.enabled:
+            return
+        size = source.stat().st_size
+        if size > self.max_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(source, path)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, size, last_access)"
+                " VALUES (?, ?, ?)",
+                (key, size, time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the cache fits its cap."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for row in conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access"
+        ).fetchall():
+            try:
+                self._path(row["key"]).unlink(missing_ok=True)
+            except OSError as e:
+                logging.exception(f"Error: {e}")
+                continue
+            conn.execute("DELETE FROM entries WHERE key = ?", (row["key"],))
+            total -= row["size"]
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size of the cache."""
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+cache = ResultCache(settings.CACHE_DIR, settings.CACHE_MAX_BYTES)
@@ -0,0 +1,384 @@
+"""Where uploads and results are kept: a local directory or an S3 bucket.
+
+Objects are addressed by relative, ``/``-separated keys such as
+``results/<job>/<name>``. With a bucket every node of a deployment sees the
+same objects, so chunks of an upload can land on any replica and a signed
+download link works on any of them; each node keeps a read-through cache of
+the objects it reads. Job records are not kept here (see ``job_store``).
+"""
+
+from pathlib import Path
+from typing import BinaryIO, TypedDict
+from urllib.parse import quote, urlencode
+from .. import settings
+import hashlib
+import hmac
+import io
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import time
+
+
+class StoredObject(TypedDict):
+    """A stored object, as listed."""
+
+    key: str
+    size: int
+    modified: float
+
+
+def _check_key(key: str) -> str:
+    parts = key.split("/")
+    if not key or key.startswith("/") or any(p in ("", ".", "..") for p in parts):
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """Place ``source`` at ``target`` atomically, hard-linking when possible."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    partial.unlink(missing_ok=True)
+    try:
+        os.link(source, partial)
+    except OSError:
+        shutil.copyfile(source, partial)
+    os.replace(partial, target)
+
+
+def _signature(secret: str, key: str, filename: str, expires: int) -> str:
+    message = f"{key}\n{filename}\n{expires}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _stored_secret(root: Path) -> str:
+    """Return the signing secret kept in ``root``, creating it on first use.
+
+    The first process to get here writes it; every other process sharing
+    ``root``, on this node or another, reads the same one.
+    """
+    path = root / ".secret"
+    root.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another process may have created the file but not written it yet.
+        for _ in range(50):
+            secret = path.read_text().strip()
+            if secret:
+                return secret
+            time.sleep(0.1)
+        raise RuntimeError(f"The storage secret in {path} is empty.") from None
+    secret = secrets.token_hex(32)
+    with os.fdopen(fd, "w") as f:
+        f.write(secret)
+    return secret
+
+
+class LocalStorage:
+    """Keeps objects as files under ``root``.
+
+    Download links point at the API's ``/files`` route and carry an HMAC of
+    the key, filename and expiry, so they work without a session and stop
+    working once they expire. Several nodes can share a network directory
+    as ``root`` if they also share ``secret``.
+    """
+
+    def __init__(self, root: Path, secret: str, url_ttl: int):
+        self.root = root
+        self.secret = secret
+        self.url_ttl = url_ttl
+
+    def _path(self, key: str) -> Path:
+        return self.root / _check_key(key)
+
+    def open(self, key: str) -> BinaryIO:
+        """Open an object for streaming reads."""
+        return open(self._path(key), "rb")
+
+    def save(self, key: str, src: BinaryIO) -> None:
+        """Store what remains of ``src`` as ``key``, replacing it atomically."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as partial:
+            try:
+                shutil.copyfileobj(src, partial)
+            except BaseException:
+                os.unlink(partial.name)
+                raise
+        os.replace(partial.name, path)
+
+    def write(self, key: str, data: bytes) -> None:
+        """Store ``data`` as ``key``."""
+        self.save(key, io.BytesIO(data))
+
+    def put(self, key: str, source: Path) -> None:
+        """Store the finished local file ``source`` as ``key``."""
+        path = self._path(key)
+        if path.exists() and path.samefile(source):
+            return
+        _link_or_copy(source, path)
+
+    def local_path(self, key: str) -> Path:
+        """Return a local file holding the object, raising if it does not exist."""
+        path = self._path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        return path
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def list(self, prefix: str) -> list[StoredObject]:
+        """Return the objects whose keys start with the directory ``prefix``."""
+        directory = self._path(prefix.rstrip("/"))
+        if not directory.is_dir():
+            return []
+        objects = []
+        for path in directory.rglob("*"):
+            if path.name.startswith(".") or not path.is_file():
+                continue
+            stat = path.stat()
+            objects.append(
+                StoredObject(
+                    key=path.relative_to(self.root).as_posix(),
+                    size=stat.st_size,
+                    modified=stat.st_mtime,
+                )
+            )
+        return objects
+
+    def delete(self, key: str) -> None:
+        """Delete an object, or every object under a prefix ending in ``/``."""
+        path = self._path(key.rstrip("/"))
+        if key.endswith("/"):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+    def download_url(self, key: str, filename: str) -> str:
+        """Return an expiring link, relative to the API, that downloads ``key``."""
+        expires = int(time.time()) + self.url_ttl
+        query = urlencode(
+            {
+                "filename": filename,
+                "expires": expires,
+                "token": _signature(self.secret, key, filename, expires),
+            }
+        )
+        return f"/files/{quote(_check_key(key))}?{query}"
+
+    def verify(self, key: str, filename: str, expires: int, token: str) -> bool:
+        """Return whether a link from ``download_url`` is genuine and current."""
+        if expires < time.time():
+            return False
+        expected = _signature(self.secret, key, filename, expires)
+        return hmac.compare_digest(expected, token)
+
+
+class S3Storage:
+    """Keeps objects in an S3-compatible bucket, under ``prefix``.
+
+    ``endpoint_url`` points the client at MinIO, LocalStack or any other
+    S3-compatible service. Objects read on this node are cached under
+    ``cache_dir``, least recently used first out once the cache passes
+    ``cache_max_bytes``. Download links are presigned by the bucket.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str,
+        cache_dir: Path,
+        cache_max_bytes: int,
+        url_ttl: int,
+        endpoint_url: str | None = None,
+        client=None,
+    ):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError(
+                    "S3 storage needs boto3; install it with `pip install boto3`."
+                ) from e
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.url_ttl = url_ttl
+
+    def _key(self, key: str) -> str:
+        return self.prefix + _check_key(key)
+
+    def _missing(self, error) -> bool:
+        code = error.response.get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def open(self, key: str) -> BinaryIO:
+        """Open an object for streaming reads."""
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(key) from None
+            raise
+        return response["Body"]
+
+    def save(self, key: str, src: BinaryIO) -> None:
+        """Upload what remains of ``src`` as ``key``, in parts if it is large."""
+        self.client.upload_fileobj(src, self.bucket, self._key(key))
+
+    def write(self, key: str, data: bytes) -> None:
+        """Store ``data`` as ``key``."""
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def put(self, key: str, source: Path) -> None:
+        """Upload the finished local file ``source`` as ``key``.
+
+        The file is also kept in this node's cache, since whoever produced a
+        result is the likeliest to read it next.
+        """
+        self.client.upload_file(str(source), self.bucket, self._key(key))
+        try:
+            _link_or_copy(source, self.cache_dir / _check_key(key))
+            self._evict()
+        except OSError as e:
+            logging.exception(f"Error: {e}")
+
+    def local_path(self, key: str) -> Path:
+        """Return this node's cached copy of the object, downloading it if needed."""
+        path = self.cache_dir / _check_key(key)
+        if path.is_file():
+            os.utime(path)
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as partial:
+            try:
+                with self.open(key) as body:
+                    shutil.copyfileobj(body, partial)
+            except BaseException:
+                os.unlink(partial.name)
+                raise
+        os.replace(partial.name, path)
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        """Drop the least recently used cached objects until the cache fits."""
+        files = [
+            (path.stat(), path)
+            for path in self.cache_dir.rglob("*")
+            if path.is_file() and not path.name.startswith(".")
+        ]
+        total = sum(stat.st_size for stat, _ in files)
+        for stat, path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.cache_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.size(key)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def size(self, key: str) -> int:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(key) from None
+            raise
+        return head["ContentLength"]
+
+    def list(self, prefix: str) -> list[StoredObject]:
+        """Return the objects whose keys start with the directory ``prefix``."""
+        objects = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket, Prefix=self._key(prefix.rstrip("/")) + "/"
+        )
+        for page in pages:
+            for item in page.get("Contents", []):
+                objects.append(
+                    StoredObject(
+                        key=item["Key"][len(self.prefix) :],
+                        size=item["Size"],
+                        modified=item["LastModified"].timestamp(),
+                    )
+                )
+        return objects
+
+    def delete(self, key: str) -> None:
+        """Delete an object, or every object under a prefix ending in ``/``."""
+        if key.endswith("/"):
+            keys = [item["key"] for item in self.list(key)]
+            shutil.rmtree(self.cache_dir / _check_key(key.rstrip("/")), True)
+        else:
+            keys = [key]
+            (self.cache_dir / _check_key(key)).unlink(missing_ok=True)
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={
+                    "Objects": [
+                        {"Key": self._key(k)} for k in keys[start : start + 1000]
+                    ],
+                    "Quiet": True,
+                },
+            )
+
+    def download_url(self, key: str, filename: str) -> str:
+        """Return a presigned link that downloads ``key`` as ``filename``."""
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=self.url_ttl,
+        )
+
+    def verify(self, key: str, filename: str, expires: int, token: str) -> bool:
+        """Bucket links are checked by the bucket, so none are accepted here."""
+        return False
+
+
+def _make_storage(kind: str):
+    if kind == "s3":
+        return S3Storage(
+            settings.STORAGE_S3_BUCKET,
+            settings.STORAGE_S3_PREFIX,
+            settings.STORAGE_CACHE_DIR,
+            settings.STORAGE_CACHE_MAX_BYTES,
+            settings.STORAGE_URL_TTL,
+            endpoint_url=settings.STORAGE_S3_ENDPOINT_URL or None,
+        )
+    return LocalStorage(
+        settings.STORAGE_DIR,
+        settings.STORAGE_SECRET or _stored_secret(settings.STORAGE_DIR),
+        settings.STORAGE_URL_TTL,
+    )
+
+
+storage = _make_storage(settings.STORAGE)
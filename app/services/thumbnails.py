@@ -0,0 +1,155 @@
+"""Low-resolution page previews, rendered with PyMuPDF and cached on disk.
+
+PyMuPDF is not thread-safe, so the server's threads only schedule work:
+pages are rendered on the worker pool, or one call at a time in the server
+process when it runs without workers.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .. import settings
+from . import tracing, worker_pool
+from .documents import pymupdf_document
+from .hashing import hash_files
+import logging
+import os
+import shutil
+import threading
+import time
+
+# Pages rendered per background task; each task opens the document once.
+BATCH_PAGES = 16
+# Leading pages rendered ahead of being requested; the rest are rendered as
+# the browser asks for them.
+PREFETCH_PAGES = 3 * BATCH_PAGES
+
+
+def _call(function, *args):
+    """Run ``function`` on a worker, or serialized here if there are none."""
+    if worker_pool.pool.running:
+        return worker_pool.pool.call(function, *args)
+    with worker_pool.inline_lock:
+        return function(*args)
+
+
+def _page_count(source: Path) -> int:
+    with pymupdf_document(source) as doc:
+        return doc.page_count
+
+
+def _render_pages(directory: Path, dpi: int, pages: list[int]) -> None:
+    """Render ``pages`` of ``directory``'s source into it, skipping pages the
+    document does not have."""
+    with pymupdf_document(directory / "source.pdf") as doc:
+        for page in pages:
+            if not 1 <= page <= doc.page_count:
+                continue
+            target = directory / f"{page}.jpg"
+            pix = doc[page - 1].get_pixmap(dpi=dpi)
+            tmp = target.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(pix.tobytes("jpg", jpg_quality=70))
+            os.replace(tmp, target)
+
+
+class ThumbnailCache:
+    """Stores one JPEG per page under the document's content hash.
+
+    A registered document keeps a hard link to its source, so previews for
+    pages nobody has scrolled to yet can still be rendered on request after
+    the upload itself is gone. Identical documents share their previews.
+    """
+
+    def __init__(self, directory: Path, dpi: int, workers: int):
+        self.directory = directory
+        self.dpi = dpi
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _dir(self, doc_hash: str) -> Path:
+        if not doc_hash.isalnum():
+            raise ValueError(f"Invalid document hash: {doc_hash}")
+        return self.directory / doc_hash
+
+    def path(self, doc_hash: str, page: int) -> Path:
+        """Return where the preview of 1-based ``page`` is stored."""
+        return self._dir(doc_hash) / f"{page}.jpg"
+
+    def register(self, pdf_path: Path) -> tuple[str, int]:
+        """Keep ``pdf_path`` for previews and start rendering its first pages.
+
+        Returns the document hash and its page count.
+        """
+        doc_hash = hash_files([pdf_path])
+        directory = self._dir(doc_hash)
+        directory.mkdir(parents=True, exist_ok=True)
+        source = directory / "source.pdf"
+        if not source.exists():
+            tmp = directory / f"source.{threading.get_ident()}.tmp"
+            try:
+                os.link(pdf_path, tmp)
+            except OSError:
+                shutil.copyfile(pdf_path, tmp)
+            os.replace(tmp, source)
+        os.utime(directory)
+        pages = _call(_page_count, source)
+        self._prefetch(doc_hash, pages)
+        return doc_hash, pages
+
+    def _prefetch(self, doc_hash: str, pages: int) -> None:
+        # These threads only wait on workers. One fewer than there are
+        # workers, so prefetching never holds up every job or the previews
+        # being requested; with a single worker, nothing is prefetched.
+        if self.workers < 2:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, self.workers - 1),
+                    thread_name_prefix="thumbnails",
+                )
+        prefetched = min(pages, PREFETCH_PAGES)
+        for first in range(1, prefetched + 1, BATCH_PAGES):
+            last = min(prefetched, first + BATCH_PAGES - 1)
+            self._executor.submit(self._render_safely, doc_hash, range(first, last + 1))
+
+    def _render_safely(self, doc_hash: str, pages: range) -> None:
+        try:
+            self.render(doc_hash, pages)
+        except Exception as e:
+            logging.exception(f"Error: {e}")
+
+    def render(self, doc_hash: str, pages: range) -> None:
+        """Render the previews of ``pages`` that are not cached yet."""
+        missing = [page for page in pages if not self.path(doc_hash, page).exists()]
+        if not missing:
+            return
+        with tracing.span("thumbnails", pages=len(missing)):
+            _call(_render_pages, self._dir(doc_hash), self.dpi, missing)
+
+    def get(self, doc_hash: str, page: int) -> Path | None:
+        """Return the preview of ``page``, rendering it now if needed."""
+        target = self.path(doc_hash, page)
+        if target.exists():
+            return target
+        if not (self._dir(doc_hash) / "source.pdf").exists():
+            return None
+        self.render(doc_hash, range(page, page + 1))
+        return target if target.exists() else None
+
+    def purge_expired(self, ttl_seconds: int = settings.JOB_TTL_SECONDS) -> int:
+        """Delete the previews of documents not registered within the TTL."""
+        if not self.directory.exists():
+            return 0
+        cutoff = time.time() - ttl_seconds
+        purged = 0
+        for directory in self.directory.iterdir():
+            if directory.stat().st_mtime < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+                purged += 1
+        return purged
+
+
+cache = ThumbnailCache(
+    settings.THUMBNAILS_DIR, settings.THUMBNAIL_DPI, settings.WORKERS
+)
@@ -0,0 +1,147 @@
+"""Nested trace spans for tool runs, exported locally as JSON lines."""
+
+from contextvars import ContextVar
+from .. import settings
+import contextlib
+import json
+import secrets
+import sys
+import threading
+import time
+
+
+class Span:
+    """A timed, named unit of work with attributes and a parent."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.status = "ok"
+        self.error = None
+
+    def set(self, **attributes) -> None:
+        """Add or replace attributes on the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self, duration: float) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(duration * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is disabled."""
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _RemoteParent(_NoopSpan):
+    """A span from another process that local spans are parented to."""
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+
+class FileExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, record: dict) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+class ConsoleExporter:
+    """Prints finished spans to stderr."""
+
+    def export(self, record: dict) -> None:
+        print(f"[trace] {json.dumps(record, default=str)}", file=sys.stderr)
+
+
+def _make_exporter(kind: str):
+    if kind == "file":
+        return FileExporter(settings.TRACE_FILE)
+    if kind == "console":
+        return ConsoleExporter()
+    return None
+
+
+exporter = _make_exporter(settings.TRACE_EXPORTER)
+
+_current: ContextVar[Span | _RemoteParent | None] = ContextVar(
+    "current_span", default=None
+)
+
+
+def enabled() -> bool:
+    """Return whether spans are being exported."""
+    return exporter is not None
+
+
+def current_span() -> Span | _NoopSpan:
+    """Return the innermost active span, or a no-op span."""
+    return _current.get() or _NOOP
+
+
+def context() -> tuple[str, str] | None:
+    """Return the current trace and span IDs, to continue a trace elsewhere."""
+    current = _current.get()
+    return (current.trace_id, current.span_id) if current else None
+
+
+@contextlib.contextmanager
+def attach(parent: tuple[str, str] | None):
+    """Parent the spans opened inside to a span from ``context()``."""
+    if parent is None:
+        yield
+        return
+    token = _current.set(_RemoteParent(*parent))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """Open a span nested under the current one and export it when it ends."""
+    if exporter is None:
+        yield _NOOP
+        return
+    parent = _current.get()
+    trace_id = parent.trace_id if parent else secrets.token_hex(16)
+    current = Span(name, trace_id, parent.span_id if parent else None, attributes)
+    token = _current.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        exporter.export(current.to_dict(time.perf_counter() - start))
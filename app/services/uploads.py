@@ -0,0 +1,237 @@
+"""Resumable, chunked uploads, stored chunk by chunk and joined once complete."""
+
+from pathlib import Path
+from typing import TypedDict
+from .. import settings
+from . import storage
+from .documents import pypdf_reader
+import hashlib
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+RECEIVING = "receiving"
+COMPLETE = "complete"
+INVALID = "invalid"
+
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadError(ValueError):
+    """Raised when a chunk or an upload request is rejected."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ChunkedUpload(TypedDict):
+    """The progress of one resumable upload."""
+
+    id: str
+    filename: str
+    size: int
+    chunk_size: int
+    total_chunks: int
+    received: list[int]
+    status: str
+    error: str
+    pages: int
+    created_at: float
+    updated_at: float
+
+
+def _validate(path: Path) -> int:
+    """Return the page count of an assembled PDF, raising if it is unreadable."""
+    with pypdf_reader(path) as reader:
+        pages = len(reader.pages)
+    if pages == 0:
+        raise UploadError("The provided PDF is empty or corrupted.", 422)
+    return pages
+
+
+class UploadStore:
+    """Keeps each upload's chunks as separate objects next to a JSON progress file.
+
+    Chunks can arrive in any order, on any node, and a client can resume by
+    asking which ones are still missing. The PDF header is checked as soon
+    as the first chunk lands; once the last one does, the chunks are joined
+    and the document is parsed, so a bad file is rejected before it is used.
+    """
+
+    def __init__(self, storage, prefix: str, chunk_size: int, max_bytes: int):
+        self.storage = storage
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._finishing: set[str] = set()
+
+    def _key(self, upload_id: str, name: str = "") -> str:
+        if not upload_id.isalnum():
+            raise UploadError("Upload not found.", 404)
+        return f"{self.prefix}/{upload_id}/{name}"
+
+    def _save(self, upload: ChunkedUpload) -> None:
+        upload["updated_at"] = time.time()
+        record = {**upload, "received": []}
+        self.storage.write(
+            self._key(upload["id"], "upload.json"), json.dumps(record).encode()
+        )
+
+    def _received(self, upload_id: str) -> list[int]:
+        chunks = self.storage.list(self._key(upload_id, "chunks"))
+        return sorted(int(item["key"].rsplit("/", 1)[1]) for item in chunks)
+
+    def create(self, filename: str, size: int) -> ChunkedUpload:
+        """Start an upload of ``size`` bytes and return its progress."""
+        filename = Path(filename).name
+        if not filename:
+            raise UploadError("A filename is required.")
+        if size <= 0 or size > self.max_bytes:
+            raise UploadError(
+                f"Uploads must be between 1 byte and {self.max_bytes} bytes.", 413
+            )
+        now = time.time()
+        upload = ChunkedUpload(
+            id=uuid.uuid4().hex,
+            filename=filename,
+            size=size,
+            chunk_size=self.chunk_size,
+            total_chunks=-(-size // self.chunk_size),
+            received=[],
+            status=RECEIVING,
+            error="",
+            pages=0,
+            created_at=now,
+            updated_at=now,
+        )
+        self._save(upload)
+        return upload
+
+    def get(self, upload_id: str) -> ChunkedUpload:
+        """Return the progress of an upload."""
+        try:
+            with self.storage.open(self._key(upload_id, "upload.json")) as f:
+                upload = json.load(f)
+        except FileNotFoundError:
+            raise UploadError("Upload not found.", 404) from None
+        if upload["status"] == RECEIVING:
+            upload["received"] = self._received(upload_id)
+        elif upload["status"] == COMPLETE:
+            upload["received"] = list(range(upload["total_chunks"]))
+        return upload
+
+    def write_chunk(
+        self, upload_id: str, index: int, data: bytes, checksum: str
+    ) -> ChunkedUpload:
+        """Store chunk ``index`` if it matches its SHA-256 ``checksum``."""
+        upload = self.get(upload_id)
+        if upload["status"] != RECEIVING:
+            raise UploadError(f"Upload is {upload['status']}.", 409)
+        if not 0 <= index < upload["total_chunks"]:
+            raise UploadError(f"Chunk {index} is out of range.")
+        offset = index * upload["chunk_size"]
+        expected = min(upload["chunk_size"], upload["size"] - offset)
+        if len(data) != expected:
+            raise UploadError(f"Chunk {index} must be {expected} bytes.")
+        if hashlib.sha256(data).hexdigest() != checksum.lower():
+            raise UploadError(f"Checksum mismatch for chunk {index}.", 422)
+        if index == 0 and not data.startswith(PDF_MAGIC):
+            self._fail(upload_id, "Invalid file type. Please upload a valid PDF file.")
+            raise UploadError("Invalid file type. Please upload a valid PDF file.", 415)
+        self.storage.write(self._key(upload_id, f"chunks/{index}"), data)
+        with self._lock:
+            upload = self.get(upload_id)
+            done = (
+                upload["status"] == RECEIVING
+                and len(upload["received"]) == upload["total_chunks"]
+                and upload_id not in self._finishing
+            )
+            if done:
+                self._finishing.add(upload_id)
+        if done:
+            try:
+                upload = self._finish(upload)
+            finally:
+                with self._lock:
+                    self._finishing.discard(upload_id)
+        return upload
+
+    def _fail(self, upload_id: str, error: str) -> ChunkedUpload:
+        upload = self.get(upload_id)
+        upload.update(status=INVALID, error=error)
+        self._save(upload)
+        return upload
+
+    def _finish(self, upload: ChunkedUpload) -> ChunkedUpload:
+        """Join the chunks into the upload's file and validate it."""
+        upload_id = upload["id"]
+        settings.UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=settings.UPLOADS_DIR) as scratch:
+            data_path = Path(scratch) / "data"
+            try:
+                with open(data_path, "wb") as out:
+                    for index in range(upload["total_chunks"]):
+                        key = self._key(upload_id, f"chunks/{index}")
+                        with self.storage.open(key) as chunk:
+                            shutil.copyfileobj(chunk, out)
+            except FileNotFoundError:
+                # Another node finished the upload first and removed the chunks.
+                return self.get(upload_id)
+            try:
+                pages = _validate(data_path)
+            except Exception as e:
+                logging.exception(f"Error: {e}")
+                return self._fail(upload_id, f"The PDF could not be read: {e}")
+            self.storage.put(self._key(upload_id, "data"), data_path)
+        upload.update(status=COMPLETE, pages=pages)
+        self._save(upload)
+        self.storage.delete(self._key(upload_id, "chunks/"))
+        return upload
+
+    def claim(self, upload_id: str, target: Path) -> ChunkedUpload:
+        """Move a complete upload's file to ``target`` and forget the upload."""
+        upload = self.get(upload_id)
+        if upload["status"] != COMPLETE:
+            raise UploadError(upload["error"] or "The upload is not complete.", 409)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # A move rather than a rename: the storage root, or the S3 node cache,
+        # may be on another filesystem than the uploads directory.
+        shutil.move(self.storage.local_path(self._key(upload_id, "data")), target)
+        self.delete(upload_id)
+        return upload
+
+    def delete(self, upload_id: str) -> None:
+        """Abort an upload, removing whatever was received."""
+        self.storage.delete(self._key(upload_id))
+
+    def purge_expired(self, ttl_seconds: int = settings.JOB_TTL_SECONDS) -> int:
+        """Delete uploads that have not progressed within the TTL."""
+        cutoff = time.time() - ttl_seconds
+        last_activity: dict[str, float] = {}
+        for item in self.storage.list(self.prefix):
+            upload_id = item["key"][len(self.prefix) + 1 :].split("/", 1)[0]
+            last_activity[upload_id] = max(
+                last_activity.get(upload_id, 0.0), item["modified"]
+            )
+        expired = [
+            upload_id
+            for upload_id, modified in last_activity.items()
+            if modified < cutoff and upload_id.isalnum()
+        ]
+        for upload_id in expired:
+            self.delete(upload_id)
+        return len(expired)
+
+
+store = UploadStore(
+    storage.storage,
+    "uploads/chunked",
+    settings.UPLOAD_CHUNK_BYTES,
+    settings.UPLOAD_MAX_BYTES,
+)
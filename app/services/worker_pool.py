@@ -0,0 +1,278 @@
+"""A pool of pre-warmed worker processes that run operations off the server."""
+
+from collections.abc import Callable
+from pathlib import Path
+from .. import settings
+from . import metrics, operations, profiling, tracing
+from .job_store import Job
+import asyncio
+import contextlib
+import importlib
+import logging
+import multiprocessing
+import threading
+
+# Imported by the fork server once, so every worker forked from it starts with
+# the PDF stack already loaded.
+PRELOAD = [
+    "app.services.worker_pool",
+    "app.services.pypdf_backend",
+    "app.services.pymupdf_backend",
+    "app.services.thumbnails",
+]
+
+# Serializes the PDF work done in the server process when there are no
+# workers: PyMuPDF is not thread-safe.
+inline_lock = threading.Lock()
+
+
+def _warm_up() -> None:
+    """Import the PDF stack and initialize PyMuPDF before the first job."""
+    for module in PRELOAD:
+        importlib.import_module(module)
+    import PIL.Image
+    import pymupdf
+    import pypdf
+
+    pymupdf.open().close()
+    PIL.Image.init()
+    pypdf.PdfWriter()
+
+
+def _run(task: dict) -> dict:
+    job = task["job"]
+    with (
+        tracing.attach(task["trace_parent"]),
+        metrics.record(job["operation"]) as recorder,
+        open(task["result_path"], "wb") as out,
+        profiling.capture(job, selected=task["profile"]),
+        operations.deliver_pages(task["pages_dir"]),
+    ):
+        operations.run_operation(
+            job["operation"], job["input_paths"], out, job["params"]
+        )
+    return {
+        "stages": recorder.stages,
+        "pages": recorder.pages,
+        "peak_rss": recorder.peak_rss,
+    }
+
+
+def _handle(task: dict):
+    if "call" in task:
+        function, args = task["call"]
+        return function(*args)
+    return _run(task)
+
+
+def _worker_main(conn) -> None:
+    """Serve tasks from ``conn`` until told to stop with ``None``."""
+    _warm_up()
+    conn.send(("ready", metrics.current_rss()))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        # Whatever a task raises goes back to the parent, which fails the job;
+        # the worker itself keeps serving.
+        try:
+            reply = ("ok", _handle(task))
+        except Exception as e:  # noqa: BLE001
+            reply = ("error", e)
+        try:
+            conn.send((*reply, metrics.current_rss()))
+        except Exception as e:  # noqa: BLE001 - the reply could not be pickled
+            conn.send(("error", RuntimeError(str(e)), metrics.current_rss()))
+
+
+class WorkerDied(Exception):
+    """The pipe to a worker broke: the process exited or was killed."""
+
+
+class Worker:
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        _, self.rss = self.conn.recv()
+        self.jobs = 0
+        self.affinity: str | None = None
+
+    def call(self, task: dict) -> tuple[str, object]:
+        """Send a task and wait for its ``(status, result)`` reply; the result
+        of an ``"error"`` is the exception the task raised."""
+        try:
+            self.conn.send(task)
+            status, result, self.rss = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise WorkerDied from e
+        self.jobs += 1
+        return status, result
+
+    def stop(self) -> None:
+        with contextlib.suppress(OSError):
+            self.conn.send(None)
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """Runs jobs on pre-warmed workers, recycling them after ``max_jobs`` jobs
+    or once their RSS grows past ``max_rss_bytes``.
+
+    Jobs that share an affinity, such as repeated merges of one session's
+    files, go to the worker that ran the last of them when it is idle, so
+    they find what it has cached.
+    """
+
+    def __init__(self, size: int, max_jobs: int, max_rss_bytes: int):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self._idle: list[Worker] = []
+        self._workers: set[Worker] = set()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._context = None
+
+    @property
+    def running(self) -> bool:
+        return self._context is not None
+
+    def start(self) -> None:
+        """Start the fork server and the workers."""
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context("forkserver")
+            self._context.set_forkserver_preload(PRELOAD)
+        else:
+            self._context = multiprocessing.get_context("spawn")
+        for _ in range(self.size):
+            self._add_worker()
+
+    def shutdown(self) -> None:
+        """Stop every worker."""
+        context, self._context = self._context, None
+        if context is None:
+            return
+        with self._lock:
+            workers, self._workers = self._workers, set()
+        for worker in workers:
+            worker.stop()
+
+    def _add_worker(self) -> None:
+        worker = Worker(self._context)
+        with self._lock:
+            if self._context is None:
+                worker.stop()
+                return
+            self._workers.add(worker)
+            self._idle.append(worker)
+            self._available.notify()
+
+    def _replace(self, worker: Worker) -> None:
+        with self._lock:
+            self._workers.discard(worker)
+        worker.stop()
+        if self.running:
+            try:
+                self._add_worker()
+            except Exception as e:
+                logging.exception(f"Error: {e}")
+
+    def run(
+        self,
+        job: Job,
+        result_path: Path,
+        recorder: metrics.JobRecorder,
+        pages_dir: Path | None = None,
+        affinity: str | None = None,
+    ) -> None:
+        """Run a job on an idle worker and merge its measurements into ``recorder``."""
+        task = {
+            "job": job,
+            "result_path": str(result_path),
+            "profile": profiling.should_profile(job),
+            "trace_parent": tracing.context(),
+            "pages_dir": pages_dir,
+        }
+        result = self._submit(task, affinity)
+        for name, seconds in result["stages"].items():
+            recorder.stages[name] = recorder.stages.get(name, 0.0) + seconds
+        recorder.pages += result["pages"]
+        recorder.peak_rss = result["peak_rss"]
+
+    def call(self, function: Callable, *args):
+        """Return ``function(*args)`` run on an idle worker.
+
+        ``function`` must be defined at module level, so it can be pickled.
+        This keeps PyMuPDF, which is not thread-safe, off the server's threads.
+        """
+        return self._submit({"call": (function, args)}, None)
+
+    def _submit(self, task: dict, affinity: str | None):
+        worker = self._acquire(affinity)
+        try:
+            status, result = worker.call(task)
+        except WorkerDied as e:
+            threading.Thread(target=self._replace, args=(worker,), daemon=True).start()
+            raise RuntimeError("The worker processing the job exited.") from e
+        except Exception:
+            self._release(worker)
+            raise
+        self._release(worker)
+        # The task's own errors, OSErrors included, leave the worker healthy.
+        if status == "error":
+            raise result
+        return result
+
+    def _acquire(self, affinity: str | None) -> Worker:
+        """Wait for an idle worker, preferring the last one to run ``affinity``."""
+        with self._available:
+            while not self._idle:
+                self._available.wait()
+            worker = next(
+                (w for w in self._idle if affinity and w.affinity == affinity),
+                self._idle[0],
+            )
+            self._idle.remove(worker)
+            if affinity:
+                worker.affinity = affinity
+            return worker
+
+    def _release(self, worker: Worker) -> None:
+        if worker.jobs >= self.max_jobs or worker.rss > self.max_rss_bytes:
+            # Recycle in the background so this job's caller is not kept waiting.
+            threading.Thread(target=self._replace, args=(worker,), daemon=True).start()
+        elif self.running:
+            with self._available:
+                self._idle.append(worker)
+                self._available.notify()
+        else:
+            worker.stop()
+
+
+pool = WorkerPool(
+    settings.WORKERS, settings.WORKER_MAX_JOBS, settings.WORKER_MAX_RSS_BYTES
+)
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """Start the pool with the server and stop it on shutdown."""
+    if pool.size > 0:
+        await asyncio.to_thread(pool.start)
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(pool.shutdown)
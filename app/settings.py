@@ -0,0 +1,68 @@
+"""Runtime settings for PDF-O-Matic, read from the environment."""
+
+import os
+from pathlib import Path
+
+DATA_DIR = Path(os.environ.get("PDF_O_MATIC_DATA_DIR", ".pdf_o_matic"))
+
+JOBS_DB = DATA_DIR / "jobs.sqlite3"
+RESULTS_DIR = DATA_DIR / "results"
+UPLOADS_DIR = DATA_DIR / "uploads"
+UPLOAD_CHUNK_BYTES = int(
+    os.environ.get("PDF_O_MATIC_UPLOAD_CHUNK_BYTES") or 8 * 1024**2
+)
+UPLOAD_MAX_BYTES = int(os.environ.get("PDF_O_MATIC_UPLOAD_MAX_BYTES") or 4 * 1024**3)
+JOB_TTL_SECONDS = int(os.environ.get("PDF_O_MATIC_JOB_TTL") or 24 * 60 * 60)
+JOB_PURGE_INTERVAL_SECONDS = int(
+    os.environ.get("PDF_O_MATIC_JOB_PURGE_INTERVAL") or 600
+)
+JOB_MAX_ATTEMPTS = int(os.environ.get("PDF_O_MATIC_JOB_MAX_ATTEMPTS") or 2)
+# How often each server process records that it is alive; its unfinished jobs
+# are only recovered by another process once it stops.
+JOB_HEARTBEAT_SECONDS = int(os.environ.get("PDF_O_MATIC_JOB_HEARTBEAT") or 30)
+
+CACHE_DIR = DATA_DIR / "cache"
+CACHE_MAX_BYTES = int(os.environ.get("PDF_O_MATIC_CACHE_MAX_BYTES") or 1024**3)
+
+# Pages each worker keeps from recently merged inputs, to re-merge them quickly.
+MERGE_CACHE_MAX_BYTES = int(
+    os.environ.get("PDF_O_MATIC_MERGE_CACHE_MAX_BYTES") or 256 * 1024**2
+)
+
+THUMBNAILS_DIR = DATA_DIR / "thumbnails"
+THUMBNAIL_DPI = int(os.environ.get("PDF_O_MATIC_THUMBNAIL_DPI") or 36)
+
+# "local" keeps uploads and results under STORAGE_DIR; "s3" keeps them in a
+# bucket shared by every node, with a read-through cache on each.
+STORAGE = os.environ.get("PDF_O_MATIC_STORAGE", "local")
+STORAGE_DIR = Path(os.environ.get("PDF_O_MATIC_STORAGE_DIR", DATA_DIR))
+STORAGE_S3_BUCKET = os.environ.get("PDF_O_MATIC_S3_BUCKET", "")
+STORAGE_S3_PREFIX = os.environ.get("PDF_O_MATIC_S3_PREFIX", "")
+STORAGE_S3_ENDPOINT_URL = os.environ.get("PDF_O_MATIC_S3_ENDPOINT_URL", "")
+STORAGE_CACHE_DIR = DATA_DIR / "storage_cache"
+STORAGE_CACHE_MAX_BYTES = int(
+    os.environ.get("PDF_O_MATIC_STORAGE_CACHE_MAX_BYTES") or 2 * 1024**3
+)
+STORAGE_URL_TTL = int(os.environ.get("PDF_O_MATIC_STORAGE_URL_TTL") or 60 * 60)
+# Signs local download links. When unset, a secret is generated once and kept
+# in STORAGE_DIR, so every process sharing that directory uses the same one.
+STORAGE_SECRET = os.environ.get("PDF_O_MATIC_STORAGE_SECRET", "")
+
+PROFILES_DIR = DATA_DIR / "profiles"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PDF_O_MATIC_PROFILE_SAMPLE_RATE") or 0)
+PROFILE_TOOLS = frozenset(
+    tool for tool in os.environ.get("PDF_O_MATIC_PROFILE_TOOLS", "").split(",") if tool
+)
+PROFILE_TOP_N = int(os.environ.get("PDF_O_MATIC_PROFILE_TOP_N") or 25)
+ADMIN_TOKEN = os.environ.get("PDF_O_MATIC_ADMIN_TOKEN", "")
+
+TRACE_EXPORTER = os.environ.get("PDF_O_MATIC_TRACE_EXPORTER", "none")
+TRACE_FILE = Path(os.environ.get("PDF_O_MATIC_TRACE_FILE", DATA_DIR / "traces.jsonl"))
+
+PDF_BACKEND = os.environ.get("PDF_O_MATIC_PDF_BACKEND", "auto")
+
+WORKERS = int(os.environ.get("PDF_O_MATIC_WORKERS") or min(4, os.cpu_count() or 1))
+WORKER_MAX_JOBS = int(os.environ.get("PDF_O_MATIC_WORKER_MAX_JOBS") or 200)
+WORKER_MAX_RSS_BYTES = int(
+    os.environ.get("PDF_O_MATIC_WORKER_MAX_RSS_BYTES") or 1024**3
+)
@@ -11,105 +11,142 @@ class Tool(TypedDict):
     url: str
 
 
+# The tool catalog in each language. It never changes, so it is rendered into
+# the page once instead of being kept in every session's state.
+TOOLS: dict[str, list[Tool]] = {
+    "en": [
+        {
+            "icon": "file-symlink",
+            "title": "Split PDF",
+            "description": "Separate a PDF into multiple files by page range",
+            "url": "/split-pdf",
+        },
+        {
+            "icon": "merge",
+            "title": "Merge PDF",
+            "description": "Combine multiple PDFs into a single document",
+            "url": "/merge-pdf",
+        },
+        {
+            "icon": "archive",
+            "title": "Compress PDF",
+            "description": "Reduce file size while maintaining quality",
+            "url": "/compress-pdf",
+        },
+        {
+            "icon": "image",
+            "title": "PDF to Images",
+            "description": "Export all pages as images in a ZIP file",
+            "url": "/pdf-to-images",
+        },
+        {
+            "icon": "images",
+            "title": "Images to PDF",
+            "description": "Combine photos or scans into one PDF without quality loss",
+            "url": "/images-to-pdf",
+        },
+        {
+            "icon": "file-output",
+            "title": "Extract Pages",
+            "description": "Select and extract specific pages from your PDF",
+            "url": "/extract-pages",
+        },
+        {
+            "icon": "rotate-cw",
+            "title": "Rotate Pages",
+            "description": "Rotate pages clockwise or counterclockwise",
+            "url": "/rotate-pages",
+        },
+        {
+            "icon": "stamp",
+            "title": "Watermark",
+            "description": "Stamp text or a logo over the pages",
+            "url": "/watermark",
+        },
+        {
+            "icon": "file-text",
+            "title": "Extract Text",
+            "description": "Get the text out of a PDF for indexing",
+            "url": "/extract-text",
+        },
+        {
+            "icon": "workflow",
+            "title": "Pipeline",
+            "description": "Chain several tools in a single pass",
+            "url": "/pipeline",
+        },
+    ],
+    "es": [
+        {
+            "icon": "file-symlink",
+            "title": "Dividir PDF",
+            "description": "Separar un PDF en múltiples archivos por rango de páginas",
+            "url": "/split-pdf",
+        },
+        {
+            "icon": "merge",
+            "title": "Unir PDF",
+            "description": "Combinar múltiples PDFs en un solo documento",
+            "url": "/merge-pdf",
+        },
+        {
+            "icon": "archive",
+            "title": "Comprimir PDF",
+            "description": "Reducir el tamaño del archivo manteniendo la calidad",
+            "url": "/compress-pdf",
+        },
+        {
+            "icon": "image",
+            "title": "PDF a Imágenes",
+            "description": "Exportar todas las páginas como imágenes en un archivo ZIP",
+            "url": "/pdf-to-images",
+        },
+        {
+            "icon": "images",
+            "title": "Imágenes a PDF",
+            "description": "Combinar fotos o escaneos en un solo PDF, sin perder calidad",
+            "url": "/images-to-pdf",
+        },
+        {
+            "icon": "file-output",
+            "title": "Extraer Páginas",
+            "description": "Seleccionar y extraer páginas específicas de su PDF",
+            "url": "/extract-pages",
+        },
+        {
+            "icon": "rotate-cw",
+            "title": "Rotar Páginas",
+            "description": "Rotar páginas en sentido horario o antihorario",
+            "url": "/rotate-pages",
+        },
+        {
+            "icon": "stamp",
+            "title": "Marca de Agua",
+            "description": "Sellar un texto o un logo sobre las páginas",
+            "url": "/watermark",
+        },
+        {
+            "icon": "file-text",
+            "title": "Extraer Texto",
+            "description": "Sacar el texto de un PDF para indexarlo",
+            "url": "/extract-text",
+        },
+        {
+            "icon": "workflow",
+            "title": "Flujo de Trabajo",
+            "description": "Encadenar varias herramientas en una sola pasada",
+            "url": "/pipeline",
+        },
+    ],
+}
+
+
 class State(rx.State):
-    """The main application state."""
+    """The main application state: the visitor's theme and language."""
 
     is_dark: bool = True
     language: str = "en"
 
-    @rx.var
-    def back_to_tools_text(self) -> str:
-        return "Back to Tools" if self.language == "en" else "Cambiar de Herramienta"
-
-    @rx.var
-    def subtitle_text(self) -> str:
-        return (
-            "Quick tools for PDF manipulation."
-            if self.language == "en"
-            else "Herramientas rápidas para manipulación de PDFs."
-        )
-
-    @rx.var
-    def tools(self) -> list[Tool]:
-        """Get the list of tools based on the current language."""
-        if self.language == "es":
-            return [
-                {
-                    "icon": "file-symlink",
-                    "title": "Dividir PDF",
-                    "description": "Separar un PDF en múltiples archivos por rango de páginas",
-                    "url": "/split-pdf",
-                },
-                {
-                    "icon": "merge",
-                    "title": "Unir PDF",
-                    "description": "Combinar múltiples PDFs en un solo documento",
-                    "url": "/merge-pdf",
-                },
-                {
-                    "icon": "archive",
-                    "title": "Comprimir PDF",
-                    "description": "Reducir el tamaño del archivo manteniendo la calidad",
-                    "url": "/compress-pdf",
-                },
-                {
-                    "icon": "image",
-                    "title": "PDF a Imágenes",
-                    "description": "Exportar todas las páginas como imágenes en un archivo ZIP",
-                    "url": "/pdf-to-images",
-                },
-                {
-                    "icon": "file-output",
-                    "title": "Extraer Páginas",
-                    "description": "Seleccionar y extraer páginas específicas de su PDF",
-                    "url": "/extract-pages",
-                },
-                {
-                    "icon": "rotate-cw",
-                    "title": "Rotar Páginas",
-                    "description": "Rotar páginas en sentido horario o antihorario",
-                    "url": "/rotate-pages",
-                },
-            ]
-        return [
-            {
-                "icon": "file-symlink",
-                "title": "Split PDF",
-                "description": "Separate a PDF into multiple files by page range",
-                "url": "/split-pdf",
-            },
-            {
-                "icon": "merge",
-                "title": "Merge PDF",
-                "description": "Combine multiple PDFs into a single document",
-                "url": "/merge-pdf",
-            },
-            {
-                "icon": "archive",
-                "title": "Compress PDF",
-                "description": "Reduce file size while maintaining quality",
-                "url": "/compress-pdf",
-            },
-            {
-                "icon": "image",
-                "title": "PDF to Images",
-                "description": "Export all pages as images in a ZIP file",
-                "url": "/pdf-to-images",
-            },
-            {
-                "icon": "file-output",
-                "title": "Extract Pages",
-                "description": "Select and extract specific pages from your PDF",
-                "url": "/extract-pages",
-            },
-            {
-                "icon": "rotate-cw",
-                "title": "Rotate Pages",
-                "description": "Rotate pages clockwise or counterclockwise",
-                "url": "/rotate-pages",
-            },
-        ]
-
     @rx.event
     def toggle_theme(self):
         """Toggle the theme between light and dark mode."""
@@ -1,8 +1,15 @@
 """Base state for all PDF tool pages."""
 
-import pypdf
+from pathlib import Path
+from reflex.config import get_config
+import reflex as rx
+from ..services import batch, jobs, metrics, thumbnails, tracing, uploads
+from ..services.image_pdf import is_image
+from ..services.job_store import FAILED, Batch, Job
+import asyncio
 import io
 import logging
+import os
 
 
 class PDFToolState:
@@ -10,6 +17,8 @@ class PDFToolState:
 
     def _validate_pdf(self, file_data: bytes) -> bool:
         """Validate if the uploaded file data is a valid PDF."""
+        import pypdf
+
         try:
             pdf = pypdf.PdfReader(io.BytesIO(file_data))
             if len(pdf.pages) > 0:
@@ -24,3 +33,208 @@ class PDFToolState:
             logging.exception(f"Error: {e}")
             self.error_message = f"An unexpected error occurred: {e}"
             return False
+
+    def _upload_path(self, name: str) -> Path:
+        """Return where this session's upload ``name`` is stored, creating its directory."""
+        directory = rx.get_upload_dir() / self.router.session.client_token
+        directory.mkdir(parents=True, exist_ok=True)
+        # Marks the session as active, so its files are not purged as idle.
+        os.utime(directory)
+        return directory / name
+
+    async def _claim_upload(self, result: dict) -> uploads.ChunkedUpload | None:
+        """Move a finished resumable upload into this session's uploads.
+
+        ``result`` is what the browser's ``pdfOMaticUpload`` resolved to.
+        """
+        if result.get("error"):
+            self.error_message = result["error"]
+            return None
+        try:
+            upload = uploads.store.get(result.get("upload_id", ""))
+            return await asyncio.to_thread(
+                uploads.store.claim,
+                upload["id"],
+                self._upload_path(upload["filename"]),
+            )
+        except uploads.UploadError as e:
+            self.error_message = str(e)
+            return None
+
+    async def _load_thumbnails(self, name: str) -> None:
+        """Start rendering previews of upload ``name``.
+
+        Only where they are served from and how many there are is kept; the
+        page builds each preview's URL, ``{thumbnails_url}/{page}.jpg``.
+        Previews are a convenience, so a failure only leaves the grid empty.
+        """
+        self.thumbnail_count = 0
+        try:
+            doc_hash, pages = await asyncio.to_thread(
+                thumbnails.cache.register, self._upload_path(name)
+            )
+        except Exception as e:
+            logging.exception(f"Error: {e}")
+            return
+        self.thumbnails_url = f"{get_config().api_url}/thumbnails/{doc_hash}"
+        self.thumbnail_count = pages
+
+    @staticmethod
+    def _named_pages(selection: str, total_pages: int) -> set[int]:
+        """Return the pages a selection names, ignoring parts still being typed."""
+        pages = set()
+        for part in selection.split(","):
+            start, _, end = part.strip().partition("-")
+            if start.isdigit() and (end.isdigit() or not end):
+                last = min(int(end or start), total_pages)
+                pages.update(range(max(1, int(start)), last + 1))
+        return pages
+
+    async def _read_upload(
+        self, file: rx.UploadFile, tool: str, images: bool = False
+    ) -> bytes | None:
+        """Read and validate an uploaded file, returning None if it is not a PDF
+        (or, with ``images``, not an image)."""
+        with tracing.span("handle_upload", tool=tool, filename=file.filename):
+            with metrics.stage("upload", tool) as span:
+                upload_data = await file.read()
+                span.set(bytes=len(upload_data))
+            with metrics.stage("validate", tool):
+                if images and not is_image(upload_data[:12]):
+                    self.error_message = (
+                        f"{file.name} is not a supported image. Please upload"
+                        " JPEG, PNG, TIFF, GIF, BMP or WebP files."
+                    )
+                    return None
+                if not images and not self._validate_pdf(upload_data):
+                    return None
+        return upload_data
+
+    async def _run_job(
+        self,
+        operation: str,
+        input_files: list[str],
+        params: dict,
+        stream: bool = False,
+    ):
+        """Run an operation on uploaded files as a job and download its result.
+
+        The job runs in a thread (and, with the worker pool, in a worker
+        process) so the event loop keeps serving other sessions meanwhile.
+        """
+        with tracing.span("tool_run", tool=operation, input_files=len(input_files)):
+            job = await asyncio.to_thread(
+                jobs.run_job,
+                operation,
+                [self._upload_path(name) for name in input_files],
+                params,
+            )
+            return self._deliver(job, stream)
+
+    def _deliver(self, job: Job, stream: bool = False):
+        """Link to a finished job's result and download it.
+
+        With ``stream`` the browser fetches the result from the API, which
+        streams it from storage, instead of it being read into memory here
+        and sent over the websocket.
+        """
+        self.job_id = job["id"]
+        self.download_url = f"{get_config().api_url}/jobs/{job['id']}/download"
+        if stream:
+            # Wrapped in a Var, as in ``_run_batch``: the URL points at the
+            # backend, and rx.download only accepts frontend-relative strings.
+            return rx.download(
+                url=rx.Var.create(self.download_url), filename=job["result_name"]
+            )
+        with metrics.stage("deliver", job["operation"]) as span:
+            data = Path(job["result_path"]).read_bytes()
+            span.set(bytes=len(data))
+            return rx.download(data=data, filename=job["result_name"])
+
+    async def _save_batch(self, files: list[rx.UploadFile], tool: str) -> list[str]:
+        """Validate and store the files of a batch upload, returning their names.
+
+        Nothing is kept if any file is not a valid PDF.
+        """
+        names = []
+        for file in files:
+            upload_data = await self._read_upload(file, tool)
+            if upload_data is None:
+                self._remove_uploads(names)
+                return []
+            with open(self._upload_path(file.name), "wb") as f:
+                f.write(upload_data)
+            names.append(file.name)
+        return names
+
+    def _remove_uploads(self, names: list[str]) -> None:
+        for name in names:
+            try:
+                os.remove(self._upload_path(name))
+            except OSError as e:
+                logging.exception(f"Error: {e}")
+
+    async def _run_batch(
+        self, operation: str, params: dict, shared: list[str] | None = None
+    ):
+        """Run an operation on every file of the batch upload in parallel and
+        download one archive with the results and a per-file status report.
+
+        ``shared`` uploads, such as a stamp, are passed to every run.
+        """
+        result, error = await self._execute_batch(
+            operation,
+            [self._upload_path(name) for name in self.batch_files],
+            params,
+            [self._upload_path(name) for name in shared or []],
+        )
+        return self._finish_batch(operation, result, error)
+
+    async def _execute_batch(
+        self,
+        operation: str,
+        input_paths: list[Path],
+        params: dict,
+        shared_paths: list[Path],
+    ) -> tuple[Batch | None, str]:
+        """Run a batch and return it, or the error that stopped it.
+
+        It neither reads nor changes the state, so background events can
+        await it without holding the state's lock.
+        """
+        try:
+            with tracing.span(
+                "batch_run", tool=operation, input_files=len(input_paths)
+            ):
+                result = await asyncio.to_thread(
+                    batch.run_batch, operation, input_paths, params, shared_paths
+                )
+        except Exception as e:
+            logging.exception(f"Error: {e}")
+            return None, f"An error occurred while processing the batch: {e}"
+        return result, ""
+
+    def _finish_batch(self, operation: str, result: Batch | None, error: str):
+        """Clear the batch upload and show, then download, its results."""
+        self._remove_uploads(self.batch_files)
+        self.batch_files = []
+        self.is_processing = False
+        if result is None:
+            self.error_message = error
+            return
+        self.batch_results = [
+            {"name": item["name"], "status": item["status"], "error": item["error"]}
+            for item in result["items"]
+        ]
+        if all(item["status"] == FAILED for item in result["items"]):
+            self.error_message = "None of the files could be processed."
+            return
+        self.job_id = result["id"]
+        self.download_url = f"{get_config().api_url}/batches/{result['id']}/download"
+        self.processed = True
+        # Wrapped in a Var because rx.download only accepts string URLs that
+        # are relative to the frontend, and the archive is served by the backend.
+        return rx.download(
+            url=rx.Var.create(self.download_url),
+            filename=f"{operation}_batch.zip",
+        )
@@ -2,8 +2,7 @@
 
 import reflex as rx
 from .base_state import PDFToolState
-import pypdf
-import io
+from ..services.operations import OperationError
 import os
 import logging
 
@@ -11,61 +10,81 @@ import logging
 class CompressState(rx.State, PDFToolState):
     """State to handle compressing a PDF file."""
 
-    is_dark: bool = True
     is_processing: bool = False
     error_message: str = ""
     uploaded_file: str = ""
     processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    linearize: bool = False
+    batch_files: list[str] = []
+    batch_results: list[dict[str, str]] = []
+
+    @rx.event
+    def toggle_linearize(self):
+        """Switch fast web view output on or off."""
+        self.linearize = not self.linearize
 
     @rx.event
     async def handle_upload(self, files: list[rx.UploadFile]):
-        """Handle the upload of a single PDF file for compression."""
+        """Handle the upload of one PDF, or of several to process as a batch."""
         self.is_processing = True
         self.error_message = ""
         self.uploaded_file = ""
+        self.batch_files = []
+        self.batch_results = []
         self.processed = False
         if not files:
             self.error_message = "No file was selected."
             self.is_processing = False
             return
+        if len(files) > 1:
+            self.batch_files = await self._save_batch(files, "compress")
+            self.is_processing = False
+            return
         file = files[0]
-        upload_data = await file.read()
-        if not self._validate_pdf(upload_data):
+        upload_data = await self._read_upload(file, "compress")
+        if upload_data is None:
             self.is_processing = False
             return
-        output_path = rx.get_upload_dir() / file.name
+        output_path = self._upload_path(file.name)
         with open(output_path, "wb") as f:
             f.write(upload_data)
         self.uploaded_file = file.name
         self.is_processing = False
 
     @rx.event
-    def compress_pdf(self):
+    async def attach_upload(self, result: dict):
+        """Use a PDF sent with the resumable uploader."""
+        self.error_message = ""
+        self.processed = False
+        self.batch_files = []
+        self.batch_results = []
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self.uploaded_file = upload["filename"]
+
+    @rx.event
+    async def compress_pdf(self):
         """Compress the uploaded PDF file."""
         self.is_processing = True
         self.error_message = ""
         self.processed = False
-        if not self.uploaded_file:
+        if not self.uploaded_file and not self.batch_files:
             self.error_message = "Please upload a PDF file first."
             self.is_processing = False
             return
+        if self.batch_files:
+            return await self._run_batch("compress", {"linearize": self.linearize})
         try:
-            input_path = rx.get_upload_dir() / self.uploaded_file
-            reader = pypdf.PdfReader(input_path)
-            writer = pypdf.PdfWriter()
-            for page in reader.pages:
-                writer.add_page(page)
-            for page in writer.pages:
-                page.compress_content_streams()
-            output_buffer = io.BytesIO()
-            writer.write(output_buffer)
-            output_buffer.seek(0)
-            base_name = os.path.splitext(self.uploaded_file)[0]
+            download = await self._run_job(
+                "compress", [self.uploaded_file], {"linearize": self.linearize}
+            )
             self.processed = True
             self.is_processing = False
-            return rx.download(
-                data=output_buffer.getvalue(), filename=f"{base_name}_compressed.pdf"
-            )
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
         except Exception as e:
             logging.exception(f"Error: {e}")
             self.error_message = f"An error occurred during compression: {e}"
@@ -73,7 +92,7 @@ class CompressState(rx.State, PDFToolState):
             self.is_processing = False
             if self.uploaded_file:
                 try:
-                    os.remove(rx.get_upload_dir() / self.uploaded_file)
+                    os.remove(self._upload_path(self.uploaded_file))
                     self.uploaded_file = ""
                 except OSError as e:
                     logging.exception(f"Error: {e}")
@@ -2,7 +2,7 @@
 
 import reflex as rx
 from .base_state import PDFToolState
-import pypdf
+from ..services.operations import OperationError, format_page_range
 import io
 import os
 import logging
@@ -11,45 +11,100 @@ import logging
 class ExtractPagesState(rx.State, PDFToolState):
     """State to handle extracting pages from a PDF."""
 
-    is_dark: bool = True
     is_processing: bool = False
     error_message: str = ""
     uploaded_file: str = ""
     page_selection: str = ""
     total_pages: int = 0
     processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    linearize: bool = False
+    batch_files: list[str] = []
+    batch_results: list[dict[str, str]] = []
+    thumbnails_url: str = ""
+    thumbnail_count: int = 0
+    selected_pages: list[int] = []
+
+    @rx.event
+    def toggle_linearize(self):
+        """Switch fast web view output on or off."""
+        self.linearize = not self.linearize
+
+    @rx.event
+    def set_page_selection(self, value: str):
+        """Set the typed page selection and highlight its pages."""
+        self.page_selection = value
+        self._highlight_selection()
+
+    def _highlight_selection(self) -> None:
+        self.selected_pages = sorted(
+            self._named_pages(self.page_selection, self.total_pages)
+        )
+
+    @rx.event
+    def toggle_page(self, page: int):
+        """Add or remove a page from the selection by clicking its preview."""
+        pages = self._named_pages(self.page_selection, self.total_pages) ^ {page}
+        self.selected_pages = sorted(pages)
+        self.page_selection = format_page_range(self.selected_pages)
 
     @rx.event
     async def handle_upload(self, files: list[rx.UploadFile]):
-        """Handle the upload of a single PDF file for page extraction."""
+        """Handle the upload of one PDF, or of several to process as a batch."""
         self.is_processing = True
         self.error_message = ""
         self.uploaded_file = ""
+        self.batch_files = []
+        self.batch_results = []
+        self.thumbnail_count = 0
         self.processed = False
         if not files:
             self.error_message = "No file was selected."
             self.is_processing = False
             return
+        if len(files) > 1:
+            self.batch_files = await self._save_batch(files, "extract")
+            self.is_processing = False
+            return
         file = files[0]
-        upload_data = await file.read()
-        if not self._validate_pdf(upload_data):
+        upload_data = await self._read_upload(file, "extract")
+        if upload_data is None:
             self.is_processing = False
             return
+        import pypdf
+
         pdf = pypdf.PdfReader(io.BytesIO(upload_data))
         self.total_pages = len(pdf.pages)
-        output_path = rx.get_upload_dir() / file.name
+        output_path = self._upload_path(file.name)
         with open(output_path, "wb") as f:
             f.write(upload_data)
         self.uploaded_file = file.name
+        self._highlight_selection()
+        await self._load_thumbnails(file.name)
         self.is_processing = False
 
     @rx.event
-    def extract_pages(self):
+    async def attach_upload(self, result: dict):
+        """Use a PDF sent with the resumable uploader."""
+        self.error_message = ""
+        self.processed = False
+        self.batch_files = []
+        self.batch_results = []
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self.uploaded_file = upload["filename"]
+            self.total_pages = upload["pages"]
+            self._highlight_selection()
+            await self._load_thumbnails(upload["filename"])
+
+    @rx.event
+    async def extract_pages(self):
         """Extract selected pages from the PDF."""
         self.is_processing = True
         self.error_message = ""
         self.processed = False
-        if not self.uploaded_file:
+        if not self.uploaded_file and not self.batch_files:
             self.error_message = "Please upload a PDF file first."
             self.is_processing = False
             return
@@ -57,28 +112,21 @@ class ExtractPagesState(rx.State, PDFToolState):
             self.error_message = "Please enter pages or ranges to extract."
             self.is_processing = False
             return
+        if self.batch_files:
+            return await self._run_batch(
+                "extract", {"pages": self.page_selection, "linearize": self.linearize}
+            )
         try:
-            input_path = rx.get_upload_dir() / self.uploaded_file
-            reader = pypdf.PdfReader(input_path)
-            writer = pypdf.PdfWriter()
-            pages_to_extract = self._parse_page_range(
-                self.page_selection, self.total_pages
+            download = await self._run_job(
+                "extract",
+                [self.uploaded_file],
+                {"pages": self.page_selection, "linearize": self.linearize},
             )
-            if pages_to_extract is None:
-                self.error_message = f"Invalid page selection: '{self.page_selection}'. Use comma-separated numbers or ranges (e.g., 1,3-5)."
-                self.is_processing = False
-                return
-            for page_num in pages_to_extract:
-                writer.add_page(reader.pages[page_num - 1])
-            output_buffer = io.BytesIO()
-            writer.write(output_buffer)
-            output_buffer.seek(0)
-            base_name = os.path.splitext(self.uploaded_file)[0]
             self.processed = True
             self.is_processing = False
-            return rx.download(
-                data=output_buffer.getvalue(), filename=f"{base_name}_extracted.pdf"
-            )
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
         except Exception as e:
             logging.exception(f"Error: {e}")
             self.error_message = f"An error occurred during page extraction: {e}"
@@ -86,28 +134,7 @@ class ExtractPagesState(rx.State, PDFToolState):
             self.is_processing = False
             if self.uploaded_file:
                 try:
-                    os.remove(rx.get_upload_dir() / self.uploaded_file)
+                    os.remove(self._upload_path(self.uploaded_file))
                     self.uploaded_file = ""
                 except OSError as e:
                     logging.exception(f"Error: {e}")
-
-    def _parse_page_range(self, range_str: str, total_pages: int) -> list[int] | None:
-        pages = set()
-        try:
-            parts = range_str.split(",")
-            for part in parts:
-                part = part.strip()
-                if "-" in part:
-                    start, end = map(int, part.split("-"))
-                    if start > end or start < 1 or end > total_pages:
-                        return None
-                    pages.update(range(start, end + 1))
-                else:
-                    page = int(part)
-                    if page < 1 or page > total_pages:
-                        return None
-                    pages.add(page)
-            return sorted(list(pages))
-        except ValueError as e:
-            logging.exception(f"Error: {e}")
-            return None
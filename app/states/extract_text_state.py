@@ -0,0 +1,117 @@
+"""State for the Extract Text tool page."""
+
+import reflex as rx
+from .base_state import PDFToolState
+from ..services.operations import OperationError
+import os
+import logging
+
+
+class ExtractTextState(rx.State, PDFToolState):
+    """State to handle extracting the text of a PDF for indexing."""
+
+    is_processing: bool = False
+    error_message: str = ""
+    uploaded_file: str = ""
+    pages: str = ""
+    layout: bool = False
+    text_format: str = "ndjson"
+    processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    batch_files: list[str] = []
+    batch_results: list[dict[str, str]] = []
+
+    @rx.event
+    def set_pages(self, pages: str):
+        """Set which pages to extract; empty means every page."""
+        self.pages = pages
+
+    @rx.event
+    def toggle_layout(self):
+        """Switch grouping the text in positioned blocks on or off."""
+        self.layout = not self.layout
+
+    @rx.event
+    def set_text_format(self, text_format: str):
+        """Set the output format: NDJSON, one page per line, or plain text."""
+        self.text_format = text_format
+
+    @rx.event
+    async def handle_upload(self, files: list[rx.UploadFile]):
+        """Handle the upload of one PDF, or of several to process as a batch."""
+        self.is_processing = True
+        self.error_message = ""
+        self.uploaded_file = ""
+        self.batch_files = []
+        self.batch_results = []
+        self.processed = False
+        if not files:
+            self.error_message = "No file was selected."
+            self.is_processing = False
+            return
+        if len(files) > 1:
+            self.batch_files = await self._save_batch(files, "extract_text")
+            self.is_processing = False
+            return
+        file = files[0]
+        upload_data = await self._read_upload(file, "extract_text")
+        if upload_data is None:
+            self.is_processing = False
+            return
+        output_path = self._upload_path(file.name)
+        with open(output_path, "wb") as f:
+            f.write(upload_data)
+        self.uploaded_file = file.name
+        self.is_processing = False
+
+    @rx.event
+    async def attach_upload(self, result: dict):
+        """Use a PDF sent with the resumable uploader."""
+        self.error_message = ""
+        self.processed = False
+        self.batch_files = []
+        self.batch_results = []
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self.uploaded_file = upload["filename"]
+
+    @rx.event
+    async def extract_text(self):
+        """Extract the text of the selected pages."""
+        self.is_processing = True
+        self.error_message = ""
+        self.processed = False
+        if not self.uploaded_file and not self.batch_files:
+            self.error_message = "Please upload a PDF file first."
+            self.is_processing = False
+            return
+        params = {
+            "pages": self.pages.strip(),
+            "layout": self.layout,
+            "format": self.text_format,
+        }
+        if self.batch_files:
+            return await self._run_batch("extract_text", params)
+        try:
+            # The text of a long document can be large; it is downloaded
+            # from the API rather than sent through the session.
+            download = await self._run_job(
+                "extract_text", [self.uploaded_file], params, stream=True
+            )
+            self.processed = True
+            self.is_processing = False
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
+        except Exception as e:
+            logging.exception(f"Error: {e}")
+            self.error_message = f"An error occurred while extracting the text: {e}"
+        finally:
+            self.is_processing = False
+            if self.uploaded_file:
+                try:
+                    os.remove(self._upload_path(self.uploaded_file))
+                    self.uploaded_file = ""
+                except OSError as e:
+                    logging.exception(f"Error: {e}")
@@ -0,0 +1,84 @@
+"""State for the Images to PDF tool page."""
+
+import reflex as rx
+from .base_state import PDFToolState
+from ..services.operations import OperationError
+import logging
+
+
+class ImagesToPDFState(rx.State, PDFToolState):
+    """State to handle combining images into a single PDF."""
+
+    is_processing: bool = False
+    error_message: str = ""
+    uploaded_files: list[str] = []
+    processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    linearize: bool = False
+
+    @rx.event
+    def toggle_linearize(self):
+        """Switch fast web view output on or off."""
+        self.linearize = not self.linearize
+
+    @rx.event
+    async def handle_upload(self, files: list[rx.UploadFile]):
+        """Handle the upload of the images to combine, in the order given."""
+        self.is_processing = True
+        self.error_message = ""
+        self.processed = False
+        if not files:
+            self.error_message = "No files were selected."
+            self.is_processing = False
+            return
+        names = []
+        for file in files:
+            upload_data = await self._read_upload(file, "images_to_pdf", images=True)
+            if upload_data is None:
+                self._remove_uploads(names)
+                self.is_processing = False
+                return
+            with open(self._upload_path(file.name), "wb") as f:
+                f.write(upload_data)
+            names.append(file.name)
+        self.uploaded_files = [
+            *(name for name in self.uploaded_files if name not in names),
+            *names,
+        ]
+        self.is_processing = False
+
+    @rx.event
+    def clear_files(self):
+        """Remove every uploaded image."""
+        self._remove_uploads(self.uploaded_files)
+        self.uploaded_files = []
+        self.error_message = ""
+        self.processed = False
+
+    @rx.event
+    async def images_to_pdf(self):
+        """Combine the uploaded images into one PDF, one page per image."""
+        self.is_processing = True
+        self.error_message = ""
+        self.processed = False
+        if not self.uploaded_files:
+            self.error_message = "Please upload at least one image."
+            self.is_processing = False
+            return
+        try:
+            download = await self._run_job(
+                "images_to_pdf", self.uploaded_files, {"linearize": self.linearize}
+            )
+            self.processed = True
+            self.is_processing = False
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
+        except Exception as e:
+            logging.exception(f"Error: {e}")
+            self.error_message = f"An error occurred while creating the PDF: {e}"
+        finally:
+            self.is_processing = False
+            self._remove_uploads(self.uploaded_files)
+            self.uploaded_files = []
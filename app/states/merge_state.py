@@ -2,20 +2,46 @@
 
 import reflex as rx
 from .base_state import PDFToolState
-import pypdf
+from ..services.operations import OperationError
 import io
 import os
 import logging
 
 
 class MergeState(rx.State, PDFToolState):
-    """State to handle merging multiple PDF files."""
+    """State to handle merging multiple PDF files.
+
+    The uploaded files stay in the session until they are removed, so the
+    order, the page selections and the set of files can be changed and the
+    merge rerun; each worker keeps the pages it already copied from them.
+    """
 
-    is_dark: bool = True
     is_processing: bool = False
     error_message: str = ""
-    uploaded_files: list[str] = []
+    files: list[dict[str, str]] = []
     processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    linearize: bool = False
+
+    def _add_file(self, name: str, pages: int):
+        """Append ``name`` to the workspace, replacing an earlier upload of it."""
+        entry = {"name": name, "pages": str(pages), "selection": ""}
+        if any(file["name"] == name for file in self.files):
+            self.files = [entry if f["name"] == name else f for f in self.files]
+        else:
+            self.files = [*self.files, entry]
+
+    def _delete_upload(self, name: str):
+        try:
+            os.remove(self._upload_path(name))
+        except OSError as e:
+            logging.exception(f"Error: {e}")
+
+    @rx.event
+    def toggle_linearize(self):
+        """Switch fast web view output on or off."""
+        self.linearize = not self.linearize
 
     @rx.event
     async def handle_upload(self, files: list[rx.UploadFile]):
@@ -27,52 +53,90 @@ class MergeState(rx.State, PDFToolState):
             self.error_message = "No files were selected."
             self.is_processing = False
             return
-        valid_files = []
+        import pypdf
+
         for file in files:
-            upload_data = await file.read()
-            if self._validate_pdf(upload_data):
-                output_path = rx.get_upload_dir() / file.name
-                with open(output_path, "wb") as f:
-                    f.write(upload_data)
-                valid_files.append(file.name)
-            else:
+            upload_data = await self._read_upload(file, "merge")
+            if upload_data is None:
                 self.is_processing = False
                 return
-        self.uploaded_files.extend(valid_files)
+            pages = len(pypdf.PdfReader(io.BytesIO(upload_data)).pages)
+            output_path = self._upload_path(file.name)
+            with open(output_path, "wb") as f:
+                f.write(upload_data)
+            self._add_file(file.name, pages)
         self.is_processing = False
 
     @rx.event
-    def merge_pdfs(self):
+    async def attach_upload(self, result: dict):
+        """Add a PDF sent with the resumable uploader."""
+        self.error_message = ""
+        self.processed = False
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self._add_file(upload["filename"], upload["pages"])
+
+    @rx.event
+    def move_file(self, index: int, offset: int):
+        """Move the file at ``index`` up (-1) or down (1) in the merge order."""
+        target = index + offset
+        if 0 <= target < len(self.files):
+            files = list(self.files)
+            files[index], files[target] = files[target], files[index]
+            self.files = files
+            self.processed = False
+
+    @rx.event
+    def remove_file(self, index: int):
+        """Drop the file at ``index`` from the merge and delete its upload."""
+        self._delete_upload(self.files[index]["name"])
+        self.files = [file for i, file in enumerate(self.files) if i != index]
+        self.processed = False
+
+    @rx.event
+    def set_selection(self, index: int, selection: str):
+        """Set which pages of the file at ``index`` go into the merge."""
+        self.files = [
+            {**file, "selection": selection} if i == index else file
+            for i, file in enumerate(self.files)
+        ]
+        self.processed = False
+
+    @rx.event
+    def clear_files(self):
+        """Remove every file from the merge."""
+        for file in self.files:
+            self._delete_upload(file["name"])
+        self.files = []
+        self.error_message = ""
+        self.processed = False
+
+    @rx.event
+    async def merge_pdfs(self):
         """Merge the uploaded PDF files into a single document."""
         self.is_processing = True
         self.error_message = ""
         self.processed = False
-        if len(self.uploaded_files) < 2:
+        if len(self.files) < 2:
             self.error_message = "Please upload at least two PDF files to merge."
             self.is_processing = False
             return
+        selections = [file["selection"].strip() for file in self.files]
+        params = {
+            "pages": ";".join(selections) if any(selections) else "",
+            "linearize": self.linearize,
+        }
         try:
-            merger = pypdf.PdfMerger()
-            for filename in self.uploaded_files:
-                input_path = rx.get_upload_dir() / filename
-                merger.append(input_path)
-            output_buffer = io.BytesIO()
-            merger.write(output_buffer)
-            merger.close()
-            output_buffer.seek(0)
+            download = await self._run_job(
+                "merge", [file["name"] for file in self.files], params
+            )
             self.processed = True
             self.is_processing = False
-            return rx.download(
-                data=output_buffer.getvalue(), filename="merged_document.pdf"
-            )
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
         except Exception as e:
             logging.exception(f"Error: {e}")
             self.error_message = f"An error occurred during merging: {e}"
         finally:
             self.is_processing = False
-            for filename in self.uploaded_files:
-                try:
-                    os.remove(rx.get_upload_dir() / filename)
-                except OSError as e:
-                    logging.exception(f"Error: {e}")
-            self.uploaded_files = []
@@ -1,84 +1,167 @@
 """State for the PDF to Images tool page."""
 
+from pathlib import Path
+from urllib.parse import quote
 import reflex as rx
+from reflex.config import get_config
 from .base_state import PDFToolState
-from PIL import Image
-import pymupdf as fitz
-import zipfile
+from ..services import jobs, operations, tracing
+from ..services.job_store import store
+from ..services.operations import OperationError
+import asyncio
 import io
 import os
 import logging
 
+# Seconds between checks for newly rendered pages.
+PROGRESS_INTERVAL = 0.5
+
 
 class PDFToImagesState(rx.State, PDFToolState):
     """State to handle converting PDF to images."""
 
-    is_dark: bool = True
     is_processing: bool = False
     error_message: str = ""
     uploaded_file: str = ""
+    total_pages: int = 0
+    rendered_count: int = 0
+    page_url_prefix: str = ""
+    page_stem: str = ""
     processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    batch_files: list[str] = []
+    batch_results: list[dict[str, str]] = []
 
     @rx.event
     async def handle_upload(self, files: list[rx.UploadFile]):
-        """Handle the upload of a single PDF file for conversion."""
+        """Handle the upload of one PDF, or of several to process as a batch."""
         self.is_processing = True
         self.error_message = ""
         self.uploaded_file = ""
+        self.rendered_count = 0
+        self.batch_files = []
+        self.batch_results = []
         self.processed = False
         if not files:
             self.error_message = "No file was selected."
             self.is_processing = False
             return
+        if len(files) > 1:
+            self.batch_files = await self._save_batch(files, "pdf_to_images")
+            self.is_processing = False
+            return
         file = files[0]
-        upload_data = await file.read()
-        if not self._validate_pdf(upload_data):
+        upload_data = await self._read_upload(file, "pdf_to_images")
+        if upload_data is None:
             self.is_processing = False
             return
-        output_path = rx.get_upload_dir() / file.name
+        import pypdf
+
+        pdf = pypdf.PdfReader(io.BytesIO(upload_data))
+        self.total_pages = len(pdf.pages)
+        output_path = self._upload_path(file.name)
         with open(output_path, "wb") as f:
             f.write(upload_data)
         self.uploaded_file = file.name
         self.is_processing = False
 
     @rx.event
-    def convert_to_images(self):
-        """Convert PDF pages to PNG images and package them in a ZIP file."""
-        self.is_processing = True
+    async def attach_upload(self, result: dict):
+        """Use a PDF sent with the resumable uploader."""
         self.error_message = ""
         self.processed = False
-        if not self.uploaded_file:
-            self.error_message = "Please upload a PDF file first."
-            self.is_processing = False
-            return
-        try:
-            input_path = rx.get_upload_dir() / self.uploaded_file
-            doc = fitz.open(stream=input_path.read_bytes(), filetype="pdf")
-            zip_buffer = io.BytesIO()
-            base_name = os.path.splitext(self.uploaded_file)[0]
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                for i, page in enumerate(doc):
-                    pix = page.get_pixmap(dpi=600)
-                    img_buffer = io.BytesIO()
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    img.save(img_buffer, format="PNG")
-                    img_buffer.seek(0)
-                    zf.writestr(f"{base_name}_page_{i + 1}.png", img_buffer.getvalue())
-            doc.close()
-            zip_buffer.seek(0)
-            self.processed = True
-            self.is_processing = False
-            return rx.download(
-                data=zip_buffer.getvalue(), filename=f"{base_name}_images.zip"
+        self.rendered_count = 0
+        self.batch_files = []
+        self.batch_results = []
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self.uploaded_file = upload["filename"]
+            self.total_pages = upload["pages"]
+
+    def _show_pages(self, count: int) -> None:
+        """Offer the first ``count`` pages of the running job for download."""
+        # Any assignment is sent to the browser, so only a new count is.
+        if count != self.rendered_count:
+            self.rendered_count = count
+
+    def _rendered_count(self, pages_dir: Path) -> int:
+        """Count the pages published so far; they are rendered in order."""
+        count = self.rendered_count
+        while count < self.total_pages:
+            name = operations.page_image_name(self.uploaded_file, count + 1)
+            if not (pages_dir / name).exists():
+                break
+            count += 1
+        return count
+
+    @rx.event(background=True)
+    async def convert_to_images(self):
+        """Convert PDF pages to PNG images and package them in a ZIP file.
+
+        Each page is offered for download as soon as it is rendered, while
+        the rest of the document is still being converted.
+        """
+        async with self:
+            self.is_processing = True
+            self.error_message = ""
+            self.processed = False
+            self.rendered_count = 0
+            if not self.uploaded_file and not self.batch_files:
+                self.error_message = "Please upload a PDF file first."
+                self.is_processing = False
+                return
+            batch_paths = [self._upload_path(name) for name in self.batch_files]
+            if not batch_paths:
+                input_path = self._upload_path(self.uploaded_file)
+        if batch_paths:
+            # Run without the state's lock, so the page stays responsive.
+            result, error = await self._execute_batch(
+                "pdf_to_images", batch_paths, {"dpi": 600}, []
             )
+            async with self:
+                return self._finish_batch("pdf_to_images", result, error)
+        try:
+            with tracing.span("tool_run", tool="pdf_to_images", input_files=1):
+                job = await asyncio.to_thread(
+                    jobs.create_job, "pdf_to_images", [input_path], {"dpi": 600}
+                )
+                running = asyncio.create_task(
+                    asyncio.to_thread(jobs.execute, job, True)
+                )
+                pages_dir = store.pages_dir(job["id"])
+                async with self:
+                    # The page builds each page's link from these and the
+                    # count, so only the count changes as pages are rendered.
+                    self.page_stem = Path(self.uploaded_file).stem
+                    self.page_url_prefix = (
+                        f"{get_config().api_url}/jobs/{job['id']}/pages/"
+                        f"{quote(self.page_stem)}_page_"
+                    )
+                while not running.done():
+                    await asyncio.wait({running}, timeout=PROGRESS_INTERVAL)
+                    async with self:
+                        self._show_pages(self._rendered_count(pages_dir))
+                job = running.result()
+                async with self:
+                    self._show_pages(self.total_pages)
+                    self.processed = True
+                    # The archive of every page is large; the browser fetches
+                    # it from the API instead of it going over the websocket.
+                    return self._deliver(job, stream=True)
+        except OperationError as e:
+            async with self:
+                self.error_message = str(e)
         except Exception as e:
             logging.exception(f"Error: {e}")
-            self.error_message = f"An error occurred during image conversion: {e}"
+            async with self:
+                self.error_message = f"An error occurred during image conversion: {e}"
         finally:
-            self.is_processing = False
-            if self.uploaded_file:
-                try:
-                    os.remove(rx.get_upload_dir() / self.uploaded_file)
-                    self.uploaded_file = ""
-                except OSError as e:
-                    logging.exception(f"Error: {e}")
+            async with self:
+                self.is_processing = False
+                if self.uploaded_file:
+                    try:
+                        os.remove(self._upload_path(self.uploaded_file))
+                        self.uploaded_file = ""
+                    except OSError as e:
+                        logging.exception(f"Error: {e}")
@@ -0,0 +1,141 @@
+"""State for the Pipeline tool page."""
+
+import reflex as rx
+from .base_state import PDFToolState
+from ..services.operations import PIPELINE_STEPS, OperationError, parse_pipeline
+import os
+import logging
+
+
+class PipelineState(rx.State, PDFToolState):
+    """State to handle running several operations on a PDF in one pass."""
+
+    is_processing: bool = False
+    error_message: str = ""
+    uploaded_file: str = ""
+    steps: list[dict[str, str]] = []
+    new_step: str = "extract"
+    new_value: str = ""
+    processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    linearize: bool = False
+    batch_files: list[str] = []
+    batch_results: list[dict[str, str]] = []
+
+    def _steps_spec(self, steps: list[dict[str, str]]) -> str:
+        """Return ``steps`` in the ``op:value;op`` form the pipeline parses."""
+        return ";".join(
+            f"{step['step']}:{step['value']}" if step["value"] else step["step"]
+            for step in steps
+        )
+
+    @rx.event
+    def toggle_linearize(self):
+        """Switch fast web view output on or off."""
+        self.linearize = not self.linearize
+
+    @rx.event
+    def set_new_step(self, step: str):
+        """Choose the kind of step to add next."""
+        self.new_step = step
+        self.new_value = "90" if step == "rotate" else ""
+
+    @rx.event
+    def set_new_value(self, value: str):
+        """Set the parameter of the step to add next."""
+        self.new_value = value
+
+    @rx.event
+    def add_step(self):
+        """Append the chosen step, if the pipeline stays valid with it."""
+        self.error_message = ""
+        value = self.new_value.strip() if PIPELINE_STEPS[self.new_step] else ""
+        steps = [*self.steps, {"step": self.new_step, "value": value}]
+        try:
+            parse_pipeline(self._steps_spec(steps))
+        except (OperationError, ValueError) as e:
+            self.error_message = str(e)
+            return
+        self.steps = steps
+        self.new_value = "90" if self.new_step == "rotate" else ""
+
+    @rx.event
+    def remove_step(self, index: int):
+        """Remove the step at ``index``."""
+        self.steps = [step for i, step in enumerate(self.steps) if i != index]
+
+    @rx.event
+    async def handle_upload(self, files: list[rx.UploadFile]):
+        """Handle the upload of one PDF, or of several to process as a batch."""
+        self.is_processing = True
+        self.error_message = ""
+        self.uploaded_file = ""
+        self.batch_files = []
+        self.batch_results = []
+        self.processed = False
+        if not files:
+            self.error_message = "No file was selected."
+            self.is_processing = False
+            return
+        if len(files) > 1:
+            self.batch_files = await self._save_batch(files, "pipeline")
+            self.is_processing = False
+            return
+        file = files[0]
+        upload_data = await self._read_upload(file, "pipeline")
+        if upload_data is None:
+            self.is_processing = False
+            return
+        output_path = self._upload_path(file.name)
+        with open(output_path, "wb") as f:
+            f.write(upload_data)
+        self.uploaded_file = file.name
+        self.is_processing = False
+
+    @rx.event
+    async def attach_upload(self, result: dict):
+        """Use a PDF sent with the resumable uploader."""
+        self.error_message = ""
+        self.processed = False
+        self.batch_files = []
+        self.batch_results = []
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self.uploaded_file = upload["filename"]
+
+    @rx.event
+    async def run_pipeline(self):
+        """Apply every step, in order, to the uploaded PDF."""
+        self.is_processing = True
+        self.error_message = ""
+        self.processed = False
+        if not self.uploaded_file and not self.batch_files:
+            self.error_message = "Please upload a PDF file first."
+            self.is_processing = False
+            return
+        if not self.steps:
+            self.error_message = "Please add at least one step to the pipeline."
+            self.is_processing = False
+            return
+        params = {"steps": self._steps_spec(self.steps), "linearize": self.linearize}
+        if self.batch_files:
+            return await self._run_batch("pipeline", params)
+        try:
+            download = await self._run_job("pipeline", [self.uploaded_file], params)
+            self.processed = True
+            self.is_processing = False
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
+        except Exception as e:
+            logging.exception(f"Error: {e}")
+            self.error_message = f"An error occurred while running the pipeline: {e}"
+        finally:
+            self.is_processing = False
+            if self.uploaded_file:
+                try:
+                    os.remove(self._upload_path(self.uploaded_file))
+                    self.uploaded_file = ""
+                except OSError as e:
+                    logging.exception(f"Error: {e}")
@@ -2,8 +2,7 @@
 
 import reflex as rx
 from .base_state import PDFToolState
-import pypdf
-import io
+from ..services.operations import OperationError
 import os
 import logging
 
@@ -11,12 +10,23 @@ import logging
 class RotatePagesState(rx.State, PDFToolState):
     """State to handle rotating pages in a PDF."""
 
-    is_dark: bool = True
     is_processing: bool = False
     error_message: str = ""
     uploaded_file: str = ""
     rotation_angle: int = 90
     processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    linearize: bool = False
+    batch_files: list[str] = []
+    batch_results: list[dict[str, str]] = []
+    thumbnails_url: str = ""
+    thumbnail_count: int = 0
+
+    @rx.event
+    def toggle_linearize(self):
+        """Switch fast web view output on or off."""
+        self.linearize = not self.linearize
 
     @rx.event
     def set_rotation_angle(self, angle: str):
@@ -25,33 +35,53 @@ class RotatePagesState(rx.State, PDFToolState):
 
     @rx.event
     async def handle_upload(self, files: list[rx.UploadFile]):
-        """Handle the upload of a single PDF file for rotation."""
+        """Handle the upload of one PDF, or of several to process as a batch."""
         self.is_processing = True
         self.error_message = ""
         self.uploaded_file = ""
+        self.batch_files = []
+        self.batch_results = []
+        self.thumbnail_count = 0
         self.processed = False
         if not files:
             self.error_message = "No file was selected."
             self.is_processing = False
             return
+        if len(files) > 1:
+            self.batch_files = await self._save_batch(files, "rotate")
+            self.is_processing = False
+            return
         file = files[0]
-        upload_data = await file.read()
-        if not self._validate_pdf(upload_data):
+        upload_data = await self._read_upload(file, "rotate")
+        if upload_data is None:
             self.is_processing = False
             return
-        output_path = rx.get_upload_dir() / file.name
+        output_path = self._upload_path(file.name)
         with open(output_path, "wb") as f:
             f.write(upload_data)
         self.uploaded_file = file.name
+        await self._load_thumbnails(file.name)
         self.is_processing = False
 
     @rx.event
-    def rotate_pdf(self):
+    async def attach_upload(self, result: dict):
+        """Use a PDF sent with the resumable uploader."""
+        self.error_message = ""
+        self.processed = False
+        self.batch_files = []
+        self.batch_results = []
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self.uploaded_file = upload["filename"]
+            await self._load_thumbnails(upload["filename"])
+
+    @rx.event
+    async def rotate_pdf(self):
         """Rotate all pages of the PDF by the selected angle."""
         self.is_processing = True
         self.error_message = ""
         self.processed = False
-        if not self.uploaded_file:
+        if not self.uploaded_file and not self.batch_files:
             self.error_message = "Please upload a PDF file first."
             self.is_processing = False
             return
@@ -61,22 +91,21 @@ class RotatePagesState(rx.State, PDFToolState):
             )
             self.is_processing = False
             return
+        if self.batch_files:
+            return await self._run_batch(
+                "rotate", {"angle": self.rotation_angle, "linearize": self.linearize}
+            )
         try:
-            input_path = rx.get_upload_dir() / self.uploaded_file
-            reader = pypdf.PdfReader(input_path)
-            writer = pypdf.PdfWriter()
-            for page in reader.pages:
-                page.rotate(self.rotation_angle)
-                writer.add_page(page)
-            output_buffer = io.BytesIO()
-            writer.write(output_buffer)
-            output_buffer.seek(0)
-            base_name = os.path.splitext(self.uploaded_file)[0]
+            download = await self._run_job(
+                "rotate",
+                [self.uploaded_file],
+                {"angle": self.rotation_angle, "linearize": self.linearize},
+            )
             self.processed = True
             self.is_processing = False
-            return rx.download(
-                data=output_buffer.getvalue(), filename=f"{base_name}_rotated.pdf"
-            )
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
         except Exception as e:
             logging.exception(f"Error: {e}")
             self.error_message = f"An error occurred during rotation: {e}"
@@ -84,7 +113,7 @@ class RotatePagesState(rx.State, PDFToolState):
             self.is_processing = False
             if self.uploaded_file:
                 try:
-                    os.remove(rx.get_upload_dir() / self.uploaded_file)
+                    os.remove(self._upload_path(self.uploaded_file))
                     self.uploaded_file = ""
                 except OSError as e:
                     logging.exception(f"Error: {e}")
@@ -2,8 +2,7 @@
 
 import reflex as rx
 from .base_state import PDFToolState
-import pypdf
-import zipfile
+from ..services.operations import OperationError
 import io
 import os
 import logging
@@ -12,13 +11,46 @@ import logging
 class SplitState(rx.State, PDFToolState):
     """State to handle splitting a PDF file."""
 
-    is_dark: bool = True
     is_processing: bool = False
     error_message: str = ""
     uploaded_file: str = ""
     split_ranges: str = ""
     total_pages: int = 0
     processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    linearize: bool = False
+    thumbnails_url: str = ""
+    thumbnail_count: int = 0
+    selected_pages: list[int] = []
+
+    @rx.event
+    def toggle_linearize(self):
+        """Switch fast web view output on or off."""
+        self.linearize = not self.linearize
+
+    @rx.event
+    def set_split_ranges(self, value: str):
+        """Set the typed ranges and highlight the page each part starts on."""
+        self.split_ranges = value
+        starts = (part.strip().partition("-")[0] for part in value.split(","))
+        self.selected_pages = sorted(
+            {int(start) for start in starts if start.isdigit()}
+        )
+
+    @rx.event
+    def toggle_page(self, page: int):
+        """Start a new part at ``page``, or join it back to the previous part."""
+        if page == 1:
+            return
+        starts = ({1} | set(self.selected_pages)) ^ {page}
+        starts = sorted(start for start in starts if start <= self.total_pages)
+        ends = [start - 1 for start in starts[1:]] + [self.total_pages]
+        self.selected_pages = starts
+        self.split_ranges = ",".join(
+            str(start) if start == end else f"{start}-{end}"
+            for start, end in zip(starts, ends)
+        )
 
     @rx.event
     async def handle_upload(self, files: list[rx.UploadFile]):
@@ -26,26 +58,41 @@ class SplitState(rx.State, PDFToolState):
         self.is_processing = True
         self.error_message = ""
         self.uploaded_file = ""
+        self.thumbnail_count = 0
         self.processed = False
         if not files:
             self.error_message = "No file was selected."
             self.is_processing = False
             return
         file = files[0]
-        upload_data = await file.read()
-        if not self._validate_pdf(upload_data):
+        upload_data = await self._read_upload(file, "split")
+        if upload_data is None:
             self.is_processing = False
             return
+        import pypdf
+
         pdf = pypdf.PdfReader(io.BytesIO(upload_data))
         self.total_pages = len(pdf.pages)
-        output_path = rx.get_upload_dir() / file.name
+        output_path = self._upload_path(file.name)
         with open(output_path, "wb") as f:
             f.write(upload_data)
         self.uploaded_file = file.name
+        await self._load_thumbnails(file.name)
         self.is_processing = False
 
     @rx.event
-    def split_pdf(self):
+    async def attach_upload(self, result: dict):
+        """Use a PDF sent with the resumable uploader."""
+        self.error_message = ""
+        self.processed = False
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self.uploaded_file = upload["filename"]
+            self.total_pages = upload["pages"]
+            await self._load_thumbnails(upload["filename"])
+
+    @rx.event
+    async def split_pdf(self):
         """Split the PDF based on the provided page ranges."""
         self.is_processing = True
         self.error_message = ""
@@ -59,35 +106,16 @@ class SplitState(rx.State, PDFToolState):
             self.is_processing = False
             return
         try:
-            input_path = rx.get_upload_dir() / self.uploaded_file
-            pdf_reader = pypdf.PdfReader(input_path)
-            base_name = os.path.splitext(self.uploaded_file)[0]
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                ranges = self.split_ranges.split(",")
-                for i, page_range in enumerate(ranges):
-                    writer = pypdf.PdfWriter()
-                    pages_to_add = self._parse_page_range(
-                        page_range.strip(), self.total_pages
-                    )
-                    if not pages_to_add:
-                        self.error_message = f"Invalid page range: {page_range}"
-                        self.is_processing = False
-                        return
-                    for page_num in pages_to_add:
-                        writer.add_page(pdf_reader.pages[page_num - 1])
-                    output_buffer = io.BytesIO()
-                    writer.write(output_buffer)
-                    output_buffer.seek(0)
-                    zf.writestr(
-                        f"{base_name}_part_{i + 1}.pdf", output_buffer.getvalue()
-                    )
-            zip_buffer.seek(0)
+            download = await self._run_job(
+                "split",
+                [self.uploaded_file],
+                {"ranges": self.split_ranges, "linearize": self.linearize},
+            )
             self.processed = True
             self.is_processing = False
-            return rx.download(
-                data=zip_buffer.getvalue(), filename=f"{base_name}_split.zip"
-            )
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
         except Exception as e:
             logging.exception(f"Error: {e}")
             self.error_message = f"An error occurred during splitting: {e}"
@@ -95,27 +123,7 @@ class SplitState(rx.State, PDFToolState):
             self.is_processing = False
             if self.uploaded_file:
                 try:
-                    os.remove(rx.get_upload_dir() / self.uploaded_file)
+                    os.remove(self._upload_path(self.uploaded_file))
                     self.uploaded_file = ""
                 except OSError as e:
                     logging.exception(f"Error: {e}")
-
-    def _parse_page_range(self, range_str: str, total_pages: int) -> list[int] | None:
-        pages = set()
-        try:
-            parts = range_str.split(",")
-            for part in parts:
-                if "-" in part:
-                    start, end = map(int, part.split("-"))
-                    if start > end or start < 1 or end > total_pages:
-                        return None
-                    pages.update(range(start, end + 1))
-                else:
-                    page = int(part)
-                    if page < 1 or page > total_pages:
-                        return None
-                    pages.add(page)
-            return sorted(list(pages))
-        except ValueError as e:
-            logging.exception(f"Error: {e}")
-            return None
@@ -0,0 +1,159 @@
+"""State for the Watermark tool page."""
+
+import reflex as rx
+from .base_state import PDFToolState
+from ..services.operations import OperationError
+import os
+import logging
+
+
+class WatermarkState(rx.State, PDFToolState):
+    """State to handle stamping text or a logo over the pages of a PDF."""
+
+    is_processing: bool = False
+    error_message: str = ""
+    uploaded_file: str = ""
+    logo_file: str = ""
+    text: str = "CONFIDENTIAL"
+    pages: str = ""
+    opacity: float = 0.3
+    position: str = "diagonal"
+    processed: bool = False
+    job_id: str = ""
+    download_url: str = ""
+    linearize: bool = False
+    batch_files: list[str] = []
+    batch_results: list[dict[str, str]] = []
+
+    @rx.event
+    def toggle_linearize(self):
+        """Switch fast web view output on or off."""
+        self.linearize = not self.linearize
+
+    @rx.event
+    def set_text(self, text: str):
+        """Set the text to stamp."""
+        self.text = text
+
+    @rx.event
+    def set_pages(self, pages: str):
+        """Set which pages to stamp; empty means every page."""
+        self.pages = pages
+
+    @rx.event
+    def set_opacity(self, opacity: str):
+        """Set the stamp's opacity from the slider, in percent."""
+        self.opacity = int(opacity) / 100
+
+    @rx.event
+    def set_position(self, position: str):
+        """Set where on each page the stamp goes."""
+        self.position = position
+
+    @rx.event
+    async def handle_upload(self, files: list[rx.UploadFile]):
+        """Handle the upload of one PDF, or of several to process as a batch."""
+        self.is_processing = True
+        self.error_message = ""
+        self.uploaded_file = ""
+        self.batch_files = []
+        self.batch_results = []
+        self.processed = False
+        if not files:
+            self.error_message = "No file was selected."
+            self.is_processing = False
+            return
+        if len(files) > 1:
+            self.batch_files = await self._save_batch(files, "watermark")
+            self.is_processing = False
+            return
+        file = files[0]
+        upload_data = await self._read_upload(file, "watermark")
+        if upload_data is None:
+            self.is_processing = False
+            return
+        output_path = self._upload_path(file.name)
+        with open(output_path, "wb") as f:
+            f.write(upload_data)
+        self.uploaded_file = file.name
+        self.is_processing = False
+
+    @rx.event
+    async def handle_logo_upload(self, files: list[rx.UploadFile]):
+        """Handle the upload of an image to stamp instead of the text."""
+        self.error_message = ""
+        if not files:
+            return
+        file = files[0]
+        upload_data = await self._read_upload(file, "watermark", images=True)
+        if upload_data is None:
+            return
+        self._drop_logo()
+        with open(self._upload_path(f"logo_{file.name}"), "wb") as f:
+            f.write(upload_data)
+        self.logo_file = file.name
+
+    def _logo_uploads(self) -> list[str]:
+        # Stored under a prefix, apart from the PDFs, which may share its name.
+        return [f"logo_{self.logo_file}"] if self.logo_file else []
+
+    def _drop_logo(self):
+        self._remove_uploads(self._logo_uploads())
+        self.logo_file = ""
+
+    @rx.event
+    def remove_logo(self):
+        """Go back to stamping the text."""
+        self._drop_logo()
+
+    @rx.event
+    async def attach_upload(self, result: dict):
+        """Use a PDF sent with the resumable uploader."""
+        self.error_message = ""
+        self.processed = False
+        self.batch_files = []
+        self.batch_results = []
+        upload = await self._claim_upload(result)
+        if upload is not None:
+            self.uploaded_file = upload["filename"]
+
+    @rx.event
+    async def watermark_pdf(self):
+        """Stamp the selected pages of the PDF."""
+        self.is_processing = True
+        self.error_message = ""
+        self.processed = False
+        if not self.uploaded_file and not self.batch_files:
+            self.error_message = "Please upload a PDF file first."
+            self.is_processing = False
+            return
+        params = {
+            "text": self.text,
+            "pages": self.pages.strip(),
+            "opacity": self.opacity,
+            "position": self.position,
+            "linearize": self.linearize,
+        }
+        stamp = self._logo_uploads()
+        if self.batch_files:
+            return await self._run_batch("watermark", params, stamp)
+        try:
+            download = await self._run_job(
+                "watermark", [self.uploaded_file, *stamp], params
+            )
+            self.processed = True
+            self.is_processing = False
+            return download
+        except OperationError as e:
+            self.error_message = str(e)
+        except Exception as e:
+            logging.exception(f"Error: {e}")
+            self.error_message = f"An error occurred while stamping the PDF: {e}"
+        finally:
+            self.is_processing = False
+            if self.uploaded_file:
+                try:
+                    os.remove(self._upload_path(self.uploaded_file))
+                    self.uploaded_file = ""
+                except OSError as e:
+                    logging.exception(f"Error: {e}")
@@ -0,0 +1,116 @@
+// Resumable, chunked uploads for large PDFs (see app/services/uploads.py).
+//
+// pdfOMaticUpload(inputId, apiUrl, progressId) uploads the file selected in
+// <input id=inputId> in checksummed chunks, a few at a time, retrying failed
+// chunks with backoff. The upload ID is remembered per file in localStorage,
+// so after a dropped connection or a reload the same file resumes where it
+// stopped. Resolves to {upload_id, error}.
+(function () {
+  const PARALLEL_CHUNKS = 3;
+  const MAX_ATTEMPTS = 6;
+
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  async function sha256(buffer) {
+    const digest = await crypto.subtle.digest("SHA-256", buffer);
+    return Array.from(new Uint8Array(digest))
+      .map((b) => b.toString(16).padStart(2, "0"))
+      .join("");
+  }
+
+  async function json(response) {
+    const body = await response.json().catch(() => ({}));
+    if (!response.ok) {
+      const error = new Error(body.error || `HTTP ${response.status}`);
+      error.status = response.status;
+      throw error;
+    }
+    return body;
+  }
+
+  async function start(apiUrl, file, key) {
+    const saved = localStorage.getItem(key);
+    if (saved) {
+      const response = await fetch(`${apiUrl}/uploads/${saved}`);
+      if (response.ok) {
+        const upload = await response.json();
+        if (upload.status !== "invalid") return upload;
+      }
+    }
+    const upload = await json(
+      await fetch(`${apiUrl}/uploads`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ filename: file.name, size: file.size }),
+      }),
+    );
+    localStorage.setItem(key, upload.id);
+    return upload;
+  }
+
+  async function sendChunk(apiUrl, file, upload, index) {
+    const begin = index * upload.chunk_size;
+    const chunk = await file
+      .slice(begin, Math.min(file.size, begin + upload.chunk_size))
+      .arrayBuffer();
+    const checksum = await sha256(chunk);
+    for (let attempt = 1; ; attempt++) {
+      try {
+        return await json(
+          await fetch(`${apiUrl}/uploads/${upload.id}/chunks/${index}`, {
+            method: "PUT",
+            headers: { "X-Chunk-SHA256": checksum },
+            body: chunk,
+          }),
+        );
+      } catch (error) {
+        // Client errors other than a corrupted chunk (422) will not go away.
+        const retryable = !error.status || error.status >= 500 || error.status === 422;
+        if (!retryable || attempt >= MAX_ATTEMPTS) throw error;
+        await sleep(500 * 2 ** attempt);
+      }
+    }
+  }
+
+  window.pdfOMaticUpload = async function (inputId, apiUrl, progressId) {
+    const input = document.getElementById(inputId);
+    const progress = document.getElementById(progressId);
+    const file = input && input.files && input.files[0];
+    if (!file) return { upload_id: "", error: "No file was selected." };
+    const key = `pdf-o-matic-upload:${file.name}:${file.size}:${file.lastModified}`;
+    try {
+      let upload = await start(apiUrl, file, key);
+      const received = new Set(upload.received);
+      const pending = [];
+      for (let i = 0; i < upload.total_chunks; i++) {
+        if (!received.has(i)) pending.push(i);
+      }
+      const report = () => {
+        if (progress) {
+          progress.textContent = `${Math.floor((100 * received.size) / upload.total_chunks)}%`;
+        }
+      };
+      report();
+      const worker = async () => {
+        while (pending.length) {
+          const index = pending.shift();
+          const latest = await sendChunk(apiUrl, file, upload, index);
+          received.add(index);
+          if (latest.status !== "receiving") upload = latest;
+          report();
+        }
+      };
+      await Promise.all(Array.from({ length: PARALLEL_CHUNKS }, worker));
+      if (upload.status === "receiving") {
+        upload = await json(await fetch(`${apiUrl}/uploads/${upload.id}`));
+      }
+      localStorage.removeItem(key);
+      if (upload.status !== "complete") {
+        return { upload_id: "", error: upload.error || "The upload did not complete." };
+      }
+      return { upload_id: upload.id, error: "" };
+    } catch (error) {
+      return { upload_id: "", error: String(error.message || error) };
+    }
+  };
+})();
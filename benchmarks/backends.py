@@ -0,0 +1,135 @@
+"""Compares the pypdf and PyMuPDF backends on the benchmark cases.
+
+Every structural case is run in this process with each backend forced (both
+libraries are imported first, as in a warm worker). The outputs must be
+equivalent: same pages, in the same order, with the same size, rotation and
+text. The table shows where each backend is faster. PyMuPDF is the default
+in ``app.services.backends`` because it has won every case; any case where
+it does not is listed at the end:
+
+    python -m benchmarks.backends [--repeat 5] [--only rotate,merge]
+"""
+
+from pathlib import Path
+from app.services.backends import ONLY
+from .corpus import DEFAULT_DIR, generate
+from .run import CASES, _resolve_inputs
+import argparse
+import importlib
+import io
+import json
+import sys
+import time
+import zipfile
+
+
+def _page_signature(data: bytes) -> list[tuple]:
+    import pymupdf
+
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        return [
+            (
+                page.rotation,
+                tuple(round(v, 1) for v in page.mediabox),
+                " ".join(page.get_text().split()),
+            )
+            for page in doc
+        ]
+
+
+def signature(data: bytes) -> list[tuple]:
+    """Describe an output page by page as a reader sees it, ignoring how it is
+    encoded. Pages of a ZIP are prefixed with the name of their file."""
+    if data[:4] == b"PK\x03\x04":
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            return [
+                (name, *page)
+                for name in zf.namelist()
+                for page in _page_signature(zf.read(name))
+            ]
+    return _page_signature(data)
+
+
+def time_case(case: dict, input_paths: list[Path], backend: str, repeat: int):
+    """Return the best wall time of ``repeat`` runs and the output of the last."""
+    from app.services import backends, operations, pymupdf_backend
+
+    best = float("inf")
+    for _ in range(repeat):
+        # Time merges from the files, as pypdf does, not from cached parts.
+        pymupdf_backend.parts.clear()
+        out = io.BytesIO()
+        start = time.perf_counter()
+        with backends.forced(backend):
+            operations.run_operation(
+                case["operation"], input_paths, out, case["params"]
+            )
+        best = min(best, time.perf_counter() - start)
+    return best, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--only", default="", help="Comma-separated operations or case names."
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    # Load both libraries up front so neither pays its import in a timed run.
+    for library in ("pymupdf", "pypdf"):
+        importlib.import_module(library)
+
+    corpus_dir = generate(args.corpus)
+    selected = {name for name in args.only.split(",") if name}
+    rows = []
+    mismatched = []
+    print(
+        f"{'case':<28} {'MiB':>7} {'pages':>6} {'pypdf':>8} {'pymupdf':>8}"
+        f" {'speedup':>8} {'out KiB':>15}  same"
+    )
+    for case in CASES:
+        if case["operation"] in ONLY:
+            continue
+        if selected and not selected & {case["name"], case["operation"]}:
+            continue
+        input_paths = _resolve_inputs(corpus_dir, case["inputs"])
+        row = {
+            "operation": case["operation"],
+            "input_bytes": sum(p.stat().st_size for p in input_paths),
+        }
+        outputs = {}
+        for backend in ("pypdf", "pymupdf"):
+            row[backend], outputs[backend] = time_case(
+                case, input_paths, backend, args.repeat
+            )
+        pypdf_signature = signature(outputs["pypdf"])
+        row["pages"] = len(pypdf_signature)
+        row["equivalent"] = pypdf_signature == signature(outputs["pymupdf"])
+        for backend in ("pypdf", "pymupdf"):
+            row[f"{backend}_output_bytes"] = len(outputs[backend])
+        if not row["equivalent"]:
+            mismatched.append(case["name"])
+        rows.append({"name": case["name"], **row})
+        print(
+            f"{case['name']:<28} {row['input_bytes'] / 2**20:>7.2f} {row['pages']:>6}"
+            f" {row['pypdf']:>8.3f} {row['pymupdf']:>8.3f}"
+            f" {row['pypdf'] / row['pymupdf']:>7.1f}x"
+            f" {row['pypdf_output_bytes'] // 1024:>7}/{row['pymupdf_output_bytes'] // 1024:<7}"
+            f"  {'yes' if row['equivalent'] else 'NO'}"
+        )
+
+    slower = [row["name"] for row in rows if row["pymupdf"] >= row["pypdf"]]
+    if slower:
+        print(f"PyMuPDF is not faster on: {', '.join(slower)}")
+    if args.output:
+        args.output.write_text(json.dumps({"results": rows}, indent=2))
+    if mismatched:
+        print(f"Outputs differ: {', '.join(mismatched)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
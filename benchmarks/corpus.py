@@ -0,0 +1,120 @@
+"""Generates the synthetic PDF corpus used by the benchmarks.
+
+Usage:
+    python -m benchmarks.corpus [--dir benchmarks/corpus] [--force]
+"""
+
+from pathlib import Path
+from PIL import Image
+import pymupdf as fitz
+import argparse
+import io
+import json
+import random
+
+CORPUS_VERSION = 1
+DEFAULT_DIR = Path(__file__).parent / "corpus"
+
+LOREM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, "
+    "quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo."
+)
+
+
+def _text_pdf(path: Path, pages: int) -> None:
+    size = fitz.paper_rect("a4")
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=size.width, height=size.height)
+        page.insert_textbox(
+            fitz.Rect(72, 72, size.width - 72, size.height - 72),
+            f"Page {i + 1}\n\n" + "\n\n".join([LOREM] * 8),
+            fontsize=11,
+        )
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def _scan_pdf(path: Path, pages: int, rng: random.Random) -> None:
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=612, height=792)
+        img = Image.frombytes(
+            "RGB", (1275, 1650), rng.randbytes(1275 * 1650 * 3)
+        ).reduce(3)
+        buffer = io.BytesIO()
+        img.resize((1275, 1650)).save(buffer, format="JPEG", quality=75)
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def _large_format_pdf(path: Path, pages: int, rng: random.Random) -> None:
+    size = fitz.paper_rect("a0")
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=size.width, height=size.height)
+        for _ in range(400):
+            p1 = fitz.Point(rng.uniform(0, size.width), rng.uniform(0, size.height))
+            p2 = fitz.Point(rng.uniform(0, size.width), rng.uniform(0, size.height))
+            page.draw_line(p1, p2, color=(rng.random(), rng.random(), rng.random()))
+        page.insert_text((72, 144), f"Drawing sheet {i + 1}", fontsize=96)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+CORPUS = {
+    "text_1.pdf": lambda path, rng: _text_pdf(path, 1),
+    "text_100.pdf": lambda path, rng: _text_pdf(path, 100),
+    "text_5000.pdf": lambda path, rng: _text_pdf(path, 5000),
+    "scan_20.pdf": lambda path, rng: _scan_pdf(path, 20, rng),
+    "large_format_10.pdf": lambda path, rng: _large_format_pdf(path, 10, rng),
+}
+SMALL_FILES = 200
+
+
+def generate(directory: Path = DEFAULT_DIR, force: bool = False) -> Path:
+    """Generate the corpus into ``directory`` unless an up-to-date one exists."""
+    manifest = directory / "manifest.json"
+    if (
+        not force
+        and manifest.exists()
+        and json.loads(manifest.read_text()).get("version") == CORPUS_VERSION
+    ):
+        return directory
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(0)
+    for name, build in CORPUS.items():
+        print(f"Generating {name}")
+        build(directory / name, rng)
+    small_dir = directory / "small"
+    small_dir.mkdir(exist_ok=True)
+    print(f"Generating {SMALL_FILES} small files")
+    for i in range(SMALL_FILES):
+        _text_pdf(small_dir / f"small_{i:03d}.pdf", 1)
+    manifest.write_text(
+        json.dumps(
+            {
+                "version": CORPUS_VERSION,
+                "files": {
+                    str(path.relative_to(directory)): path.stat().st_size
+                    for path in sorted(directory.rglob("*.pdf"))
+                },
+            },
+            indent=2,
+        )
+    )
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", type=Path, default=DEFAULT_DIR)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+    generate(args.dir, args.force)
+
+
+if __name__ == "__main__":
+    main()
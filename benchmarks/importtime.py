@@ -0,0 +1,71 @@
+"""Checks import time and eagerly loaded libraries against a budget.
+
+Each module is imported in a fresh ``python -X importtime`` process; the best
+of ``--repeat`` runs is compared with its budget, and the import must not load
+any of the heavy PDF/imaging libraries, which are imported on first use:
+
+    python -m benchmarks.importtime [--repeat 5] [--scale 1.5]
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Cumulative import time budgets in milliseconds. ``app.services.operations``
+# is what a worker imports; ``app.app`` is what the server imports at boot.
+BUDGETS_MS = {
+    "app.services.operations": 100,
+    "app.app": 2000,
+}
+FORBIDDEN = ("pypdf", "pymupdf", "fitz")
+
+
+def import_profile(module: str) -> tuple[float, dict[str, float]]:
+    """Import ``module`` in a fresh process and return its total and per-module ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules[name.strip()] = int(cumulative) / 1000
+    return modules[module], modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply every budget, e.g. on slow CI machines.",
+    )
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<28} {'ms':>9} {'budget':>9}")
+    for module, budget in BUDGETS_MS.items():
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        total, modules = min(runs, key=lambda run: run[0])
+        budget *= args.scale
+        flag = " !" if total > budget else ""
+        print(f"{module:<28} {total:>9.1f} {budget:>9.1f}{flag}")
+        if total > budget:
+            failures.append(f"{module} took {total:.1f} ms (budget {budget:.1f} ms)")
+        loaded = sorted(name for name in modules if name.split(".")[0] in FORBIDDEN)
+        if loaded:
+            failures.append(f"{module} eagerly imports {', '.join(loaded[:5])}")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""Concurrent-session load test against a locally running PDF-O-Matic backend.
+
+Each simulated session behaves like a browser tab: it connects to the event
+websocket, hydrates, uploads through ``/_upload``, sets the tool's inputs,
+triggers the tool event and waits for the download. Sessions run closed-loop
+at each concurrency step, and latency percentiles, error rate and throughput
+are reported per step.
+
+Requires ``aiohttp`` for the Socket.IO client:
+
+    python -m benchmarks.loadtest --start-server --steps 1,2,4,8,16
+    python -m benchmarks.loadtest --url http://localhost:8000 --workload rotate=1
+"""
+
+from pathlib import Path
+from typing import TypedDict
+from .corpus import DEFAULT_DIR, generate
+import argparse
+import asyncio
+import httpx
+import importlib
+import json
+import os
+import random
+import signal
+import socketio
+import subprocess
+import sys
+import time
+import uuid
+
+NAMESPACE = "/_event"
+FIELD_MARKER = "_rx_state_"
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+class ToolProfile(TypedDict):
+    """How a simulated session drives one tool page."""
+
+    state: str
+    route: str
+    inputs: list[str]
+    setters: dict[str, dict]
+    event: str
+
+
+TOOLS: dict[str, ToolProfile] = {
+    "split": {
+        "state": "app.states.split_state.SplitState",
+        "route": "/split-pdf",
+        "inputs": ["text_100.pdf"],
+        "setters": {"set_split_ranges": {"value": "1-50,51-100"}},
+        "event": "split_pdf",
+    },
+    "merge": {
+        "state": "app.states.merge_state.MergeState",
+        "route": "/merge-pdf",
+        "inputs": ["small/small_000.pdf", "small/small_001.pdf", "text_1.pdf"],
+        "setters": {},
+        "event": "merge_pdfs",
+    },
+    "compress": {
+        "state": "app.states.compress_state.CompressState",
+        "route": "/compress-pdf",
+        "inputs": ["text_100.pdf"],
+        "setters": {},
+        "event": "compress_pdf",
+    },
+    "pdf_to_images": {
+        "state": "app.states.pdf_to_images_state.PDFToImagesState",
+        "route": "/pdf-to-images",
+        "inputs": ["text_1.pdf"],
+        "setters": {},
+        "event": "convert_to_images",
+    },
+    "extract": {
+        "state": "app.states.extract_pages_state.ExtractPagesState",
+        "route": "/extract-pages",
+        "inputs": ["text_100.pdf"],
+        "setters": {"set_page_selection": {"value": "1-10,50"}},
+        "event": "extract_pages",
+    },
+    "rotate": {
+        "state": "app.states.rotate_pages_state.RotatePagesState",
+        "route": "/rotate-pages",
+        "inputs": ["text_100.pdf"],
+        "setters": {"set_rotation_angle": {"angle": "90"}},
+        "event": "rotate_pdf",
+    },
+}
+
+DEFAULT_WORKLOAD = "compress=3,rotate=3,extract=2,split=1,merge=1,pdf_to_images=1"
+
+
+def _state_name(path: str) -> str:
+    module, _, cls = path.rpartition(".")
+    return getattr(importlib.import_module(module), cls).get_full_name()
+
+
+def _hydrate_event() -> str:
+    import reflex as rx
+    from reflex.event import get_hydrate_event
+
+    return get_hydrate_event(rx.State)
+
+
+def _error_in(update: dict, state_name: str) -> str:
+    delta = update.get("delta", {}).get(state_name, {})
+    return delta.get(f"error_message{FIELD_MARKER}", "")
+
+
+class Session:
+    """A simulated browser tab talking to the backend."""
+
+    def __init__(self, base_url: str, http: httpx.AsyncClient, timeout: float):
+        self.base_url = base_url
+        self.http = http
+        self.timeout = timeout
+        self.token = str(uuid.uuid4())
+        self.updates: asyncio.Queue = asyncio.Queue()
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on("event", self._on_update, namespace=NAMESPACE)
+
+    async def _on_update(self, data):
+        await self.updates.put(json.loads(data) if isinstance(data, str) else data)
+
+    async def connect(self, route: str, hydrate_event: str) -> None:
+        await self.sio.connect(
+            f"{self.base_url}?token={self.token}",
+            socketio_path=NAMESPACE,
+            transports=["websocket"],
+            namespaces=[NAMESPACE],
+            wait_timeout=self.timeout,
+        )
+        await self.emit(hydrate_event, {}, route)
+
+    async def close(self) -> None:
+        await self.sio.disconnect()
+
+    async def emit(self, name: str, payload: dict, route: str) -> list[dict]:
+        """Send an event and collect its updates until the final one."""
+        while not self.updates.empty():
+            self.updates.get_nowait()
+        await self.sio.emit(
+            "event",
+            {
+                "token": self.token,
+                "name": name,
+                "payload": payload,
+                "router_data": {"pathname": route, "query": {}, "asPath": route},
+            },
+            namespace=NAMESPACE,
+        )
+        updates = []
+        while True:
+            update = await asyncio.wait_for(self.updates.get(), self.timeout)
+            updates.append(update)
+            if update.get("final", True):
+                return updates
+
+    async def upload(self, handler: str, paths: list[Path]) -> list[dict]:
+        """Upload files through the upload endpoint and return its updates."""
+        response = await self.http.post(
+            f"{self.base_url}/_upload",
+            headers={
+                "reflex-client-token": self.token,
+                "reflex-event-handler": handler,
+            },
+            files=[
+                ("files", (p.name, p.read_bytes(), "application/pdf")) for p in paths
+            ],
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return [json.loads(line) for line in response.text.splitlines() if line]
+
+    async def run_tool(self, tool: str, state_name: str, corpus_dir: Path) -> None:
+        """Drive one tool end to end, raising if it does not produce a download."""
+        profile = TOOLS[tool]
+        route = profile["route"]
+        paths = [corpus_dir / name for name in profile["inputs"]]
+        for update in await self.upload(f"{state_name}.handle_upload", paths):
+            if error := _error_in(update, state_name):
+                raise RuntimeError(f"upload failed: {error}")
+        for setter, payload in profile["setters"].items():
+            await self.emit(f"{state_name}.{setter}", payload, route)
+        updates = await self.emit(f"{state_name}.{profile['event']}", {}, route)
+        while True:
+            for update in updates:
+                if error := _error_in(update, state_name):
+                    raise RuntimeError(error)
+                if any(
+                    event.get("name") == "_download"
+                    for event in update.get("events", [])
+                ):
+                    return
+            # Background events keep sending updates after the final one.
+            try:
+                updates = [await asyncio.wait_for(self.updates.get(), self.timeout)]
+            except TimeoutError:
+                raise RuntimeError("no download was produced") from None
+
+
+def _parse_workload(spec: str) -> list[tuple[str, float]]:
+    weights = []
+    for item in spec.split(","):
+        tool, _, weight = item.partition("=")
+        if tool not in TOOLS:
+            raise SystemExit(f"Unknown tool in workload: {tool}")
+        weights.append((tool, float(weight or 1)))
+    return weights
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def run_step(
+    base_url: str,
+    concurrency: int,
+    iterations: int,
+    workload: list[tuple[str, float]],
+    state_names: dict[str, str],
+    hydrate_event: str,
+    corpus_dir: Path,
+    timeout: float,
+) -> dict:
+    """Run ``concurrency`` sessions, each doing ``iterations`` tool runs."""
+    latencies: list[float] = []
+    errors: list[str] = []
+    tools, weights = zip(*workload)
+    rng = random.Random(concurrency)
+
+    async def session_loop(http: httpx.AsyncClient):
+        session = Session(base_url, http, timeout)
+        try:
+            await session.connect(TOOLS[tools[0]]["route"], hydrate_event)
+        # Any failure is a sample of the load test, not a reason to stop it.
+        except Exception as e:  # noqa: BLE001
+            errors.extend([f"connect: {e}"] * iterations)
+            return
+        try:
+            for _ in range(iterations):
+                tool = rng.choices(tools, weights)[0]
+                start = time.perf_counter()
+                try:
+                    await session.run_tool(tool, state_names[tool], corpus_dir)
+                    latencies.append(time.perf_counter() - start)
+                except Exception as e:  # noqa: BLE001
+                    errors.append(f"{tool}: {e!r}")
+        finally:
+            await session.close()
+
+    limits = httpx.Limits(max_connections=concurrency * 2)
+    async with httpx.AsyncClient(limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(session_loop(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    total = len(latencies) + len(errors)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "error_rate": len(errors) / total if total else 0.0,
+        "p50_seconds": _percentile(latencies, 0.50),
+        "p99_seconds": _percentile(latencies, 0.99),
+        "throughput_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "elapsed_seconds": elapsed,
+        "sample_errors": errors[:5],
+    }
+
+
+def _start_server(port: int, disable_cache: bool) -> subprocess.Popen:
+    env = dict(os.environ)
+    if disable_cache:
+        env["PDF_O_MATIC_CACHE_MAX_BYTES"] = "0"
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "reflex",
+            "run",
+            "--backend-only",
+            "--env",
+            "prod",
+            "--backend-port",
+            str(port),
+        ],
+        cwd=REPO_DIR,
+        env=env,
+        start_new_session=True,
+    )
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://localhost:{port}/ping", timeout=2).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            raise SystemExit("The backend exited before it became ready.")
+        time.sleep(1)
+    _stop_server(process)
+    raise SystemExit("The backend did not become ready in time.")
+
+
+def _stop_server(process: subprocess.Popen) -> None:
+    """Stop the backend and the worker processes it spawned."""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def _saturation(steps: list[dict], max_error_rate: float) -> int | None:
+    """Return the first concurrency at which throughput stops improving."""
+    best = 0.0
+    for step in steps:
+        if step["error_rate"] > max_error_rate:
+            return step["concurrency"]
+        if best and step["throughput_per_second"] < best * 1.05:
+            return step["concurrency"]
+        best = max(best, step["throughput_per_second"])
+    return None
+
+
+async def main_async(args) -> dict:
+    sys.path.insert(0, str(REPO_DIR))
+    corpus_dir = generate(args.corpus)
+    workload = _parse_workload(args.workload)
+    state_names = {tool: _state_name(TOOLS[tool]["state"]) for tool, _ in workload}
+    hydrate_event = _hydrate_event()
+    steps = []
+    print(
+        f"{'sessions':>8} {'requests':>8} {'errors':>7} {'p50 s':>8} {'p99 s':>8} {'req/s':>8}"
+    )
+    for concurrency in (int(c) for c in args.steps.split(",")):
+        step = await run_step(
+            args.url,
+            concurrency,
+            args.iterations,
+            workload,
+            state_names,
+            hydrate_event,
+            corpus_dir,
+            args.timeout,
+        )
+        steps.append(step)
+        print(
+            f"{concurrency:>8} {step['requests']:>8} {step['error_rate']:>7.1%}"
+            f" {step['p50_seconds']:>8.3f} {step['p99_seconds']:>8.3f}"
+            f" {step['throughput_per_second']:>8.2f}"
+        )
+        for error in step["sample_errors"]:
+            print(f"    {error}", file=sys.stderr)
+    saturation = _saturation(steps, args.max_error_rate)
+    print(
+        f"Saturation at {saturation} sessions."
+        if saturation
+        else "No saturation point reached."
+    )
+    return {
+        "url": args.url,
+        "workload": args.workload,
+        "iterations": args.iterations,
+        "timestamp": time.time(),
+        "steps": steps,
+        "saturation_concurrency": saturation,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="Backend URL; implies no server.")
+    parser.add_argument("--start-server", action="store_true")
+    parser.add_argument(
+        "--disable-cache",
+        action="store_true",
+        help="Start the server with the result cache off, so every run does work.",
+    )
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--steps", default="1,2,4,8,16,32")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--workload", default=DEFAULT_WORKLOAD)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_DIR)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    server = None
+    if args.url is None:
+        args.url = f"http://localhost:{args.port}"
+        if args.start_server:
+            server = _start_server(args.port, args.disable_cache)
+    try:
+        report = asyncio.run(main_async(args))
+    finally:
+        if server is not None:
+            _stop_server(server)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
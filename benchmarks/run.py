@@ -0,0 +1,215 @@
+"""Benchmarks every tool operation against the synthetic corpus.
+
+Each case runs in a fresh subprocess so its peak RSS is measured in isolation.
+Results are written as JSON and can be compared against an earlier run:
+
+    python -m benchmarks.run [--repeat 3] [--only split,merge]
+    python -m benchmarks.run --compare benchmarks/results/<earlier>.json
+    python -m benchmarks.run --backend pymupdf
+"""
+
+from pathlib import Path
+from typing import TypedDict
+from .corpus import CORPUS_VERSION, DEFAULT_DIR, generate
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class Case(TypedDict):
+    """A single benchmarked operation call."""
+
+    name: str
+    operation: str
+    inputs: list[str]
+    params: dict
+
+
+CASES: list[Case] = [
+    {"name": "split_text_100", "operation": "split", "inputs": ["text_100.pdf"], "params": {"ranges": "1-50,51-100"}},
+    {"name": "split_text_5000", "operation": "split", "inputs": ["text_5000.pdf"], "params": {"ranges": "1-2500,2501-5000"}},
+    {"name": "merge_small_200", "operation": "merge", "inputs": ["small/*.pdf"], "params": {}},
+    {"name": "merge_text_scan", "operation": "merge", "inputs": ["text_100.pdf", "scan_20.pdf"], "params": {}},
+    {"name": "compress_text_100", "operation": "compress", "inputs": ["text_100.pdf"], "params": {}},
+    {"name": "compress_text_5000", "operation": "compress", "inputs": ["text_5000.pdf"], "params": {}},
+    {"name": "compress_scan_20", "operation": "compress", "inputs": ["scan_20.pdf"], "params": {}},
+    {"name": "pdf_to_images_text_1", "operation": "pdf_to_images", "inputs": ["text_1.pdf"], "params": {"dpi": 600}},
+    {"name": "pdf_to_images_text_100", "operation": "pdf_to_images", "inputs": ["text_100.pdf"], "params": {"dpi": 150}},
+    {"name": "pdf_to_images_scan_20", "operation": "pdf_to_images", "inputs": ["scan_20.pdf"], "params": {"dpi": 150}},
+    {"name": "pdf_to_images_large_format_10", "operation": "pdf_to_images", "inputs": ["large_format_10.pdf"], "params": {"dpi": 72}},
+    {"name": "extract_pages_5000", "operation": "extract", "inputs": ["text_5000.pdf"], "params": {"pages": "1-10,2500-2600"}},
+    {"name": "extract_scan_20", "operation": "extract", "inputs": ["scan_20.pdf"], "params": {"pages": "1,5-10"}},
+    {"name": "rotate_text_100", "operation": "rotate", "inputs": ["text_100.pdf"], "params": {"angle": 90}},
+    {"name": "rotate_text_5000", "operation": "rotate", "inputs": ["text_5000.pdf"], "params": {"angle": 90}},
+    {"name": "rotate_large_format_10", "operation": "rotate", "inputs": ["large_format_10.pdf"], "params": {"angle": 180}},
+    {"name": "extract_text_ndjson_5000", "operation": "extract_text", "inputs": ["text_5000.pdf"], "params": {"layout": True}},
+]  # fmt: skip
+
+
+def _resolve_inputs(corpus_dir: Path, patterns: list[str]) -> list[Path]:
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(corpus_dir.glob(pattern)))
+    return paths
+
+
+def _measure(case: Case, corpus_dir: Path, backend: str, conn) -> None:
+    """Run one case in this (child) process and send back its measurements."""
+    from app.services import backends, operations
+
+    input_paths = _resolve_inputs(corpus_dir, case["inputs"])
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    with tempfile.TemporaryFile() as out:
+        start = time.perf_counter()
+        with backends.forced(backend):
+            operations.run_operation(
+                case["operation"], input_paths, out, case["params"]
+            )
+        wall = time.perf_counter() - start
+        output_bytes = out.tell()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    conn.send(
+        {
+            "wall_seconds": wall,
+            "peak_rss_bytes": peak_rss,
+            "peak_rss_delta_bytes": peak_rss - baseline_rss,
+            "input_bytes": sum(p.stat().st_size for p in input_paths),
+            "output_bytes": output_bytes,
+        }
+    )
+    conn.close()
+
+
+def run_case(case: Case, corpus_dir: Path, repeat: int, backend: str = "auto") -> dict:
+    """Run a case ``repeat`` times, each in a fresh process."""
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        parent_conn, child_conn = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_measure, args=(case, corpus_dir, backend, child_conn)
+        )
+        process.start()
+        child_conn.close()
+        try:
+            runs.append(parent_conn.recv())
+        except EOFError:
+            process.join()
+            raise RuntimeError(f"{case['name']} exited with code {process.exitcode}")
+        process.join()
+    walls = [run["wall_seconds"] for run in runs]
+    return {
+        "operation": case["operation"],
+        "params": case["params"],
+        "wall_seconds": walls,
+        "median_wall_seconds": statistics.median(walls),
+        "peak_rss_bytes": max(run["peak_rss_bytes"] for run in runs),
+        "peak_rss_delta_bytes": max(run["peak_rss_delta_bytes"] for run in runs),
+        "input_bytes": runs[0]["input_bytes"],
+        "output_bytes": runs[0]["output_bytes"],
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print a comparison table and return the names of regressed cases."""
+    regressions = []
+    print(f"{'case':<32} {'wall':>10} {'base':>10} {'change':>8} {'rss MiB':>9}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        wall = result["median_wall_seconds"]
+        rss = result["peak_rss_bytes"] / 2**20
+        if base is None:
+            print(f"{name:<32} {wall:>10.3f} {'-':>10} {'new':>8} {rss:>9.1f}")
+            continue
+        base_wall = base["median_wall_seconds"]
+        change = (wall - base_wall) / base_wall if base_wall else 0.0
+        flag = " !" if change > threshold else ""
+        print(
+            f"{name:<32} {wall:>10.3f} {base_wall:>10.3f} {change:>+8.1%} {rss:>9.1f}{flag}"
+        )
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--only", default="", help="Comma-separated operations or case names."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["auto", "pypdf", "pymupdf"],
+        default="auto",
+        help="Run every case with this PDF backend.",
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown that counts as a regression.",
+    )
+    args = parser.parse_args()
+
+    corpus_dir = generate(args.corpus)
+    selected = {name for name in args.only.split(",") if name}
+    results = {}
+    for case in CASES:
+        if selected and not selected & {case["name"], case["operation"]}:
+            continue
+        print(f"Running {case['name']}", file=sys.stderr)
+        results[case["name"]] = run_case(case, corpus_dir, args.repeat, args.backend)
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus_version": CORPUS_VERSION,
+            "repeat": args.repeat,
+            "backend": args.backend,
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / time.strftime("%Y%m%d-%H%M%S.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}", file=sys.stderr)
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else report
+    regressions = compare(report, baseline, args.threshold)
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,242 @@
+"""Command-line batch runner for the PDF-O-Matic tools.
+
+Runs any operation over files or whole directories on every core, without
+the web server:
+
+    python main.py rotate --angle 90 scans/ -o rotated/
+    python main.py compress archive/ --recursive --skip-existing --report run.json
+    python main.py merge a.pdf b.pdf c.pdf -o merged/
+    python main.py images_to_pdf photos/ --glob "*.jpg" -o album/
+    python main.py watermark contracts/ --logo logo.png --position top-right
+    python main.py extract_text library/ -r --format txt -o text/
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from app.services import backends, operations
+import argparse
+import inspect
+import json
+import os
+import sys
+import time
+
+INT_PARAMS = {"angle", "dpi"}
+FLOAT_PARAMS = {"opacity"}
+
+
+def find_inputs(
+    paths: list[Path], pattern: str, recursive: bool
+) -> list[tuple[Path, Path]]:
+    """Expand files and directories into ``(file, path relative to output)`` pairs."""
+    inputs = []
+    for path in paths:
+        if path.is_dir():
+            matches = path.rglob(pattern) if recursive else path.glob(pattern)
+            inputs.extend(
+                (match, match.relative_to(path))
+                for match in sorted(matches)
+                if match.is_file()
+            )
+        elif path.is_file():
+            inputs.append((path, Path(path.name)))
+        else:
+            print(f"Skipping {path}: not found", file=sys.stderr)
+    return inputs
+
+
+def process(
+    operation: str,
+    input_paths: list[Path],
+    output_path: Path,
+    params: dict,
+    backend: str = backends.AUTO,
+) -> dict:
+    """Run one operation, writing atomically to ``output_path``; never raises."""
+    start = time.perf_counter()
+    result = {
+        "inputs": [str(p) for p in input_paths],
+        "output": str(output_path),
+        "bytes_in": sum(p.stat().st_size for p in input_paths),
+    }
+    partial = output_path.with_name(output_path.name + ".part")
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(partial, "wb") as out, backends.forced(backend):
+            operations.run_operation(operation, input_paths, out, params)
+        os.replace(partial, output_path)
+        result.update(status="ok", bytes_out=output_path.stat().st_size)
+    # One bad file is reported in the summary instead of stopping the batch.
+    except Exception as e:  # noqa: BLE001
+        partial.unlink(missing_ok=True)
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def plan_tasks(
+    operation: str,
+    inputs: list[tuple[Path, Path]],
+    output_dir: Path,
+    params: dict,
+    stamp: Path | None = None,
+) -> list[tuple[list[Path], Path]]:
+    """Return ``(input paths, output path)`` for each run of the operation.
+
+    ``stamp`` is added to every run's inputs, for operations that take one.
+    """
+    if operation in operations.COMBINING:
+        name = operations.output_filename(operation, inputs[0][0].name, params)
+        return [([path for path, _ in inputs], output_dir / name)]
+    return [
+        (
+            [path, *([stamp] if stamp else [])],
+            output_dir
+            / relative.parent
+            / operations.output_filename(operation, path.name, params),
+        )
+        for path, relative in inputs
+    ]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="operation", required=True)
+    for operation, function in operations.OPERATIONS.items():
+        sub = subparsers.add_parser(operation, help=inspect.getdoc(function))
+        images = operation in operations.IMAGE_INPUTS
+        sub.add_argument(
+            "inputs",
+            nargs="+",
+            type=Path,
+            help=f"{'Image' if images else 'PDF'} files or directories.",
+        )
+        sub.add_argument("-o", "--output-dir", type=Path, default=Path("."))
+        sub.add_argument(
+            "--glob",
+            default="*.jpg" if images else "*.pdf",
+            help="Pattern for files inside directories.",
+        )
+        sub.add_argument("-r", "--recursive", action="store_true")
+        sub.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+        sub.add_argument(
+            "--skip-existing",
+            action="store_true",
+            help="Do not rerun files whose output already exists.",
+        )
+        sub.add_argument("--report", type=Path, help="Write a JSON summary here.")
+        if operation in operations.STAMP_INPUTS:
+            sub.add_argument(
+                "--logo", type=Path, help="Image or PDF to stamp instead of text."
+            )
+        sub.add_argument(
+            "--backend",
+            choices=[backends.AUTO, *backends.BACKENDS],
+            default=backends.AUTO,
+            help="PDF library to use instead of the automatic choice.",
+        )
+        signature = inspect.signature(function)
+        for name in operations.operation_params(operation):
+            default = signature.parameters[name].default
+            if isinstance(default, bool):
+                sub.add_argument(f"--{name}", action="store_true")
+                continue
+            sub.add_argument(
+                f"--{name}",
+                type=int
+                if name in INT_PARAMS
+                else float
+                if name in FLOAT_PARAMS
+                else str,
+                required=default is inspect.Parameter.empty,
+                default=None if default is inspect.Parameter.empty else default,
+            )
+    return parser
+
+
 def main():
-    print()
+    args = build_parser().parse_args()
+    operation = args.operation
+    params = {
+        name: getattr(args, name) for name in operations.operation_params(operation)
+    }
+    inputs = find_inputs(args.inputs, args.glob, args.recursive)
+    if not inputs:
+        print("No input PDFs found.", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        # Checked and converted as in the web UI and the API, DPI bounds included.
+        params = operations.normalize_params(operation, params)
+        tasks = plan_tasks(
+            operation, inputs, args.output_dir, params, getattr(args, "logo", None)
+        )
+    except operations.OperationError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    results = []
+    pending = []
+    for input_paths, output_path in tasks:
+        if args.skip_existing and output_path.exists():
+            results.append(
+                {
+                    "inputs": [str(p) for p in input_paths],
+                    "output": str(output_path),
+                    "status": "skipped",
+                }
+            )
+        else:
+            pending.append((input_paths, output_path))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(args.jobs, len(pending) or 1))
+    ) as executor:
+        futures = [
+            executor.submit(
+                process, operation, input_paths, output_path, params, args.backend
+            )
+            for input_paths, output_path in pending
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            if result["status"] == "failed":
+                print(
+                    f"[{done}/{len(futures)}] {result['inputs'][0]}: {result['error']}",
+                    file=sys.stderr,
+                )
+            else:
+                print(f"[{done}/{len(futures)}] {result['output']}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    counts = {status: 0 for status in ("ok", "skipped", "failed")}
+    for result in results:
+        counts[result["status"]] += 1
+    print(
+        f"{counts['ok']} ok, {counts['skipped']} skipped, {counts['failed']} failed in {elapsed:.1f}s",
+        file=sys.stderr,
+    )
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(
+            json.dumps(
+                {
+                    "operation": operation,
+                    "params": params,
+                    "started_at": time.time() - elapsed,
+                    "elapsed_seconds": round(elapsed, 3),
+                    "jobs": args.jobs,
+                    "counts": counts,
+                    "bytes_in": sum(r.get("bytes_in", 0) for r in results),
+                    "bytes_out": sum(r.get("bytes_out", 0) for r in results),
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+    if counts["failed"]:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
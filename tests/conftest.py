@@ -0,0 +1,31 @@
+"""Shared fixtures. Settings are read on import, so the environment is set
+before anything from ``app`` is imported."""
+
+from pathlib import Path
+import os
+import pytest
+import tempfile
+
+DATA_DIR = Path(tempfile.mkdtemp(prefix="pdf_o_matic_tests_"))
+os.environ["PDF_O_MATIC_DATA_DIR"] = str(DATA_DIR)
+os.environ["PDF_O_MATIC_WORKERS"] = "0"
+os.environ["PDF_O_MATIC_STORAGE_SECRET"] = "test-secret"
+
+
+def make_pdf(path: Path, pages: int, text: str = "Page") -> Path:
+    """Write a PDF of ``pages`` letter pages, each reading ``{text} {n}``."""
+    import pymupdf
+
+    doc = pymupdf.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((72, 72), f"{text} {number}", fontsize=12)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+@pytest.fixture
+def pdf(tmp_path: Path) -> Path:
+    """A three-page PDF."""
+    return make_pdf(tmp_path / "doc.pdf", 3)
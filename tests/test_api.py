@@ -0,0 +1,136 @@
+"""The HTTP API: running tools, validating their parameters and serving results."""
+
+from app.api import api
+from app.services import batch, operations, thumbnails
+from starlette.testclient import TestClient
+from urllib.parse import quote
+import io
+import json
+import pytest
+import zipfile
+
+
+@pytest.fixture
+def client():
+    return TestClient(api)
+
+
+def _run(client, tool, pdf, **params):
+    with open(pdf, "rb") as f:
+        return client.post(
+            f"/api/v1/{tool}", files={"files": ("doc.pdf", f.read())}, data=params
+        )
+
+
+def test_tools_list_their_required_params(client):
+    tools = client.get("/api/v1").json()["tools"]
+    assert tools["split"]["required"] == ["ranges"]
+    assert tools["rotate"]["required"] == []
+    assert "dpi" in tools["pdf_to_images"]["params"]
+
+
+def test_runs_a_tool(client, pdf):
+    response = _run(client, "split", pdf, ranges="1,2-3")
+    assert response.status_code == 200
+    assert response.headers["x-job-id"]
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert len(archive.namelist()) == 2
+    status = client.get(f"/jobs/{response.headers['x-job-id']}").json()
+    assert status["status"] == "done"
+
+
+@pytest.mark.parametrize(
+    "tool, missing", [("split", "ranges"), ("extract", "pages"), ("pipeline", "steps")]
+)
+def test_missing_required_params_are_rejected(client, pdf, tool, missing):
+    response = _run(client, tool, pdf)
+    assert response.status_code == 400
+    assert response.json()["error"] == f"Missing required parameters: {missing}"
+
+
+@pytest.mark.parametrize(
+    "tool, params",
+    [
+        ("pdf_to_images", {"dpi": "35"}),
+        ("pdf_to_images", {"dpi": "601"}),
+        ("pdf_to_images", {"dpi": "high"}),
+        ("pipeline", {"steps": "pdf_to_images:10000"}),
+        ("rotate", {"angle": "45"}),
+        ("split", {"ranges": "1-9"}),
+        ("rotate", {"color": "red"}),
+    ],
+)
+def test_invalid_params_are_rejected(client, pdf, tool, params):
+    response = _run(client, tool, pdf, **params)
+    assert response.status_code == 400
+    assert response.json()["error"]
+
+
+def test_unknown_tools_are_not_found(client, pdf):
+    assert _run(client, "shred", pdf).status_code == 404
+
+
+def test_files_are_required(client):
+    response = client.post("/api/v1/rotate", data={"angle": "90"})
+    assert response.status_code == 400
+
+
+def test_pages_with_any_name_can_be_downloaded(client, pdf):
+    name = "Año #1 50% 文.pdf"
+    with open(pdf, "rb") as f:
+        response = client.post(
+            "/api/v1/pdf-to-images",
+            files={"files": (name, f.read())},
+            data={"dpi": "36"},
+        )
+    assert response.status_code == 200
+    page = operations.page_image_name(name, 2)
+    response = client.get(f"/jobs/{response.headers['x-job-id']}/pages/{quote(page)}")
+    assert response.status_code == 200
+    assert response.content.startswith(b"\x89PNG")
+    assert response.headers["content-disposition"].endswith(quote(page))
+
+
+def test_results_download_through_a_signed_link(client, pdf):
+    job_id = _run(client, "rotate", pdf, angle="90").headers["x-job-id"]
+    response = client.get(f"/jobs/{job_id}/download", follow_redirects=False)
+    assert response.status_code == 302
+    link = response.headers["location"]
+    assert "token=" in link
+    response = client.get(link)
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert client.get(link.replace("token=", "token=0")).status_code == 404
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.get("/jobs/missing/download").status_code == 404
+
+
+def test_batches_download_as_one_archive(client, tmp_path, pdf):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    found = batch.run_batch("rotate", [pdf, broken], {"angle": 90})
+    response = client.get(f"/batches/{found['id']}/download")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('"rotate_batch.zip"')
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        status = json.loads(archive.read("status.json"))
+        assert [item["status"] for item in status["files"]] == ["done", "failed"]
+        assert archive.read(status["files"][0]["result"]).startswith(b"%PDF")
+    assert client.get("/batches/missing/download").status_code == 404
+
+
+def test_metrics_count_tool_runs(client, pdf):
+    _run(client, "rotate", pdf, angle="90")
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'pdf_o_matic_jobs_total{tool="rotate",status="ok"}' in response.text
+
+
+def test_thumbnails_are_served_as_immutable_jpegs(client, pdf):
+    doc_hash, _ = thumbnails.cache.register(pdf)
+    response = client.get(f"/thumbnails/{doc_hash}/3.jpg")
+    assert response.status_code == 200
+    assert response.content.startswith(b"\xff\xd8")
+    assert "immutable" in response.headers["cache-control"]
+    assert client.get(f"/thumbnails/{doc_hash}/4.jpg").status_code == 404
+    assert client.get("/thumbnails/not-a-hash/1.jpg").status_code == 404
@@ -0,0 +1,17 @@
+"""Which PDF backend runs each operation."""
+
+from app.services import backends
+import pytest
+
+
+def test_pymupdf_is_the_default():
+    assert {backends.select(op) for op in backends.OPERATIONS} == {backends.PYMUPDF}
+
+
+def test_the_backend_can_be_forced():
+    with backends.forced(backends.PYPDF):
+        assert backends.select("merge") == backends.PYPDF
+        assert backends.select("pdf_to_images") == backends.PYMUPDF
+    assert backends.select("merge") == backends.PYMUPDF
+    with pytest.raises(ValueError), backends.forced("ghostscript"):
+        pass
@@ -0,0 +1,23 @@
+"""The batch command line."""
+
+import main
+import pytest
+
+
+def _run(monkeypatch, *argv):
+    monkeypatch.setattr("sys.argv", ["main.py", *map(str, argv)])
+    main.main()
+
+
+def test_out_of_range_dpi_is_rejected(monkeypatch, capsys, pdf, tmp_path):
+    with pytest.raises(SystemExit) as exit_info:
+        _run(monkeypatch, "pdf_to_images", pdf, "-o", tmp_path, "--dpi", 100000)
+    assert exit_info.value.code == 2
+    assert "DPI" in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == [pdf]
+
+
+def test_runs_a_tool_over_the_inputs(monkeypatch, pdf, tmp_path):
+    out = tmp_path / "out"
+    _run(monkeypatch, "rotate", pdf, "-o", out, "--angle", 90, "-j", 1)
+    assert (out / "doc_rotated.pdf").read_bytes().startswith(b"%PDF")
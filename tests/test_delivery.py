@@ -0,0 +1,69 @@
+"""How the tool states hand a finished job's result to the browser."""
+
+from app.states.base_state import PDFToolState
+from reflex.vars.base import Var
+import asyncio
+
+
+class _Session(PDFToolState):
+    job_id = ""
+    download_url = ""
+    error_message = ""
+    is_processing = True
+    processed = False
+    batch_files: list[str] = []
+    batch_results: list[dict[str, str]] = []
+
+
+def _job(tmp_path):
+    result = tmp_path / "doc_text.ndjson"
+    result.write_bytes(b'{"page": 1, "text": "Page 1"}\n')
+    return {
+        "id": "abc123",
+        "operation": "extract_text",
+        "result_path": str(result),
+        "result_name": "doc_text.ndjson",
+    }
+
+
+def test_streamed_delivery_links_to_the_api(tmp_path):
+    session = _Session()
+    event = session._deliver(_job(tmp_path), stream=True)
+    assert session.job_id == "abc123"
+    assert session.download_url.endswith("/jobs/abc123/download")
+    url = event.args[0][1]
+    assert isinstance(url, Var)
+    assert "/jobs/abc123/download" in str(url)
+    assert "base64" not in str(event.args)
+
+
+def test_inline_delivery_sends_the_result(tmp_path):
+    session = _Session()
+    event = session._deliver(_job(tmp_path), stream=False)
+    assert str(event.args[0][1]).startswith('"data:application/octet-stream;base64,')
+
+
+def test_batches_are_run_then_applied_to_the_session(tmp_path, pdf):
+    session = _Session()
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    result, error = asyncio.run(
+        session._execute_batch("rotate", [pdf, broken], {"angle": 90}, [])
+    )
+    assert error == ""
+    # Running the batch leaves the session alone until it is applied.
+    assert session.is_processing
+    assert session.batch_results == []
+    event = session._finish_batch("rotate", result, error)
+    assert not session.is_processing
+    assert [item["status"] for item in session.batch_results] == ["done", "failed"]
+    assert session.download_url.endswith(f"/batches/{result['id']}/download")
+    assert "/batches/" in str(event.args[0][1])
+
+
+def test_batch_errors_are_shown(tmp_path):
+    session = _Session()
+    event = session._finish_batch("rotate", None, "The disk is full.")
+    assert event is None
+    assert session.error_message == "The disk is full."
+    assert not session.is_processing
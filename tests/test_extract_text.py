@@ -0,0 +1,82 @@
+"""The Extract Text tool and how long documents are split across workers."""
+
+from app.services import documents, jobs, operations, worker_pool
+from conftest import make_pdf
+import io
+import json
+import pytest
+
+
+def _extract(path, **params) -> bytes:
+    out = io.BytesIO()
+    operations.run_operation("extract_text", [path], out, params)
+    return out.getvalue()
+
+
+def test_ndjson_has_one_line_per_page(pdf):
+    lines = _extract(pdf).decode().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record["page"] for record in records] == [1, 2, 3]
+    assert records[1]["text"].strip() == "Page 2"
+    assert "blocks" not in records[0]
+
+
+def test_txt_ends_each_page_with_a_form_feed(pdf):
+    text = _extract(pdf, format="txt", pages="2-3").decode()
+    assert text.split("\f") == ["Page 2\n", "Page 3\n", ""]
+
+
+def test_layout_lists_blocks_with_their_boxes(pdf):
+    record = json.loads(_extract(pdf, layout=True, pages="1"))
+    assert record["page"] == 1
+    [block] = record["blocks"]
+    assert block["text"].strip() == "Page 1"
+    x0, y0, x1, y1 = block["bbox"]
+    assert x0 < x1 and y0 < y1
+
+
+def test_parts_join_into_the_whole(tmp_path):
+    path = make_pdf(tmp_path / "long.pdf", 10)
+    whole = _extract(path, layout=True)
+    assert (
+        _extract(path, layout=True, pages="1-4")
+        + _extract(path, layout=True, pages="5-10")
+        == whole
+    )
+
+
+@pytest.mark.parametrize(
+    "params", [{"format": "xml"}, {"pages": "0-2"}, {"pages": "4"}]
+)
+def test_invalid_parameters_are_rejected(pdf, params):
+    with pytest.raises(operations.OperationError):
+        _extract(pdf, **params)
+
+
+def test_output_is_named_after_the_format():
+    assert operations.output_filename("extract_text", "a.pdf", {}) == "a_text.ndjson"
+    assert (
+        operations.output_filename("extract_text", "a.pdf", {"format": "txt"})
+        == "a_text.txt"
+    )
+
+
+def test_long_documents_are_split_by_pages(tmp_path, monkeypatch):
+    path = make_pdf(tmp_path / "long.pdf", 2 * jobs.PARALLEL_MIN_PAGES + 1)
+    monkeypatch.setattr(worker_pool.pool, "size", 4)
+    calls = []
+
+    def call(function, *args):
+        calls.append(function)
+        return function(*args)
+
+    monkeypatch.setattr(worker_pool.pool, "call", call)
+    job = {"operation": "extract_text", "input_paths": [str(path)], "params": {}}
+    parts = jobs._page_parts(job)
+    assert parts == ["1-201", "202-401"]
+    # The pages are counted on a worker, not on the server's thread.
+    assert calls == [documents.page_count]
+    job["params"] = {"pages": "1-10"}
+    assert jobs._page_parts(job) == []
+    job["operation"] = "compress"
+    assert jobs._page_parts(job) == []
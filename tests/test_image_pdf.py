@@ -0,0 +1,94 @@
+"""The Images to PDF tool and its streaming writer."""
+
+from app.services import image_pdf, operations
+import io
+import PIL.Image
+import pymupdf
+import pytest
+
+
+def _convert(paths) -> pymupdf.Document:
+    out = io.BytesIO()
+    operations.run_operation("images_to_pdf", paths, out, {})
+    doc = pymupdf.open(stream=out.getvalue())
+    assert not doc.is_repaired
+    return doc
+
+
+def _image_xref(page: pymupdf.Page) -> int:
+    [(xref, *_)] = page.get_images()
+    return xref
+
+
+def test_jpeg_is_embedded_byte_for_byte(tmp_path):
+    path = tmp_path / "photo.jpg"
+    PIL.Image.new("RGB", (144, 72), "teal").save(path, dpi=(72, 72))
+    doc = _convert([path])
+    xref = _image_xref(doc[0])
+    assert doc.xref_get_key(xref, "Filter") == ("name", "/DCTDecode")
+    assert doc.xref_stream_raw(xref) == path.read_bytes()
+    assert doc[0].rect == pymupdf.Rect(0, 0, 144, 72)
+
+
+def test_page_size_follows_the_resolution(tmp_path):
+    path = tmp_path / "scan.png"
+    PIL.Image.new("RGB", (300, 150), "white").save(path, dpi=(300, 300))
+    unmarked = tmp_path / "unmarked.png"
+    PIL.Image.new("RGB", (96, 192), "white").save(unmarked)
+    doc = _convert([path, unmarked])
+    # PNG keeps the resolution in pixels per metre, so it comes back rounded.
+    assert tuple(doc[0].rect) == pytest.approx((0, 0, 72, 36), abs=0.01)
+    # Without a resolution, DEFAULT_DPI is assumed.
+    assert doc[1].rect == pymupdf.Rect(0, 0, 72, 144)
+
+
+def test_exif_rotation_becomes_the_page_rotation(tmp_path):
+    path = tmp_path / "portrait.jpg"
+    exif = PIL.Image.Exif()
+    exif[0x0112] = 6
+    PIL.Image.new("RGB", (80, 40), "navy").save(path, exif=exif)
+    doc = _convert([path])
+    assert doc[0].rotation == 90
+    assert doc.xref_stream_raw(_image_xref(doc[0])) == path.read_bytes()
+
+
+def test_transparent_images_keep_their_alpha(tmp_path):
+    path = tmp_path / "logo.png"
+    PIL.Image.new("RGBA", (20, 10), (255, 0, 0, 64)).save(path)
+    doc = _convert([path])
+    [image] = doc[0].get_images()
+    smask = image[1]
+    assert smask
+    pixmap = pymupdf.Pixmap(doc, smask)
+    assert set(pixmap.samples) == {64}
+
+
+def test_every_frame_becomes_a_page(tmp_path):
+    path = tmp_path / "frames.tif"
+    frames = [PIL.Image.new("L", (10, 10), shade) for shade in (0, 128, 255)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    single = tmp_path / "single.png"
+    PIL.Image.new("RGB", (10, 10)).save(single)
+    assert len(_convert([path, single])) == 4
+
+
+def test_unreadable_files_are_rejected(tmp_path):
+    path = tmp_path / "notes.png"
+    path.write_bytes(b"not an image")
+    with pytest.raises(operations.OperationError, match="notes.png"):
+        _convert([path])
+    with pytest.raises(operations.OperationError):
+        _convert([])
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (b"\xff\xd8\xff\xe0", True),
+        (b"\x89PNG\r\n\x1a\n", True),
+        (b"RIFF\x00\x00\x00\x00WEBPVP8 ", True),
+        (b"%PDF-1.7", False),
+    ],
+)
+def test_images_are_recognized_by_their_header(header, expected):
+    assert image_pdf.is_image(header) is expected
@@ -0,0 +1,121 @@
+"""The job store, and recovering jobs whose process died."""
+
+from app import settings
+from app.services import job_store, jobs
+from app.services.job_store import DONE, FAILED, PENDING, RUNNING, JobStore
+import shutil
+import sqlite3
+import time
+
+
+def _store(tmp_path) -> JobStore:
+    return JobStore(tmp_path / "jobs.sqlite3", tmp_path / "results")
+
+
+def _create(store, path):
+    return store.create("rotate", [path], {"angle": 90}, "hash", "doc_rotated.pdf")
+
+
+def test_jobs_go_through_their_states(tmp_path, pdf):
+    store = _store(tmp_path)
+    job = _create(store, pdf)
+    assert job["status"] == PENDING
+    assert job["params"] == {"angle": 90}
+    assert job["input_paths"] == [str(pdf)]
+    assert job["owner"] == store.owner
+    store.mark_running(job["id"])
+    assert store.get(job["id"])["attempts"] == 1
+    store.mark_done(job["id"], store.result_path(job))
+    job = store.get(job["id"])
+    assert job["status"] == DONE
+    assert job["result_path"].endswith(f"{job['id']}/doc_rotated.pdf")
+    assert store.get("missing") is None
+
+
+def test_expired_jobs_are_purged(tmp_path, pdf):
+    store = _store(tmp_path)
+    job = _create(store, pdf)
+    store.mark_failed(job["id"], "boom")
+    assert store.get(job["id"])["status"] == FAILED
+    assert store.purge_expired(ttl_seconds=60) == 0
+    assert store.purge_expired(ttl_seconds=-1) == 1
+    assert store.get(job["id"]) is None
+
+
+def test_only_jobs_of_dead_owners_are_claimed(tmp_path, pdf, monkeypatch):
+    alive = _store(tmp_path)
+    dead = _store(tmp_path)
+    recovering = _store(tmp_path)
+    running = _create(alive, pdf)
+    alive.mark_running(running["id"])
+    orphan = _create(dead, pdf)
+    # Another host's process that stopped beating.
+    with sqlite3.connect(tmp_path / "jobs.sqlite3") as conn:
+        conn.execute(
+            "UPDATE owners SET host = 'elsewhere', heartbeat_at = ? WHERE id = ?",
+            (time.time() - 600, dead.owner),
+        )
+    [claimed] = recovering.claim_orphaned(timeout=60)
+    assert claimed["id"] == orphan["id"]
+    assert claimed["owner"] == recovering.owner
+    assert recovering.claim_orphaned(timeout=60) == []
+    assert _store(tmp_path).claim_orphaned(timeout=60) == []
+
+
+def test_jobs_of_exited_processes_on_this_host_are_claimed(tmp_path, pdf, monkeypatch):
+    gone = _store(tmp_path)
+    job = _create(gone, pdf)
+    monkeypatch.setattr(job_store, "_process_exists", lambda pid: False)
+    assert [j["id"] for j in _store(tmp_path).claim_orphaned(timeout=60)] == [job["id"]]
+
+
+def test_databases_without_owners_are_migrated(tmp_path, pdf):
+    with sqlite3.connect(tmp_path / "jobs.sqlite3") as conn:
+        conn.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, operation TEXT NOT NULL,"
+            " params TEXT NOT NULL, input_hash TEXT NOT NULL,"
+            " input_paths TEXT NOT NULL, result_name TEXT NOT NULL,"
+            " result_path TEXT, status TEXT NOT NULL, error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL,"
+            " started_at REAL, finished_at REAL)"
+        )
+        conn.execute(
+            "INSERT INTO jobs (id, operation, params, input_hash, input_paths,"
+            " result_name, status, created_at)"
+            " VALUES ('old', 'rotate', '{}', 'h', '[]', 'r.pdf', ?, 0)",
+            (RUNNING,),
+        )
+    store = _store(tmp_path)
+    assert store.get("old")["owner"] is None
+    assert [job["id"] for job in store.claim_orphaned(timeout=60)] == ["old"]
+
+
+def test_recovery_resumes_orphaned_jobs(tmp_path, pdf, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(jobs, "store", store)
+    monkeypatch.setattr(job_store, "_process_exists", lambda pid: False)
+    live = jobs.create_job("rotate", [pdf], {"angle": 90})
+    orphan = _store(tmp_path).create(
+        "rotate", [pdf], {"angle": 180}, "hash", "doc_rotated.pdf"
+    )
+    jobs.recover_jobs()
+    assert store.get(orphan["id"])["status"] == DONE
+    assert store.get(live["id"])["status"] == PENDING
+
+
+def test_recovery_only_removes_the_jobs_own_uploads(tmp_path, pdf, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(jobs, "store", store)
+    monkeypatch.setattr(job_store, "_process_exists", lambda pid: False)
+    request_dir = settings.UPLOADS_DIR / "request"
+    uploaded = request_dir / "0" / "doc.pdf"
+    uploaded.parent.mkdir(parents=True)
+    shutil.copyfile(pdf, uploaded)
+    orphaned = _store(tmp_path)
+    # ``pdf`` stands for a session's file, such as one of a merge's inputs.
+    orphaned.create("rotate", [pdf], {"angle": 90}, "hash", "doc_rotated.pdf")
+    orphaned.create("rotate", [uploaded], {"angle": 90}, "hash", "doc_rotated.pdf")
+    jobs.recover_jobs()
+    assert pdf.exists()
+    assert not request_dir.exists()
+    assert settings.UPLOADS_DIR.exists()
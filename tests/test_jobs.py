@@ -0,0 +1,33 @@
+"""Running jobs in the server process, when there are no workers."""
+
+from app.services import jobs, operations, worker_pool
+from concurrent.futures import ThreadPoolExecutor
+from conftest import make_pdf
+import threading
+import time
+
+
+def test_inline_jobs_run_one_at_a_time(tmp_path, monkeypatch):
+    assert not worker_pool.pool.running
+    running = []
+    overlapped = threading.Event()
+    run_operation = operations.run_operation
+
+    def tracked(*args):
+        running.append(1)
+        if len(running) > 1:
+            overlapped.set()
+        time.sleep(0.05)
+        running.pop()
+        return run_operation(*args)
+
+    monkeypatch.setattr(operations, "run_operation", tracked)
+    paths = [make_pdf(tmp_path / f"{i}.pdf", 1, f"Doc {i}") for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        done = list(
+            executor.map(
+                lambda path: jobs.run_job("rotate", [path], {"angle": 90}), paths
+            )
+        )
+    assert [job["status"] for job in done] == ["done"] * 4
+    assert not overlapped.is_set()
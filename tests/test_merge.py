@@ -0,0 +1,61 @@
+"""Merging, the cache of merged parts and the cleanup of session uploads."""
+
+from app.services import jobs, operations, pymupdf_backend
+from conftest import make_pdf
+import io
+import os
+import pymupdf
+import time
+
+
+def _merge(paths, pages="") -> pymupdf.Document:
+    out = io.BytesIO()
+    operations.run_operation("merge", paths, out, {"pages": pages})
+    return pymupdf.open(stream=out.getvalue())
+
+
+def test_merges_selected_pages_in_order(tmp_path):
+    a = make_pdf(tmp_path / "a.pdf", 3, "A")
+    b = make_pdf(tmp_path / "b.pdf", 2, "B")
+    merged = _merge([b, a], "2;1,3")
+    assert [page.get_text().strip() for page in merged] == ["B 2", "A 1", "A 3"]
+
+
+def test_parts_are_reused_and_evicted_ones_closed(tmp_path):
+    a = make_pdf(tmp_path / "a.pdf", 3, "A")
+    b = make_pdf(tmp_path / "b.pdf", 3, "B")
+    cache = pymupdf_backend.PartCache(a.stat().st_size + b.stat().st_size - 1)
+    with cache.session():
+        part_a, cached = cache.get(a, "")
+        assert not cached
+        assert cache.get(a, "") == (part_a, True)
+        part_b, _ = cache.get(b, "1")
+        # Still open until the session ends: the merge may be using it.
+        assert not part_a.is_closed
+    assert part_a.is_closed
+    assert not part_b.is_closed
+    cache.clear()
+    assert part_b.is_closed
+
+
+def test_parts_too_large_to_keep_are_closed(tmp_path):
+    a = make_pdf(tmp_path / "a.pdf", 3, "A")
+    cache = pymupdf_backend.PartCache(1)
+    with cache.session():
+        part, cached = cache.get(a, "")
+        assert not cached
+    assert part.is_closed
+
+
+def test_idle_session_uploads_are_purged(tmp_path):
+    idle = tmp_path / "idle"
+    active = tmp_path / "active"
+    for directory in (idle, active):
+        directory.mkdir()
+        (directory / "a.pdf").write_bytes(b"%PDF-")
+    old = time.time() - 2 * 60 * 60
+    os.utime(idle, (old, old))
+    assert jobs.purge_session_uploads(tmp_path, 60 * 60) == 1
+    assert not idle.exists()
+    assert (active / "a.pdf").exists()
+    assert jobs.purge_session_uploads(tmp_path / "missing") == 0
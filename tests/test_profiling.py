@@ -0,0 +1,59 @@
+"""The admin endpoint that chooses which jobs are profiled."""
+
+from app import settings
+from app.api import api
+from app.services import profiling
+from starlette.testclient import TestClient
+import pytest
+
+AUTH = {"authorization": "Bearer admin"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin")
+    monkeypatch.setattr(profiling, "sample_rate", 0.0)
+    monkeypatch.setattr(profiling, "flagged_tools", set())
+    monkeypatch.setattr(profiling, "flagged_jobs", set())
+    return TestClient(api)
+
+
+def test_requires_the_admin_token(client, monkeypatch):
+    assert client.get("/admin/profiling").status_code == 403
+    headers = {"authorization": "Bearer wrong"}
+    assert client.get("/admin/profiling", headers=headers).status_code == 403
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    headers = {"authorization": "Bearer "}
+    assert client.get("/admin/profiling", headers=headers).status_code == 403
+
+
+def test_flags_and_unflags_jobs(client):
+    body = {"sample_rate": 2, "tools": ["rotate"], "jobs": ["a", "b"]}
+    response = client.put("/admin/profiling", headers=AUTH, json=body)
+    assert response.json() == {
+        "sample_rate": 1.0,
+        "tools": ["rotate"],
+        "jobs": ["a", "b"],
+    }
+    response = client.put("/admin/profiling", headers=AUTH, json={"unflag_jobs": ["a"]})
+    assert response.json()["jobs"] == ["b"]
+    assert response.json()["tools"] == ["rotate"]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"{not json",
+        b"[]",
+        b'{"sample_rate": "abc"}',
+        b'{"sample_rate": true}',
+        b'{"tools": "rotate"}',
+        b'{"jobs": [1]}',
+        b'{"unflag_jobs": "a"}',
+    ],
+)
+def test_invalid_bodies_are_rejected(client, body):
+    response = client.put("/admin/profiling", headers=AUTH, content=body)
+    assert response.status_code == 400
+    assert response.json()["error"]
+    assert profiling.configure() == {"sample_rate": 0.0, "tools": [], "jobs": []}
@@ -0,0 +1,51 @@
+"""The result cache and what its keys are made of."""
+
+from app.services import backends, jobs
+from app.services.result_cache import ResultCache
+import pytest
+
+
+def test_keys_depend_on_every_part():
+    key = ResultCache.key("hash", "rotate", {"angle": 90, "linearize": False})
+    assert key == ResultCache.key("hash", "rotate", {"linearize": False, "angle": 90})
+    assert key != ResultCache.key("other", "rotate", {"angle": 90, "linearize": False})
+    assert key != ResultCache.key("hash", "rotate", {"angle": 180, "linearize": False})
+    assert key != ResultCache.key("hash", "compress", {"angle": 90, "linearize": False})
+    assert ResultCache.key("hash", "rotate", {}, "pypdf") != ResultCache.key(
+        "hash", "rotate", {}, "pymupdf"
+    )
+
+
+def test_results_round_trip_and_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=10)
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.write_bytes(b"123456")
+    second.write_bytes(b"abcdef")
+    cache.put("aa", first)
+    assert cache.fetch("aa", tmp_path / "out")
+    assert (tmp_path / "out").read_bytes() == b"123456"
+    cache.put("bb", second)
+    assert not cache.fetch("aa", tmp_path / "out")
+    assert cache.fetch("bb", tmp_path / "out")
+    assert cache.stats() | {"hits": 0, "misses": 0} == {
+        "hits": 0,
+        "misses": 0,
+        "entries": 1,
+        "bytes": 6,
+        "max_bytes": 10,
+    }
+
+
+@pytest.mark.parametrize("name", backends.BACKENDS)
+def test_results_are_cached_per_backend(tmp_path, pdf, monkeypatch, name):
+    monkeypatch.setattr(jobs, "cache", ResultCache(tmp_path / "cache", 1024**2))
+    with backends.forced(name):
+        jobs.run_job("rotate", [pdf], {"angle": 90})
+    with backends.forced(name):
+        jobs.run_job("rotate", [pdf], {"angle": 90})
+    assert jobs.cache.hits == 1
+    other = next(b for b in backends.BACKENDS if b != name)
+    with backends.forced(other):
+        jobs.run_job("rotate", [pdf], {"angle": 90})
+    assert jobs.cache.hits == 1
+    assert jobs.cache.stats()["entries"] == 2
@@ -0,0 +1,58 @@
+"""Local storage: objects, listing and signed download links."""
+
+from app.services import storage
+from urllib.parse import parse_qs, urlsplit
+import io
+import time
+
+
+def _store(tmp_path, secret="secret", url_ttl=60):
+    return storage.LocalStorage(tmp_path, secret, url_ttl)
+
+
+def _link(store, key, filename):
+    url = urlsplit(store.download_url(key, filename))
+    query = {name: values[0] for name, values in parse_qs(url.query).items()}
+    return url.path, query["filename"], int(query["expires"]), query["token"]
+
+
+def test_objects_round_trip(tmp_path):
+    store = _store(tmp_path)
+    store.write("results/a/out.pdf", b"data")
+    store.save("results/a/other.pdf", io.BytesIO(b"more"))
+    with store.open("results/a/out.pdf") as f:
+        assert f.read() == b"data"
+    assert store.size("results/a/other.pdf") == 4
+    assert sorted(item["key"] for item in store.list("results")) == [
+        "results/a/other.pdf",
+        "results/a/out.pdf",
+    ]
+    store.delete("results/a/")
+    assert not store.exists("results/a/out.pdf")
+
+
+def test_links_are_signed(tmp_path):
+    store = _store(tmp_path)
+    path, filename, expires, token = _link(store, "results/a/out.pdf", "out.pdf")
+    assert path == "/files/results/a/out.pdf"
+    assert store.verify("results/a/out.pdf", filename, expires, token)
+    assert not store.verify("results/b/out.pdf", filename, expires, token)
+    assert not store.verify("results/a/out.pdf", "other.pdf", expires, token)
+    assert not store.verify("results/a/out.pdf", filename, expires + 1, token)
+    assert not _store(tmp_path, "other").verify(
+        "results/a/out.pdf", filename, expires, token
+    )
+
+
+def test_links_expire(tmp_path):
+    store = _store(tmp_path, url_ttl=-1)
+    _, filename, expires, token = _link(store, "results/a/out.pdf", "out.pdf")
+    assert expires < time.time()
+    assert not store.verify("results/a/out.pdf", filename, expires, token)
+
+
+def test_generated_secret_is_shared_through_the_root(tmp_path):
+    secret = storage._stored_secret(tmp_path)
+    assert len(secret) == 64
+    assert storage._stored_secret(tmp_path) == secret
+    assert storage._stored_secret(tmp_path / "other") != secret
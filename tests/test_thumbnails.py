@@ -0,0 +1,52 @@
+"""Page previews, rendered on the worker pool or serialized without one."""
+
+from app.services import thumbnails, worker_pool
+from conftest import make_pdf
+import pytest
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return thumbnails.ThumbnailCache(tmp_path / "thumbnails", 36, 0)
+
+
+def test_pages_are_rendered_on_request(cache, pdf):
+    doc_hash, pages = cache.register(pdf)
+    assert pages == 3
+    path = cache.get(doc_hash, 2)
+    assert path.read_bytes().startswith(b"\xff\xd8")
+    assert cache.get(doc_hash, 4) is None
+    assert cache.get("0" * 64, 1) is None
+    with pytest.raises(ValueError):
+        cache.get("../x", 1)
+
+
+def test_rendering_goes_through_the_pool_when_it_runs(cache, pdf, monkeypatch):
+    calls = []
+
+    def call(function, *args):
+        calls.append(function)
+        return function(*args)
+
+    monkeypatch.setattr(worker_pool.WorkerPool, "running", True)
+    monkeypatch.setattr(worker_pool.pool, "call", call)
+    monkeypatch.setattr(cache, "_prefetch", lambda doc_hash, pages: None)
+    doc_hash, _ = cache.register(pdf)
+    cache.get(doc_hash, 1)
+    assert calls == [thumbnails._page_count, thumbnails._render_pages]
+
+
+def test_only_the_first_pages_are_prefetched(tmp_path, monkeypatch):
+    cache = thumbnails.ThumbnailCache(tmp_path / "thumbnails", 36, 3)
+    rendered = []
+    monkeypatch.setattr(cache, "render", lambda doc_hash, pages: rendered.extend(pages))
+    cache.register(make_pdf(tmp_path / "long.pdf", thumbnails.PREFETCH_PAGES + 20))
+    cache._executor.shutdown(wait=True)
+    assert sorted(rendered) == list(range(1, thumbnails.PREFETCH_PAGES + 1))
+
+
+def test_nothing_is_prefetched_with_one_worker(tmp_path, pdf, monkeypatch):
+    cache = thumbnails.ThumbnailCache(tmp_path / "thumbnails", 36, 1)
+    monkeypatch.setattr(cache, "render", lambda doc_hash, pages: pytest.fail())
+    cache.register(pdf)
+    assert cache._executor is None
@@ -0,0 +1,141 @@
+"""The chunked upload protocol."""
+
+from app.services import storage, uploads
+import errno
+import hashlib
+import os
+import pytest
+
+
+@pytest.fixture
+def store(tmp_path):
+    backend = storage.LocalStorage(tmp_path / "storage", "secret", 60)
+    return uploads.UploadStore(backend, "uploads/chunked", 1024, 1024**2)
+
+
+def _send(store, upload_id, data, chunk_size=1024, order=None):
+    chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+    upload = None
+    for index in order or range(len(chunks)):
+        chunk = chunks[index]
+        upload = store.write_chunk(
+            upload_id, index, chunk, hashlib.sha256(chunk).hexdigest()
+        )
+    return upload
+
+
+def test_chunks_in_any_order_complete_the_upload(store, pdf):
+    data = pdf.read_bytes()
+    upload = store.create("doc.pdf", len(data))
+    assert upload["total_chunks"] == -(-len(data) // 1024)
+    order = list(reversed(range(upload["total_chunks"])))
+    _send(store, upload["id"], data, order=order[:-1])
+    assert store.get(upload["id"])["received"] == sorted(order[:-1])
+    upload = _send(store, upload["id"], data, order=order[-1:])
+    assert upload["status"] == uploads.COMPLETE
+    assert upload["pages"] == 3
+
+
+def test_bad_chunks_are_rejected(store, pdf):
+    data = pdf.read_bytes()
+    upload = store.create("doc.pdf", len(data))
+    with pytest.raises(uploads.UploadError) as error:
+        store.write_chunk(upload["id"], 0, data[:1024], "0" * 64)
+    assert error.value.status_code == 422
+    with pytest.raises(uploads.UploadError) as error:
+        store.write_chunk(upload["id"], 0, data[:10], "")
+    assert error.value.status_code == 400
+    with pytest.raises(uploads.UploadError) as error:
+        store.write_chunk(upload["id"], upload["total_chunks"], b"", "")
+    assert error.value.status_code == 400
+
+
+def test_non_pdfs_are_rejected_on_the_first_chunk(store):
+    upload = store.create("doc.pdf", 10)
+    with pytest.raises(uploads.UploadError) as error:
+        _send(store, upload["id"], b"not a pdf!")
+    assert error.value.status_code == 415
+    assert store.get(upload["id"])["status"] == uploads.INVALID
+
+
+def test_sizes_are_limited(store):
+    for size in (0, 1024**2 + 1):
+        with pytest.raises(uploads.UploadError) as error:
+            store.create("doc.pdf", size)
+        assert error.value.status_code == 413
+
+
+def test_claim_moves_the_file_across_filesystems(store, pdf, tmp_path, monkeypatch):
+    data = pdf.read_bytes()
+    upload = store.create("doc.pdf", len(data))
+    _send(store, upload["id"], data)
+
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(os, "rename", cross_device)
+    monkeypatch.setattr(os, "replace", cross_device)
+    target = tmp_path / "session" / "doc.pdf"
+    assert store.claim(upload["id"], target)["filename"] == "doc.pdf"
+    assert target.read_bytes() == data
+    with pytest.raises(uploads.UploadError) as error:
+        store.get(upload["id"])
+    assert error.value.status_code == 404
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from app.api import api
+    from starlette.testclient import TestClient
+
+    monkeypatch.setattr(uploads.store, "chunk_size", 1024)
+    return TestClient(api)
+
+
+def _put(client, upload_id, index, data, **kwargs):
+    return client.put(
+        f"/uploads/{upload_id}/chunks/{index}",
+        headers={"x-chunk-sha256": hashlib.sha256(data).hexdigest()},
+        content=data,
+        **kwargs,
+    )
+
+
+def test_api_upload_round_trip(client, pdf):
+    data = pdf.read_bytes()
+    response = client.post("/uploads", json={"filename": "doc.pdf", "size": len(data)})
+    assert response.status_code == 201
+    upload = response.json()
+    for index in range(upload["total_chunks"]):
+        response = _put(client, upload["id"], index, data[index * 1024 :][:1024])
+        assert response.status_code == 200
+    assert response.json()["status"] == uploads.COMPLETE
+    assert client.delete(f"/uploads/{upload['id']}").status_code == 200
+    assert client.get(f"/uploads/{upload['id']}").status_code == 404
+
+
+def test_api_chunks_are_limited_while_read(client, pdf):
+    data = pdf.read_bytes()
+    upload = client.post(
+        "/uploads", json={"filename": "doc.pdf", "size": len(data)}
+    ).json()
+    assert _put(client, upload["id"], 0, data[:1025]).status_code == 413
+
+    def chunked():
+        # No Content-Length: the body is sent with chunked transfer encoding.
+        yield data[:1000]
+        yield data[1000:1025]
+
+    response = client.put(
+        f"/uploads/{upload['id']}/chunks/0",
+        headers={"x-chunk-sha256": hashlib.sha256(data[:1025]).hexdigest()},
+        content=chunked(),
+    )
+    assert response.status_code == 413
+    response = client.put(
+        f"/uploads/{upload['id']}/chunks/0",
+        headers={"content-length": "lots", "x-chunk-sha256": ""},
+        content=data[:10],
+    )
+    assert response.status_code == 400
+    assert client.get(f"/uploads/{upload['id']}").json()["received"] == []
@@ -0,0 +1,77 @@
+"""The Watermark tool: one shared stamp, placed as each page is viewed."""
+
+from app.services import operations
+from conftest import make_pdf
+import io
+import PIL.Image
+import pymupdf
+import pytest
+
+
+def _stamp(paths, **params) -> pymupdf.Document:
+    out = io.BytesIO()
+    operations.run_operation("watermark", paths, out, params)
+    return pymupdf.open(stream=out.getvalue())
+
+
+def _stamp_box(page: pymupdf.Page) -> pymupdf.Rect:
+    """Where the stamp text is, in the page as it is viewed."""
+    [word] = [word for word in page.get_text("words") if word[4] == "STAMP"]
+    return pymupdf.Rect(word[:4]) * page.rotation_matrix
+
+
+def test_only_the_selected_pages_are_stamped(pdf):
+    doc = _stamp([pdf], text="STAMP", pages="1,3")
+    stamped = ["STAMP" in page.get_text() for page in doc]
+    assert stamped == [True, False, True]
+    assert doc[1].get_text().strip() == "Page 2"
+
+
+def test_every_page_shares_one_stamp(tmp_path):
+    path = make_pdf(tmp_path / "long.pdf", 200)
+    doc = _stamp([path], text="STAMP")
+    forms = {xref for page in doc for xref, *_ in page.get_xobjects()}
+    assert len(forms) == 1
+    # A few bytes per page, not a copy of the stamp on each.
+    assert len(doc.tobytes()) - path.stat().st_size < 200 * 100
+
+
+@pytest.mark.parametrize("position", ["top-left", "bottom-right"])
+def test_stamp_is_placed_as_the_page_is_viewed(tmp_path, pdf, position):
+    doc = pymupdf.open(pdf)
+    doc[1].set_rotation(90)
+    doc.save(tmp_path / "rotated.pdf")
+    doc = _stamp([tmp_path / "rotated.pdf"], text="STAMP", position=position)
+    for page in doc:
+        box = _stamp_box(page)
+        assert box in page.rect
+        in_top_left = box.x1 < page.rect.width / 2 and box.y1 < page.rect.height / 2
+        in_bottom_right = box.x0 > page.rect.width / 2 and box.y0 > page.rect.height / 2
+        assert in_top_left if position == "top-left" else in_bottom_right
+
+
+def test_logo_image_is_stamped(tmp_path, pdf):
+    logo = tmp_path / "logo.png"
+    PIL.Image.new("RGBA", (40, 20), (200, 0, 0, 128)).save(logo)
+    doc = _stamp([pdf, logo], text="")
+    for page in doc:
+        [(form, *_)] = page.get_xobjects()
+        assert doc.xref_get_key(form, "Subtype") == ("name", "/Form")
+    assert any(
+        doc.xref_get_key(xref, "Subtype")[1] == "/Image"
+        for xref in range(1, doc.xref_length())
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{"text": " "}, {"opacity": 0}, {"opacity": 1.5}, {"position": "middle"}],
+)
+def test_invalid_parameters_are_rejected(pdf, params):
+    with pytest.raises(operations.OperationError):
+        _stamp([pdf], **params)
+
+
+def test_more_than_one_logo_is_rejected(pdf):
+    with pytest.raises(operations.OperationError):
+        _stamp([pdf, pdf, pdf], text="STAMP")
@@ -0,0 +1,79 @@
+"""The pool of pre-warmed worker processes."""
+
+from app.services import metrics, thumbnails, worker_pool
+import os
+import pytest
+import zipfile
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = worker_pool.WorkerPool(1, max_jobs=3, max_rss_bytes=2**40)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def _job(pdf, operation="split", params=None):
+    return {
+        "id": "job",
+        "operation": operation,
+        "params": params or {"ranges": "1,2-3"},
+        "input_hash": "hash",
+        "input_paths": [str(pdf)],
+    }
+
+
+def test_runs_jobs_off_the_server(pool, pdf, tmp_path):
+    result = tmp_path / "out.zip"
+    recorder = metrics.JobRecorder("split")
+    pool.run(_job(pdf), result, recorder)
+    with zipfile.ZipFile(result) as archive:
+        assert len(archive.namelist()) == 2
+    assert recorder.pages == 3
+    assert "transform" in recorder.stages
+
+
+def test_calls_functions_in_a_worker(pool):
+    assert pool.call(os.getpid) != os.getpid()
+
+
+def test_worker_errors_are_raised(pool, pdf, tmp_path):
+    with pytest.raises(Exception, match="Invalid"):
+        pool.run(
+            _job(pdf, params={"ranges": "9"}),
+            tmp_path / "out.zip",
+            metrics.JobRecorder("split"),
+        )
+    assert pool.call(os.getpid)
+
+
+def test_task_os_errors_keep_the_worker(tmp_path):
+    pool = worker_pool.WorkerPool(1, max_jobs=100, max_rss_bytes=2**40)
+    pool.start()
+    try:
+        pid = pool.call(os.getpid)
+        with pytest.raises(FileNotFoundError):
+            pool.call(os.stat, str(tmp_path / "missing"))
+        assert pool.call(os.getpid) == pid
+    finally:
+        pool.shutdown()
+
+
+def test_workers_are_recycled(pool):
+    pids = {pool.call(os.getpid) for _ in range(2 * pool.max_jobs)}
+    assert len(pids) >= 2
+
+
+def test_affinity_prefers_the_same_worker(pool, pdf, tmp_path):
+    pool.run(_job(pdf), tmp_path / "a.zip", metrics.JobRecorder("split"), affinity="s")
+    assert [w.affinity for w in pool._idle] == ["s"]
+
+
+def test_renders_thumbnails(pool, pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(worker_pool, "pool", pool)
+    cache = thumbnails.ThumbnailCache(tmp_path, 36, 1)
+    monkeypatch.setattr(cache, "_prefetch", lambda doc_hash, pages: None)
+    doc_hash, pages = cache.register(pdf)
+    assert pages == 3
+    assert cache.get(doc_hash, 3).read_bytes().startswith(b"\xff\xd8")